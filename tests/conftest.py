@@ -0,0 +1,6 @@
+# tests/conftest.py
+import sys
+from pathlib import Path
+
+# The tools are flat scripts that import each other by module name
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'utils'))
@@ -0,0 +1,45 @@
+# tests/test_backend.py
+import json
+import time
+import threading
+from types import SimpleNamespace
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from backend import LlamaCppBackend, KoboldBackend
+
+class StallingHandler(BaseHTTPRequestHandler):
+    """Streams a few chunks (when asked to stream), then stalls past the client's timeout."""
+    protocol_version = 'HTTP/1.0'
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+        if payload.get('stream'):
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.end_headers()
+            self.wfile.write(b'data: {"choices": [{"delta": {"content": "hi"}}], "token": "hi"}\n\n' * 20)
+            self.wfile.flush()
+        time.sleep(1.5)
+
+@pytest.fixture(scope='module')
+def stalling_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StallingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+
+@pytest.mark.parametrize('backend_class', [LlamaCppBackend, KoboldBackend])
+@pytest.mark.parametrize('streamed', [False, True])
+def test_timeout_result_does_not_depend_on_backend_or_streaming(stalling_server, backend_class, streamed):
+    backend = backend_class(SimpleNamespace(server_config={'primary_timeout': 0.5}), '127.0.0.1', stalling_server)
+    backend._abort = lambda: None
+    backend._read_perf_timings = lambda: {}
+    if streamed:
+        backend.output_stream = SimpleNamespace(write=lambda kind, text: None)
+    answer, _, success, fallback = backend.generate('prompt', {}, {})
+    assert (answer, success, fallback) == (None, False, True)
@@ -0,0 +1,71 @@
+# tests/test_compare_runs.py
+import math
+
+import pytest
+
+from compare_runs import compare_pair, parse_transcript, wilcoxon_signed_rank
+
+def test_wilcoxon_exact_distribution():
+    # All six differences positive: only the empty subset reaches W = 0 on each side
+    assert wilcoxon_signed_rank([1, 2, 3, 4, 5, 6]) == pytest.approx(2 / 64)
+    # W+ = 9: 27 of the 64 sign patterns have a rank sum <= 9
+    assert wilcoxon_signed_rank([1, -2, 3, -4, 5, -6]) == pytest.approx(2 * 27 / 64)
+
+def test_wilcoxon_drops_zeros_and_handles_nothing_to_test():
+    assert wilcoxon_signed_rank([]) == 1.0
+    assert wilcoxon_signed_rank([0, 0]) == 1.0
+    assert wilcoxon_signed_rank([0, 1, 2, 3, 4, 5, 6]) == wilcoxon_signed_rank([1, 2, 3, 4, 5, 6])
+
+def test_wilcoxon_ties_share_ranks():
+    # Four tied magnitudes share rank 2.5; two up, two down is the centre of the distribution
+    assert wilcoxon_signed_rank([1, -1, 1, -1]) == 1.0
+
+def test_wilcoxon_normal_approximation_for_large_samples():
+    p = wilcoxon_signed_rank([0.1 * (i + 1) for i in range(25)])
+    mean, sd = 25 * 26 / 4, math.sqrt(25 * 26 * 51 / 24)
+    assert p == pytest.approx(math.erfc((mean - 0.5) / sd / math.sqrt(2)))
+    assert wilcoxon_signed_rank([(-1) ** i * (i + 1) for i in range(30)]) > 0.5
+
+def sample(seconds, chars=1000):
+    return {'time': seconds, 'chars': chars, 'chars_per_sec': chars / seconds, 'early_stop': False, 'tokens_per_sec': None}
+
+def test_compare_pair_flags_a_consistent_slowdown():
+    prompts = [f'p{i}' for i in range(6)]
+    runs = {('m', p): {'2026.01.01': [sample(10 + i)], '2026.02.01': [sample(2 * (10 + i))]}
+            for i, p in enumerate(prompts)}
+    result = compare_pair(runs, 'm', prompts, '2026.01.01', '2026.02.01')
+    assert result['n'] == 6
+    assert result['time_ratio'] == pytest.approx(2.0)
+    assert result['time_verdict'] == 'regression'
+    assert result['tput_verdict'] == 'regression'
+
+def test_compare_pair_needs_both_dates():
+    runs = {('m', 'p'): {'2026.01.01': [sample(10)]}}
+    assert compare_pair(runs, 'm', ['p'], '2026.01.01', '2026.02.01') is None
+
+META = (
+    "\n\n<!-- Benchmark Info -->\n<!-- Backend: llamacpp -->\n<!-- Model: m.gguf -->\n"
+    "<!-- Prompt: p.md -->\n<!-- Time: 12.50s -->\n<!-- Fallback: False -->"
+)
+
+def test_parse_transcript_reads_the_metadata_block(tmp_path):
+    path = tmp_path / 'm_p_20260101_000000.md'
+    path.write_text("x" * 500 + META, encoding='utf-8')
+    parsed = parse_transcript(path)
+    assert parsed['time'] == 12.5
+    assert parsed['chars'] == 500
+    assert parsed['chars_per_sec'] == 40.0
+    assert parsed['tokens_per_sec'] is None
+
+def test_parse_transcript_reads_server_tokens_per_second(tmp_path):
+    path = tmp_path / 'm_p_20260101_000000.md'
+    path.write_text("x" * 500 + META + "\n<!-- Tokens/s: 33.30 -->", encoding='utf-8')
+    assert parse_transcript(path)['tokens_per_sec'] == 33.3
+
+def test_parse_transcript_flags_early_stopped_runs(tmp_path):
+    path = tmp_path / 'm_p_20260101_000000.md'
+    early_stop = "\n<!-- Early Stop: HTML complete at 9.00s, stopped at 9.10s (12 chars after </html>) -->"
+    path.write_text("x" * 500 + META + early_stop, encoding='utf-8')
+    assert parse_transcript(path)['early_stop']
+    path.write_text("x" * 500 + META, encoding='utf-8')
+    assert not parse_transcript(path)['early_stop']
@@ -0,0 +1,36 @@
+# tests/test_dedupe_results.py
+import pytest
+
+from blob_store import BlobStore
+from dedupe_results import build_manifests, dedupe
+from extract_html import extract_file
+
+TRANSCRIPT = "Here:\n```html\n<!DOCTYPE html>\n<html><body>{}</body></html>\n```\n"
+
+def make_runs(root):
+    """Two dated folders carrying the same transcript and extracted page."""
+    for date in ('2026.01.01', '2026.02.01'):
+        (root / date / 'results').mkdir(parents=True)
+        (root / date / 'html').mkdir()
+        (root / date / 'results' / 'M_ball_20260101_000000.md').write_text(TRANSCRIPT.format('old'), encoding='utf-8')
+        (root / date / 'html' / 'M_ball_20260101_000000.html').write_text('<html>old</html>', encoding='utf-8')
+
+@pytest.mark.parametrize('mode', ['hardlink', 'symlink'])
+def test_reextracting_a_linked_page_leaves_other_copies_alone(tmp_path, mode):
+    root = tmp_path / 'results'
+    make_runs(root)
+    store = BlobStore(root / '.blobs')
+    _, occurrences = build_manifests(root)
+    linked, _ = dedupe(occurrences, store, mode)
+    assert linked == 4
+
+    # The newer run's transcript changes and its page is extracted again
+    new_md = root / '2026.02.01' / 'results' / 'M_ball_20260101_000000.md'
+    new_md.unlink()
+    new_md.write_text(TRANSCRIPT.format('new'), encoding='utf-8')
+    assert extract_file(new_md, root / '2026.02.01' / 'html')
+
+    assert 'new' in (root / '2026.02.01' / 'html' / 'M_ball_20260101_000000.html').read_text(encoding='utf-8')
+    assert (root / '2026.01.01' / 'html' / 'M_ball_20260101_000000.html').read_text(encoding='utf-8') == '<html>old</html>'
+    blobs = [p for p in (root / '.blobs').rglob('*.html')]
+    assert [b.read_text(encoding='utf-8') for b in blobs] == ['<html>old</html>']
@@ -0,0 +1,133 @@
+# tests/test_distributed.py
+import socket
+import threading
+import time
+
+import pytest
+import requests
+import yaml
+
+import distributed
+from config_loader import ConfigLoader
+from distributed import MAX_CLAIM_FAILURES, CoordinatorClient, WorkQueue, run_coordinator
+from run_benchmarks import BenchmarkRunner, parse_options
+
+ITEM = {'id': 'm|p', 'model': 'm.gguf', 'variant': 'm', 'prompt': 'p', 'prompt_text': 'hi'}
+
+@pytest.fixture(autouse=True)
+def short_grace(monkeypatch):
+    monkeypatch.setattr(distributed, 'DONE_GRACE_SECONDS', 0.2)
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start(queue, tmp_path, **kwargs):
+    port = free_port()
+    thread = threading.Thread(target=run_coordinator, daemon=True, kwargs=dict(
+        queue=queue, host='127.0.0.1', port=port, results_dir=tmp_path,
+        lease_base=60, lease_per_item=60, poll_interval=0.05, **kwargs))
+    thread.start()
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.02)
+    return f"http://127.0.0.1:{port}", thread
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.02)
+
+def test_other_interfaces_need_a_token(tmp_path):
+    with pytest.raises(ValueError):
+        run_coordinator(WorkQueue([ITEM]), '0.0.0.0', free_port(), tmp_path, 60, 60)
+
+def test_requests_without_the_token_are_rejected(tmp_path):
+    url, thread = start(WorkQueue([ITEM], retry_seconds=0.1), tmp_path, token='s3cret')
+    assert requests.get(f"{url}/status", timeout=5).status_code == 401
+    assert requests.post(f"{url}/claim", json={'worker_id': 'x'}, headers={'X-Coordinator-Token': 'wrong'},
+                         timeout=5).status_code == 401
+
+    client = CoordinatorClient(url, 'w1', {}, token='s3cret')
+    (item,) = client.claim(['m.gguf'])['items']
+    assert client.submit(item, True, 'm_p.md', 'answer')
+    thread.join(5)
+    assert (tmp_path / 'm_p.md').read_text(encoding='utf-8') == 'answer'
+
+def test_expired_leases_are_requeued_without_a_claim(tmp_path):
+    queue = WorkQueue([ITEM], retry_seconds=0.1)
+    queue.claim('dead', {}, ['m.gguf'], lease_base=0.1, lease_per_item=0)
+    url, thread = start(queue, tmp_path)
+    wait_for(lambda: queue.counts()['pending'] == 1)
+
+    (item,) = queue.claim('alive', {}, ['m.gguf'], 60, 60)['items']
+    queue.complete(item['id'], 'alive', True, 60)
+    thread.join(5)
+    assert not thread.is_alive()
+
+def runner(tmp_path):
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text(yaml.safe_dump({
+        'paths': {}, 'server': {'default_backend': 'llamacpp'},
+        'backends': {'llamacpp': {'bin_path': 'llama-server'}},
+    }), encoding='utf-8')
+    return BenchmarkRunner(ConfigLoader(str(config_path)), parse_options([]))
+
+class RecordingClient(CoordinatorClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.responses = []
+
+    def claim(self, models):
+        self.responses.append(super().claim(models))
+        return self.responses[-1]
+
+def test_worker_waiting_at_the_end_is_told_done(tmp_path):
+    url, coordinator = start(WorkQueue([ITEM], retry_seconds=0.3), tmp_path)
+    busy = CoordinatorClient(url, 'busy', {})
+    (item,) = busy.claim(['m.gguf'])['items']
+
+    idle = RecordingClient(url, 'idle', {})
+    worker = threading.Thread(target=runner(tmp_path).run_worker, args=(idle, None, [tmp_path / 'm.gguf']), daemon=True)
+    worker.start()
+    wait_for(lambda: idle.responses)
+    assert idle.responses == [{'wait': 0.3}]
+
+    # The run ends while the idle worker sleeps; it wakes up to 'done', not a closed port
+    busy.submit(item, True, 'm_p.md', 'answer')
+    worker.join(5)
+    assert not worker.is_alive()
+    assert idle.responses[-1] == {'done': True}
+    coordinator.join(5)
+
+class FlakyClient:
+    """Claims through `attempts` in order: a dict is returned, a callable is called (and may raise)."""
+    def __init__(self, attempts):
+        self.worker_id = 'flaky'
+        self.attempts = list(attempts)
+        self.calls = 0
+
+    def claim(self, models):
+        self.calls += 1
+        attempt = self.attempts[min(self.calls, len(self.attempts)) - 1]
+        return attempt() if callable(attempt) else attempt
+
+def test_worker_stops_once_the_coordinator_is_gone(tmp_path, monkeypatch):
+    monkeypatch.setattr(distributed, 'CLAIM_RETRY_SECONDS', 0)
+    closed = f"http://127.0.0.1:{free_port()}/claim"
+    client = FlakyClient([{'wait': 0}, lambda: requests.post(closed, json={}, timeout=5)])
+    assert runner(tmp_path).run_worker(client, None, []) == 0
+    assert client.calls == 2
+
+def test_worker_gives_up_on_an_unreachable_coordinator(tmp_path, monkeypatch):
+    monkeypatch.setattr(distributed, 'CLAIM_RETRY_SECONDS', 0)
+    def refuse():
+        raise requests.ConnectionError("no route to host")
+    client = FlakyClient([refuse])
+    assert runner(tmp_path).run_worker(client, None, []) == 0
+    assert client.calls == MAX_CLAIM_FAILURES
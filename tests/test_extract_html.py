@@ -0,0 +1,33 @@
+# tests/test_extract_html.py
+import os
+
+import extract_html
+from extract_html import extract_cache_dir, extract_last_html
+
+PAGE = "<!DOCTYPE html><html><body>ok</body></html>"
+
+def test_cache_lives_under_the_results_root(tmp_path, monkeypatch):
+    source = tmp_path / 'results' / '2026.02.04' / 'results'
+    source.mkdir(parents=True)
+    monkeypatch.chdir(source)
+    assert extract_cache_dir(source) == tmp_path / 'results' / '.cache' / 'extract'
+    assert extract_cache_dir(os.curdir) == tmp_path / 'results' / '.cache' / 'extract'
+
+def test_changed_extractor_does_not_reuse_cached_pages(tmp_path, monkeypatch):
+    source = tmp_path / 'results' / '2026.02.04' / 'results'
+    source.mkdir(parents=True)
+    (source / 'model_prompt.md').write_text(f"Here you go:\n{PAGE}\n", encoding='utf-8')
+    output = source.parent / 'html'
+    cache = extract_cache_dir(source)
+    extract_last_html(source, output, cache)
+    assert (output / 'model_prompt.html').read_text(encoding='utf-8') == PAGE
+
+    # Poison the cached entry: the same extractor serves it, a new one ignores it
+    (entry,) = cache.iterdir()
+    entry.write_text("stale", encoding='utf-8')
+    extract_last_html(source, output, cache)
+    assert (output / 'model_prompt.html').read_text(encoding='utf-8') == "stale"
+
+    monkeypatch.setattr(extract_html, 'EXTRACTOR_KEY', 'next-version')
+    extract_last_html(source, output, cache)
+    assert (output / 'model_prompt.html').read_text(encoding='utf-8') == PAGE
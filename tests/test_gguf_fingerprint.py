@@ -0,0 +1,76 @@
+# tests/test_gguf_fingerprint.py
+import os
+
+import pytest
+
+import gguf_fingerprint
+from gguf_fingerprint import FingerprintCache, model_fingerprint, sample_offsets
+from run_benchmarks import build_meta_comment, check_if_output_exists
+
+@pytest.fixture(autouse=True)
+def small_samples(monkeypatch):
+    # Same layout as the real one, scaled down so test files stay small
+    monkeypatch.setattr(gguf_fingerprint, 'HEADER_BYTES', 1024)
+    monkeypatch.setattr(gguf_fingerprint, 'BLOCK_BYTES', 64)
+
+def write_model(path, size=64 * 1024, seed=1):
+    path.write_bytes(bytes((i * seed) % 251 for i in range(size)))
+    return path
+
+def flip_byte(path, offset):
+    data = bytearray(path.read_bytes())
+    data[offset] ^= 0xFF
+    path.write_bytes(bytes(data))
+
+def test_sample_offsets_cover_the_file_after_the_header():
+    assert sample_offsets(1024 + 64) == []
+    offsets = sample_offsets(64 * 1024)
+    assert len(offsets) == gguf_fingerprint.SAMPLE_BLOCKS + 1
+    assert offsets[0] == 1024 and offsets[-1] == 64 * 1024 - 64
+    assert offsets == sorted(offsets)
+
+def test_sampled_changes_change_the_fingerprint(tmp_path):
+    path = write_model(tmp_path / 'm.gguf')
+    before = model_fingerprint(path, FingerprintCache())
+    assert before.startswith(f"{gguf_fingerprint.FINGERPRINT_VERSION}:")
+    flip_byte(path, 10)  # Header (chat template, tensor table)
+    after_header = model_fingerprint(path, FingerprintCache())
+    flip_byte(path, sample_offsets(path.stat().st_size)[5])
+    after_block = model_fingerprint(path, FingerprintCache())
+    assert len({before, after_header, after_block}) == 3
+
+def test_cache_is_reused_until_the_file_changes(tmp_path):
+    path = write_model(tmp_path / 'm.gguf')
+    cache = FingerprintCache(tmp_path / 'fingerprints.json')
+    first = model_fingerprint(path, cache)
+    assert model_fingerprint(path, cache) == first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.save()
+    reloaded = FingerprintCache(tmp_path / 'fingerprints.json')
+    assert model_fingerprint(path, reloaded) == first and reloaded.hits == 1
+
+    write_model(path, seed=3)
+    os.utime(path, ns=(0, path.stat().st_mtime_ns + 1))
+    assert model_fingerprint(path, reloaded) != first
+
+def test_split_models_combine_every_part(tmp_path):
+    first = write_model(tmp_path / 'm-00001-of-00002.gguf')
+    second = write_model(tmp_path / 'm-00002-of-00002.gguf', seed=2)
+    before = model_fingerprint(first, FingerprintCache())
+    flip_byte(second, 10)
+    assert model_fingerprint(first, FingerprintCache()) != before
+
+def test_resume_check_only_counts_outputs_of_the_same_file(tmp_path):
+    def output(name, fingerprint):
+        meta = build_meta_comment('llamacpp', 'm.gguf', 'p.md', 1.0, False, {}, fingerprint=fingerprint)
+        (tmp_path / name).write_text("<html></html>" + meta, encoding='utf-8')
+
+    output('m_p_20260101_000000.md', 'gguf1:aaaa')
+    assert check_if_output_exists(tmp_path, 'm', 'p', 'gguf1:aaaa')
+    assert not check_if_output_exists(tmp_path, 'm', 'p', 'gguf1:bbbb')
+    assert check_if_output_exists(tmp_path, 'm', 'p')
+
+    # Outputs from before fingerprinting still count as done
+    output('m_p_20250101_000000.md', None)
+    assert check_if_output_exists(tmp_path, 'm', 'p', 'gguf1:bbbb')
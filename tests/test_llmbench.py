@@ -0,0 +1,30 @@
+# tests/test_llmbench.py
+import compare_runs
+from llmbench import stage_score
+
+PROMPTS = [f'p{i}' for i in range(6)]
+
+def write_run(results_root, date, seconds):
+    folder = results_root / date / 'results'
+    folder.mkdir(parents=True)
+    stamp = date.replace('.', '') + '_000000'
+    for i, prompt in enumerate(PROMPTS):
+        (folder / f"m_{prompt}_{stamp}.md").write_text(
+            "x" * 1000 + f"\n\n<!-- Benchmark Info -->\n<!-- Time: {seconds + i:.2f}s -->", encoding='utf-8')
+
+def test_score_compares_the_given_run_with_the_one_before(tmp_path, monkeypatch):
+    prompts_dir = tmp_path / 'prompts'
+    prompts_dir.mkdir()
+    for prompt in PROMPTS:
+        (prompts_dir / f"{prompt}.md").write_text("draw", encoding='utf-8')
+    monkeypatch.setattr(compare_runs, 'PROMPTS_DIR', str(prompts_dir))
+    results_root = tmp_path / 'results'
+    write_run(results_root, '2026.01.01', 10)
+    write_run(results_root, '2026.01.02', 20)
+    write_run(results_root, '2026.01.03', 20)
+    monkeypatch.chdir(tmp_path)
+
+    assert stage_score(results_root / '2026.01.02') == 0
+    report = (results_root / 'comparison.md').read_text(encoding='utf-8')
+    assert '2026.01.01' in report and '2026.01.02' in report
+    assert '2026.01.03' not in report
@@ -0,0 +1,69 @@
+# tests/test_output_stream.py
+import pytest
+import yaml
+
+from config_loader import ConfigLoader
+from output_stream import OutputStream, list_partials, PARTIAL_FOLDER_NAME
+from run_benchmarks import BenchmarkRunner, parse_options
+
+def open_stream(results_dir, prompt_stem, stamp='20260101_000000', variant='M'):
+    return OutputStream(results_dir, f"{variant}_{prompt_stem}_{stamp}.md", {
+        'backend': 'llamacpp', 'model': f"{variant}.gguf", 'variant': variant,
+        'prompt': f"{prompt_stem}.md", 'prompt_stem': prompt_stem,
+    })
+
+def test_commit_writes_final_parts_and_renames(tmp_path):
+    stream = open_stream(tmp_path, 'ball')
+    stream.write('reasoning', 'hmm')
+    stream.write('content', ' answer ')
+    assert (tmp_path / PARTIAL_FOLDER_NAME / 'M_ball_20260101_000000.md').read_text(encoding='utf-8') == \
+        "<think>\nhmm\n</think>\n\n answer "
+    final = stream.commit(tmp_path / 'M_ball_20260101_000001.md', ['answer', '\n<!-- Benchmark Info -->'])
+    assert final.read_text(encoding='utf-8') == 'answer\n<!-- Benchmark Info -->'
+    assert list((tmp_path / PARTIAL_FOLDER_NAME).iterdir()) == []
+
+def test_abort_keeps_partial_with_reason(tmp_path):
+    stream = open_stream(tmp_path, 'ball')
+    stream.write('content', 'half an ans')
+    stream.abort('Generation Failed')
+    [partial] = list_partials(tmp_path)
+    assert partial['status'] == 'failed'
+    assert partial['reason'] == 'Generation Failed'
+    assert partial['chars'] == len('half an ans')
+
+def test_commit_removes_only_the_same_prompts_partials(tmp_path):
+    # 'ball' is a prefix of 'ball_bound': committing ball must keep ball_bound's partial
+    open_stream(tmp_path, 'ball', '20260101_000000').abort('Generation Failed')
+    open_stream(tmp_path, 'ball_bound', '20260101_000000').abort('Interrupted', status='interrupted')
+    open_stream(tmp_path, 'ball', '20260101_000100').commit(tmp_path / 'M_ball_20260101_000200.md', ['ok'])
+    assert [p['prompt_stem'] for p in list_partials(tmp_path)] == ['ball_bound']
+    assert sorted(p.name for p in (tmp_path / PARTIAL_FOLDER_NAME).iterdir()) == [
+        'M_ball_bound_20260101_000000.md', 'M_ball_bound_20260101_000000.md.json']
+
+def test_sidecar_follows_the_stream_without_abort(tmp_path, monkeypatch):
+    # A hard crash never reaches abort(): the sidecar must already be current
+    import output_stream
+    stream = open_stream(tmp_path, 'ball')
+    stream.write('content', 'x' * output_stream.SIDECAR_INTERVAL_CHARS)
+    [partial] = list_partials(tmp_path)
+    assert (partial['status'], partial['chars']) == ('generating', output_stream.SIDECAR_INTERVAL_CHARS)
+
+    monkeypatch.setattr(output_stream, 'SIDECAR_INTERVAL_S', 0)
+    stream.write('content', 'y')
+    [partial] = list_partials(tmp_path)
+    assert partial['chars'] == output_stream.SIDECAR_INTERVAL_CHARS + 1
+
+@pytest.mark.parametrize('configured, argv, expected', [
+    (None, [], False),
+    (None, ['--stream-outputs'], True),
+    (True, [], True),
+])
+def test_streaming_outputs_is_opt_in(tmp_path, configured, argv, expected):
+    server = {'default_backend': 'llamacpp'}
+    if configured is not None:
+        server['stream_outputs'] = configured
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text(yaml.safe_dump({
+        'paths': {}, 'server': server, 'backends': {'llamacpp': {'bin_path': 'llama-server'}},
+    }), encoding='utf-8')
+    assert BenchmarkRunner(ConfigLoader(str(config_path)), parse_options(argv)).stream_outputs is expected
@@ -0,0 +1,28 @@
+# tests/test_pool_instances.py
+import yaml
+
+from config_loader import ConfigLoader
+from run_benchmarks import BenchmarkRunner, parse_options
+
+def build(tmp_path, instances, backend_args=(), size=2):
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text(yaml.safe_dump({
+        'paths': {}, 'server': {'default_backend': 'llamacpp'},
+        'backends': {'llamacpp': {'bin_path': 'llama-server', 'startup_args': list(backend_args)}},
+        'pool': {'instances': instances},
+    }), encoding='utf-8')
+    runner = BenchmarkRunner(ConfigLoader(str(config_path)), parse_options([]))
+    return runner.build_pool_instances(size, 5001)
+
+def test_pinned_instances_get_one_thread_per_core(tmp_path):
+    instances = build(tmp_path, [{'cpus': '0-3'}, {'cpus': '4-5'}])
+    assert [i['extra_startup_args'] for i in instances] == [['--threads', '4'], ['--threads', '2']]
+
+def test_configured_thread_flags_are_kept(tmp_path):
+    instances = build(tmp_path, [{'cpus': '0-3', 'startup_args': ['-t', '3']}, {'cpus': '4-5'}])
+    assert instances[0]['extra_startup_args'] == ['-t', '3']
+    assert instances[1]['extra_startup_args'] == ['--threads', '2']
+
+def test_backend_thread_flag_applies_to_every_instance(tmp_path):
+    instances = build(tmp_path, [{'cpus': '0-3'}, {'cpus': '4-5'}], backend_args=['--threads', '8'])
+    assert [i['extra_startup_args'] for i in instances] == [[], []]
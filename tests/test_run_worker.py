@@ -0,0 +1,82 @@
+# tests/test_run_worker.py
+import yaml
+
+from config_loader import ConfigLoader
+from run_benchmarks import BenchmarkRunner, get_latest_output_time, parse_options
+
+class FakeBackend:
+    """Answers every prompt at once; the draft variant is twice as fast as the standalone one."""
+    def __init__(self):
+        self.timeout_config = {}
+        self.draft = False
+
+    def get_backend_name(self):
+        return 'llamacpp'
+
+    def start_server(self, model_path, variant_config):
+        self.draft = bool(variant_config.get('draft'))
+        return True
+
+    def is_server_ready(self):
+        return True
+
+    def stop_server(self):
+        pass
+
+    def generate_or_replay(self, model_path, variant_config, prompt, early_stop=None, thinking_budget=None):
+        self.last_timings = {'draft_n': 10, 'draft_n_accepted': 7} if self.draft else {}
+        self.last_early_stop = self.last_thinking = None
+        self.last_reasoning = ""
+        self.last_replayed = False
+        return "<html></html>", (2.0 if self.draft else 4.0), True, False
+
+class FakeClient:
+    """Hands out the standalone batch, then the draft batch, and keeps what is submitted."""
+    def __init__(self, batches):
+        self.worker_id = 'test'
+        self.hardware = None
+        self.batches = list(batches)
+        self.outputs = {}
+
+    def claim(self, models):
+        return {'items': self.batches.pop(0)} if self.batches else {'done': True}
+
+    def submit(self, item, success, filename=None, content=None, gen_time=0.0, reason=""):
+        self.outputs[item['variant']] = content
+        return True
+
+def test_worker_outputs_carry_draft_metadata(tmp_path):
+    (tmp_path / 'models').mkdir()
+    (tmp_path / 'prompts').mkdir()
+    for name in ('big.gguf', 'small.gguf'):
+        (tmp_path / 'models' / name).write_bytes(b'GGUF' + bytes(64))
+    config_path = tmp_path / 'config.yaml'
+    config_path.write_text(yaml.safe_dump({
+        'paths': {'models': str(tmp_path / 'models'), 'prompts': str(tmp_path / 'prompts'),
+                  'results': str(tmp_path / 'results')},
+        'server': {'default_backend': 'llamacpp', 'startup_wait': 1, 'cooldown_wait': 0},
+        'backends': {'llamacpp': {'bin_path': 'llama-server'}},
+        'models': [{'pattern': 'big', 'draft': {'model': 'small.gguf'}}],
+    }), encoding='utf-8')
+    runner = BenchmarkRunner(ConfigLoader(str(config_path)), parse_options([]))
+
+    item = {'id': '', 'model': 'big.gguf', 'prompt': 'ball.md', 'prompt_text': 'hi'}
+    client = FakeClient([[dict(item, variant='big')], [dict(item, variant='big+draft-small')]])
+    runner.run_worker(client, FakeBackend(), [tmp_path / 'models' / 'big.gguf'])
+
+    assert '<!-- Draft' not in client.outputs['big']
+    draft_output = client.outputs['big+draft-small']
+    assert '<!-- Draft: small.gguf -->' in draft_output
+    assert '<!-- Draft Acceptance: 0.700 (7/10) -->' in draft_output
+    assert '<!-- Speedup: 2.00x -->' in draft_output
+
+def test_speedup_baseline_matches_the_exact_prompt(tmp_path):
+    def output(name, seconds):
+        (tmp_path / name).write_text(f"<html></html>\n\n<!-- Benchmark Info -->\n<!-- Time: {seconds:.2f}s -->", encoding='utf-8')
+
+    output('big_ball_20260101_000000.md', 10)
+    output('big_ball_20260101_000001_fallback.md', 50)
+    output('big_ball_bound_20260102_000000.md', 99)
+    assert get_latest_output_time(tmp_path, 'big', 'ball') == 10
+    assert get_latest_output_time(tmp_path, 'big', 'ball_bound') == 99
+    assert get_latest_output_time(tmp_path, 'big', 'aquarium') is None
@@ -0,0 +1,17 @@
+# tests/test_site_build.py
+from site_build import HEADERS_FILENAME, write_headers_file
+
+def header_rules(site_root):
+    rules, path = {}, None
+    for line in (site_root / HEADERS_FILENAME).read_text(encoding='utf-8').splitlines():
+        if line.startswith('/'):
+            path = line
+        elif line.strip().startswith('Cache-Control:'):
+            rules[path] = line.split(':', 1)[1].strip()
+    return rules
+
+def test_result_pages_are_revalidated_not_immutable(tmp_path):
+    write_headers_file(tmp_path)
+    rules = header_rules(tmp_path)
+    assert rules['/*/html/*'] == 'no-cache'
+    assert 'immutable' in rules['/assets/*']
@@ -0,0 +1,13 @@
+# tests/test_status_server.py
+from status_server import RunStatus, fmt_secs, render_html
+
+def test_durations_past_a_day_keep_counting_hours():
+    assert fmt_secs(None) == "n/a"
+    assert fmt_secs(59.9) == "00:00:59"
+    assert fmt_secs(3 * 3600 + 62) == "03:01:02"
+    assert fmt_secs(26 * 3600 + 5) == "26:00:05"
+
+def test_page_shows_long_elapsed_time():
+    status = RunStatus(total_items=4)
+    status.run_start -= 30 * 3600
+    assert "30:00:0" in render_html(status, None)
@@ -0,0 +1,56 @@
+# tests/test_timeout_predictor.py
+import pytest
+
+from timeout_predictor import TimeoutPredictor, quantile, timeout_settings
+
+GIB = 1024**3
+HISTORY = {
+    ('a', 'p1'): [100, 100, 100], ('a', 'p2'): [200, 200, 200],
+    ('b', 'p1'): [50, 50, 50], ('b', 'p2'): [100, 100, 100],
+    ('c', 'p1'): [10, 10, 10],
+}
+
+def predictor(**settings):
+    settings = timeout_settings(dict({'min_seconds': 0, 'max_seconds': 10000, 'margin': 0, 'quantile': 0.5}, **settings))
+    return TimeoutPredictor(HISTORY, {'a': GIB, 'b': GIB, 'c': GIB}, settings, default_timeout=900)
+
+def test_quantile_interpolates_between_samples():
+    assert quantile([4, 1, 3, 2], 0.5) == 2.5
+    assert quantile([1, 2, 3, 4], 0.0) == 1
+    assert quantile([1, 2, 3, 4], 1.0) == 4
+    assert quantile([1, 2, 3, 4], 0.95) == pytest.approx(3.85)
+    assert quantile([7], 0.9) == 7
+
+def test_model_and_prompt_history_comes_first():
+    prediction = predictor().predict('a', 'p1')
+    assert (prediction['basis'], prediction['expected'], prediction['samples']) == ('model+prompt', 100, 3)
+
+def test_model_history_is_scaled_by_the_prompt_factor():
+    # p2 takes 4/3 of a model's median on every model that ran it
+    prediction = predictor().predict('c', 'p2')
+    assert prediction['basis'] == 'model'
+    assert prediction['expected'] == pytest.approx(10 * 4 / 3)
+
+def test_unknown_models_fall_back_to_seconds_per_gib():
+    # Seconds per GiB over a, b, c: 150, 75, 10 -> median 75; 2 GiB on p2 (factor 4/3)
+    prediction = predictor().predict('d', 'p2', size_bytes=2 * GIB)
+    assert prediction['basis'] == 'size'
+    assert prediction['expected'] == pytest.approx(75 * 4 / 3 * 2)
+
+def test_no_usable_history_keeps_the_default_timeout():
+    assert predictor().predict('d', 'p2') == {'timeout': 900, 'expected': None, 'basis': 'default', 'samples': 0}
+    assert predictor(min_samples=4).predict('a', 'p1')['basis'] == 'model'
+    assert predictor(min_samples=7).predict('a', 'p1')['basis'] == 'default'
+
+def test_deadline_adds_the_margin_and_is_clamped():
+    assert predictor(margin=0.5).predict('a', 'p1')['timeout'] == 150
+    assert predictor(min_seconds=120).predict('c', 'p1')['timeout'] == 120
+    assert predictor(max_seconds=60).predict('a', 'p2')['timeout'] == 60
+
+def test_record_tells_deadline_hits_from_other_failures():
+    p = predictor()
+    prediction = p.predict('a', 'p1')
+    assert p.record(prediction, 99.5, False)['timed_out']
+    assert not p.record(prediction, 20, False)['timed_out']
+    assert p.record(prediction, 150, True)['error'] == pytest.approx(0.5)
+    assert "1 hit the deadline" in p.summary()
@@ -0,0 +1,43 @@
+# tests/test_transcript_store.py
+import pytest
+
+zstandard = pytest.importorskip('zstandard')
+
+from transcript_store import (compress_file, compressed_path, decompress_file, iter_transcripts,
+                              read_html_block, read_transcript)
+
+PAGE = "<!DOCTYPE html>\n<html><body>ünïcode</body></html>"
+TRANSCRIPT = f"Draft:\n<html><body>old</body></html>\nFinal:\n{PAGE}\nDone.\n<!-- Time: 1.00s -->"
+
+def stored(tmp_path, text):
+    md_path = tmp_path / 'model_prompt.md'
+    md_path.write_text(text, encoding='utf-8')
+    compress_file(md_path)
+    return md_path
+
+def test_compressed_transcript_round_trips(tmp_path):
+    md_path = stored(tmp_path, TRANSCRIPT)
+    assert not md_path.exists() and compressed_path(md_path).is_file()
+    assert read_transcript(md_path) == TRANSCRIPT
+    assert list(iter_transcripts(tmp_path)) == [md_path]
+
+def test_html_frame_holds_the_last_block(tmp_path):
+    assert read_html_block(stored(tmp_path, TRANSCRIPT)) == (True, PAGE)
+    assert read_html_block(stored(tmp_path, "no page here")) == (True, None)
+
+def test_plain_transcripts_skip_the_fast_path(tmp_path):
+    md_path = tmp_path / 'model_prompt.md'
+    md_path.write_text(TRANSCRIPT, encoding='utf-8')
+    assert read_html_block(md_path) == (False, None)
+
+def test_compressed_file_is_a_plain_zstd_stream(tmp_path):
+    md_path = stored(tmp_path, TRANSCRIPT)
+    data = compressed_path(md_path).read_bytes()
+    reader = zstandard.ZstdDecompressor().stream_reader(data, read_across_frames=True)
+    assert reader.read().decode('utf-8') == TRANSCRIPT
+
+def test_decompress_restores_the_original(tmp_path):
+    md_path = stored(tmp_path, TRANSCRIPT)
+    decompress_file(compressed_path(md_path))
+    assert md_path.read_text(encoding='utf-8') == TRANSCRIPT
+    assert not compressed_path(md_path).exists()
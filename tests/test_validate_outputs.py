@@ -0,0 +1,29 @@
+# tests/test_validate_outputs.py
+import pytest
+
+from validate_outputs import PageParser
+
+@pytest.mark.parametrize('type_attr', ['module', 'Module', ' MODULE '])
+def test_module_scripts_are_recognised_in_any_case(type_attr):
+    parser = PageParser()
+    parser.feed(f'<html><script type="{type_attr}">import x from "./x.js";</script></html>')
+    assert [s['module'] for s in parser.scripts] == [True]
+
+def test_classic_scripts_are_not_modules():
+    parser = PageParser()
+    parser.feed('<html><script type="Text/JavaScript">let x = 1;</script></html>')
+    assert [s['module'] for s in parser.scripts] == [False]
+
+def test_cache_lives_under_the_results_root(tmp_path, monkeypatch):
+    from llmbench import stage_validate
+    run_dir = tmp_path / 'results' / '2026.02.04'
+    (run_dir / 'html').mkdir(parents=True)
+    (run_dir / 'html' / 'm_p.html').write_text(
+        '<html><canvas></canvas><script>requestAnimationFrame(() => {});</script></html>', encoding='utf-8')
+    elsewhere = tmp_path / 'elsewhere'
+    elsewhere.mkdir()
+    monkeypatch.chdir(elsewhere)
+
+    assert stage_validate(run_dir) == 0
+    assert len(list((tmp_path / 'results' / '.cache' / 'validate').iterdir())) == 1
+    assert list(elsewhere.iterdir()) == []
@@ -1,4 +1,6 @@
 # utils/backend.py
+import os
+import re
 import subprocess
 import requests
 import time
@@ -6,19 +8,121 @@ import json
 import signal
 from abc import ABC, abstractmethod
 from pathlib import Path
-from typing import Tuple, Dict, Any, Optional, List
+from typing import Tuple, Dict, Any, Optional, List, Iterator
+
+from extract_html import HtmlCompletionWatcher
+from replay_cache import model_fingerprint, is_deterministic, make_key
+from timeline import TRACER
+
+# --- Timeouts ---
+
+def is_timeout(error: Exception) -> bool:
+    """
+    True for the primary timeout, however it surfaced: requests' Timeout, our
+    stream deadline (TimeoutError) or a read timeout while iterating a
+    streamed body, which requests wraps in a ConnectionError.
+    """
+    if isinstance(error, (requests.exceptions.Timeout, TimeoutError)):
+        return True
+    return isinstance(error, requests.exceptions.ConnectionError) and 'timed out' in str(error).lower()
+
+# --- Reasoning Traces ---
+
+THINK_OPEN, THINK_CLOSE = "<think>", "</think>"
+THINK_PATTERN = re.compile(r"^\s*<think>(.*?)</think>\s*", re.DOTALL)
+
+def split_reasoning(text: str) -> Tuple[str, str]:
+    """
+    Splits a completion into (reasoning, answer). Handles a leading
+    <think>...</think> block and templates that put the opening tag into the
+    prompt (so only </think> appears in the output).
+    """
+    match = THINK_PATTERN.match(text)
+    if match:
+        return match.group(1).strip(), text[match.end():]
+    close = text.find(THINK_CLOSE)
+    if close != -1 and THINK_OPEN not in text[:close]:
+        return text[:close].strip(), text[close + len(THINK_CLOSE):].lstrip()
+    return "", text
+
+class ThinkTagSplitter:
+    """Incremental version of split_reasoning for a token stream with an explicit leading <think>."""
+    def __init__(self):
+        self.state = 'start'   # start -> thinking -> answer (or start -> answer)
+        self._buf = ""
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        """Returns the (kind, text) pieces that are now certain; kind is 'reasoning' or 'content'."""
+        self._buf += text
+        out = []
+        while True:
+            if self.state == 'start':
+                stripped = self._buf.lstrip()
+                if THINK_OPEN.startswith(stripped):
+                    return out  # Not enough text yet to tell
+                if stripped.startswith(THINK_OPEN):
+                    self._buf = stripped[len(THINK_OPEN):]
+                    self.state = 'thinking'
+                else:
+                    self.state = 'answer'
+            elif self.state == 'thinking':
+                close = self._buf.find(THINK_CLOSE)
+                if close == -1:
+                    # Hold back a possible partial closing tag
+                    keep = len(THINK_CLOSE) - 1
+                    if len(self._buf) > keep:
+                        out.append(('reasoning', self._buf[:-keep]))
+                        self._buf = self._buf[-keep:]
+                    return out
+                if close:
+                    out.append(('reasoning', self._buf[:close]))
+                self._buf = self._buf[close + len(THINK_CLOSE):]
+                self.state = 'answer'
+            else:
+                if self._buf:
+                    out.append(('content', self._buf))
+                    self._buf = ""
+                return out
+
+    def flush(self) -> List[Tuple[str, str]]:
+        rest, self._buf = self._buf, ""
+        if not rest:
+            return []
+        return [('reasoning' if self.state == 'thinking' else 'content', rest)]
 
 class LLMBackend(ABC):
-    def __init__(self, config_loader, host: str, port: int):
+    def __init__(self, config_loader, host: str, port: int, cpu_set: Optional[List[int]] = None,
+                 env: Optional[Dict[str, str]] = None, extra_startup_args: Optional[List[str]] = None):
         self.config_loader = config_loader
         self.host = host
         self.port = port
+        # Per-instance pinning when several servers share a host (see pool in config.yaml)
+        self.cpu_set = cpu_set
+        self.env = env or {}
+        self.extra_startup_args = extra_startup_args or []
         self.timeout_config = {
             "primary": config_loader.server_config.get('primary_timeout', 600),
             "fallback": config_loader.server_config.get('fallback_timeout', 10)
         }
         self._process: Optional[subprocess.Popen] = None
         self._api_base_url = f"http://{self.host}:{self.port}"
+        # Server-reported timings of the last generate() call (empty if unavailable)
+        self.last_timings: Dict[str, Any] = {}
+        # Set when the last generate() was cut short by early_stop:
+        # {'html_complete_s', 'stopped_s', 'chars_after_html'}
+        self.last_early_stop: Optional[Dict[str, Any]] = None
+        # Reasoning trace of the last generate() (kept out of the returned answer)
+        # and its cost: {'chars', 'tokens', 'seconds', 'budget_exceeded'}; tokens
+        # and seconds are only measured when streaming (None otherwise)
+        self.last_reasoning = ""
+        self.last_thinking: Optional[Dict[str, Any]] = None
+        # Optional ReplayCache (see replay_cache.py); last_replayed is set when
+        # the last generate_or_replay() answered from it without the server
+        self.replay_cache = None
+        self.last_replayed = False
+        # Optional OutputStream (see output_stream.py) set by the runner around a
+        # generate() call; streamed pieces are written to it as they arrive
+        self.output_stream = None
 
     def start_server(self, model_path: Path, model_config: Dict[str, Any]) -> bool:
         """Starts the server subprocess."""
@@ -50,17 +154,34 @@ class LLMBackend(ABC):
         # These are appended last to override previous defaults in most CLIs
         cmd.extend(model_config.get("startup_args", []))
 
+        # Add Draft Model for speculative decoding (from yaml: models.<pattern>.draft)
+        draft = model_config.get("draft")
+        if draft:
+            cmd.extend(self.get_draft_flag(draft["model"]))
+            cmd.extend(draft.get("startup_args", []))
+
+        # Instance pinning args (e.g. --threads for this instance's core set) go last so they win
+        cmd.extend(self.extra_startup_args)
+
         print(f"  Running command: {' '.join(cmd)}")
         
+        cpu_set = self.cpu_set
+        def pin_cpus():
+            # Runs in the child before exec, so the server and all its threads inherit the affinity
+            os.sched_setaffinity(0, cpu_set)
+
         try:
-            self._process = subprocess.Popen(
-                cmd,
-                stdout=subprocess.DEVNULL,
-                stderr=subprocess.PIPE,
-                text=True,
-                encoding='utf-8',
-                errors='replace'
-            )
+            with TRACER.span('spawn', 'server', model=model_path.name, port=self.port):
+                self._process = subprocess.Popen(
+                    cmd,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    encoding='utf-8',
+                    errors='replace',
+                    env={**os.environ, **self.env} if self.env else None,
+                    preexec_fn=pin_cpus if cpu_set and hasattr(os, "sched_setaffinity") else None
+                )
             return True
         except Exception as e:
             print(f"  [ERROR] Failed to start process: {e}")
@@ -71,14 +192,258 @@ class LLMBackend(ABC):
         """Stops the server gracefully."""
         if self._process:
             print(f"  Stopping {self.get_backend_name()} (PID: {self._process.pid})...")
-            try:
-                self._process.send_signal(signal.SIGINT)
-                self._process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                self._process.kill()
-                self._process.wait()
+            with TRACER.span('stop', 'server', port=self.port):
+                try:
+                    self._process.send_signal(signal.SIGINT)
+                    self._process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self._process.kill()
+                    self._process.wait()
             self._process = None
 
+    def get_process_memory(self) -> Optional[int]:
+        """
+        Returns the server's peak resident memory plus any GPU memory it holds (bytes).
+        Best effort: reads /proc (Linux) and nvidia-smi; None if neither is available.
+        """
+        if not self._process or self._process.poll() is not None:
+            return None
+
+        total = None
+        try:
+            with open(f"/proc/{self._process.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        total = int(line.split()[1]) * 1024
+                        break
+        except OSError:
+            pass
+
+        try:
+            out = subprocess.run(
+                ["nvidia-smi", "--query-compute-apps=pid,used_memory", "--format=csv,noheader,nounits"],
+                capture_output=True, text=True, timeout=5
+            ).stdout
+            for line in out.splitlines():
+                pid, used_mib = [x.strip() for x in line.split(",")]
+                if int(pid) == self._process.pid:
+                    total = (total or 0) + int(used_mib) * 1024**2
+        except (OSError, ValueError, subprocess.SubprocessError):
+            pass
+
+        return total
+
+    def get_live_tokens_decoded(self) -> Optional[int]:
+        """
+        Tokens decoded so far by the in-flight generation, for live progress.
+        Returns None if the backend can't report it.
+        """
+        return None
+
+    def count_tokens(self, text: str) -> Optional[int]:
+        """Token count of text with the loaded model's tokenizer; None if the backend can't tell."""
+        return None
+
+    def _reset_last(self):
+        self.last_timings = {}
+        self.last_early_stop = None
+        self.last_reasoning = ""
+        self.last_thinking = None
+
+    def _set_reasoning(self, reasoning: str, answer: str) -> str:
+        """Records the reasoning trace of a non-streamed completion and returns the answer."""
+        if not reasoning:
+            reasoning, answer = split_reasoning(answer)
+        self.last_reasoning = reasoning.strip()
+        if self.last_reasoning:
+            self.last_thinking = {'chars': len(self.last_reasoning), 'tokens': None, 'seconds': None, 'budget_exceeded': False}
+        return answer
+
+    def _consume_stream(self, chunks: Iterator[Tuple[str, str]], start_t: float,
+                        early_stop: Optional[Dict[str, Any]] = None,
+                        thinking_budget: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Collects a stream of ('reasoning' | 'content', text) chunks and returns
+        the answer; the reasoning goes to last_reasoning / last_thinking (inline
+        <think> tags in content are split off as they arrive). Each chunk is
+        counted as one token, which is what llama-server and KoboldCpp stream.
+
+        Stops reading (the caller then closes the connection, which cancels the
+        generation) when:
+          - early_stop is set, a complete HTML document has closed in the answer
+            and the grace window (grace_seconds / grace_chars, whichever ends
+            first; both 0 = at once) has passed -> last_early_stop
+          - thinking_budget ({tokens, seconds}) is exceeded while still
+            reasoning -> last_thinking['budget_exceeded']
+        Raises TimeoutError once the primary timeout is exceeded.
+        """
+        watcher = HtmlCompletionWatcher() if early_stop is not None else None
+        splitter = ThinkTagSplitter()
+        reasoning_parts, content_parts = [], []
+        complete_t = None
+        think_start = think_end = None
+        think_tokens = 0
+        budget_exceeded = False
+        grace_seconds = (early_stop or {}).get("grace_seconds", 0) or 0
+        grace_chars = (early_stop or {}).get("grace_chars", 0) or 0
+        max_think_tokens = (thinking_budget or {}).get("tokens")
+        max_think_seconds = (thinking_budget or {}).get("seconds")
+        deadline = start_t + self.timeout_config['primary']
+        first_chunk = True
+
+        for kind, text in chunks:
+            now = time.time()
+            if first_chunk:
+                first_chunk = False
+                TRACER.instant('first chunk', 'generate')
+            pieces = splitter.feed(text) if kind == 'content' else [(kind, text)]
+            if any(k == 'reasoning' for k, _ in pieces):
+                think_start = think_start or now
+                think_tokens += 1
+            for piece_kind, piece in pieces:
+                if self.output_stream is not None:
+                    self.output_stream.write(piece_kind, piece)
+                if piece_kind == 'reasoning':
+                    reasoning_parts.append(piece)
+                    continue
+                content_parts.append(piece)
+                if think_start and think_end is None:
+                    think_end = now
+                if watcher and watcher.feed(piece) and complete_t is None:
+                    complete_t = now
+                    TRACER.instant('html complete', 'generate')
+            if now > deadline:
+                raise TimeoutError(f"no end of stream after {self.timeout_config['primary']}s")
+
+            if think_start and think_end is None and (
+                    (max_think_tokens and think_tokens > max_think_tokens) or
+                    (max_think_seconds and now - think_start > max_think_seconds)):
+                budget_exceeded = True
+                think_end = now
+                break
+
+            if complete_t is None:
+                continue
+            after_chars = watcher.length - watcher.complete_at
+            if ((not grace_seconds and not grace_chars) or
+                    (grace_seconds and now - complete_t >= grace_seconds) or
+                    (grace_chars and after_chars >= grace_chars)):
+                self.last_early_stop = {
+                    'html_complete_s': complete_t - start_t,
+                    'stopped_s': now - start_t,
+                    'chars_after_html': after_chars,
+                }
+                break
+        else:
+            for piece_kind, piece in splitter.flush():
+                if self.output_stream is not None:
+                    self.output_stream.write(piece_kind, piece)
+                (reasoning_parts if piece_kind == 'reasoning' else content_parts).append(piece)
+
+        answer = "".join(content_parts)
+        reasoning = "".join(reasoning_parts)
+        if think_start is None:
+            # No explicit reasoning channel or leading <think>; the template may have opened the tag
+            reasoning, answer = split_reasoning(answer)
+        self.last_reasoning = reasoning.strip()
+        if self.last_reasoning or budget_exceeded:
+            self.last_thinking = {
+                'chars': len(self.last_reasoning),
+                'tokens': think_tokens if think_start else None,
+                'seconds': ((think_end or time.time()) - think_start) if think_start else None,
+                'budget_exceeded': budget_exceeded,
+            }
+        return answer
+
+    # --- Replay Cache ---
+
+    def replay_key(self, model_path: Path, model_config: Dict[str, Any], prompt: str,
+                   early_stop: Optional[Dict[str, Any]] = None,
+                   thinking_budget: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Cache key for a request, or None if there is no cache or the request is not deterministic."""
+        if self.replay_cache is None or not is_deterministic(model_config['generation_params']):
+            return None
+        draft = model_config.get('draft')
+        identity = {
+            'backend': self.get_backend_name(),
+            'model': model_fingerprint(model_path),
+            'startup_args': [str(a) for a in model_config.get('startup_args', []) + self.extra_startup_args],
+            'draft': model_fingerprint(draft['model']) if draft else None,
+        }
+        return make_key(identity, prompt, model_config['generation_params'], model_config['prompt_template'],
+                        early_stop, thinking_budget)
+
+    def has_replay(self, model_path: Path, model_config: Dict[str, Any], prompt: str,
+                   early_stop: Optional[Dict[str, Any]] = None,
+                   thinking_budget: Optional[Dict[str, Any]] = None) -> bool:
+        key = self.replay_key(model_path, model_config, prompt, early_stop, thinking_budget)
+        return key is not None and self.replay_cache.contains(key)
+
+    def generate_or_replay(self, model_path: Path, model_config: Dict[str, Any], prompt: str,
+                           early_stop: Optional[Dict[str, Any]] = None,
+                           thinking_budget: Optional[Dict[str, Any]] = None) -> Tuple[Optional[str], float, bool, bool]:
+        """
+        generate() through the replay cache: a hit returns the stored answer and
+        restores last_* (timings, reasoning, early stop) with the original
+        generation time; a successful miss is stored. Only a miss needs the server.
+        """
+        self.last_replayed = False
+        key = self.replay_key(model_path, model_config, prompt, early_stop, thinking_budget)
+        entry = self.replay_cache.get(key) if key else None
+        if entry:
+            self._reset_last()
+            self.last_timings = entry['timings']
+            self.last_early_stop = entry['early_stop']
+            self.last_reasoning = entry['reasoning']
+            self.last_thinking = entry['thinking']
+            self.last_replayed = True
+            TRACER.instant('replay hit', 'generate', key=key[:12])
+            return entry['answer'], entry['seconds'], True, False
+
+        start_ns = TRACER.now_ns()
+        with TRACER.span('generate', 'generate', prompt_chars=len(prompt)) as span:
+            answer, secs, success, fallback = self.generate(
+                prompt=prompt,
+                generation_params=model_config['generation_params'],
+                prompt_template=model_config['prompt_template'],
+                early_stop=early_stop,
+                thinking_budget=thinking_budget
+            )
+            span.set(success=success, answer_chars=len(answer or ""))
+        self._trace_timings(start_ns)
+        # Fallback answers came from a timeout path and are not a faithful replay
+        if key and success and answer and not fallback:
+            self.replay_cache.put(key, {
+                'answer': answer, 'seconds': secs, 'timings': self.last_timings,
+                'early_stop': self.last_early_stop, 'reasoning': self.last_reasoning,
+                'thinking': self.last_thinking, 'model': Path(model_path).name,
+            })
+        return answer, secs, success, fallback
+
+    def _trace_timings(self, start_ns: int):
+        """Splits the generate span into prefill and decode using the server's timings (llama-server only)."""
+        prompt_ms = self.last_timings.get('prompt_ms')
+        predicted_ms = self.last_timings.get('predicted_ms')
+        if prompt_ms is None or predicted_ms is None:
+            return
+        prefill_ns = int(prompt_ms * 1e6)
+        TRACER.complete('prefill', start_ns, prefill_ns, 'generate', tokens=self.last_timings.get('prompt_n'))
+        TRACER.complete('decode', start_ns + prefill_ns, int(predicted_ms * 1e6), 'generate',
+                        tokens=self.last_timings.get('predicted_n'))
+
+    @staticmethod
+    def _sse_data(resp) -> Iterator[Dict[str, Any]]:
+        """Yields the JSON payloads of a server-sent-events response."""
+        for line in resp.iter_lines():
+            # Decode per line: SSE responses often carry no charset, and a line is never split mid-character
+            line = line.decode('utf-8', errors='replace')
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                return
+            yield json.loads(data)
+
     def get_process_stderr(self) -> str:
         if self._process and self._process.stderr:
             # Note: This reads strictly what's currently in buffer. 
@@ -95,12 +460,26 @@ class LLMBackend(ABC):
         """Returns the flag used to specify model path (e.g. ['-m', path] or ['--model', path])"""
         pass
 
+    @abstractmethod
+    def get_draft_flag(self, draft_path: Path) -> List[str]:
+        """Returns the flag used to specify a speculative decoding draft model"""
+        pass
+
     @abstractmethod
     def is_server_ready(self) -> bool:
         pass
 
     @abstractmethod
-    def generate(self, prompt: str, generation_params: Dict[str, Any], prompt_template: Dict[str, Any]) -> Tuple[Optional[str], float, bool, bool]:
+    def generate(self, prompt: str, generation_params: Dict[str, Any], prompt_template: Dict[str, Any],
+                 early_stop: Optional[Dict[str, Any]] = None,
+                 thinking_budget: Optional[Dict[str, Any]] = None) -> Tuple[Optional[str], float, bool, bool]:
+        """
+        Returns (answer, seconds, success, fallback); any reasoning trace is in
+        last_reasoning. With early_stop or thinking_budget set, the response is
+        streamed so it can be cut short (see _consume_stream); with an
+        output_stream set it is streamed to that file as it arrives. A generation
+        stopped by the thinking budget is returned as a failure.
+        """
         pass
 
 # --- IMPL: KoboldCpp ---
@@ -112,6 +491,9 @@ class KoboldBackend(LLMBackend):
     def get_model_flag(self, model_path: Path) -> List[str]:
         return ["--model", str(model_path)]
 
+    def get_draft_flag(self, draft_path: Path) -> List[str]:
+        return ["--draftmodel", str(draft_path)]
+
     def is_server_ready(self) -> bool:
         try:
             # Kobold check URL
@@ -135,7 +517,9 @@ class KoboldBackend(LLMBackend):
         p.setdefault("quiet", True)
         return p
 
-    def generate(self, prompt: str, generation_params: Dict[str, Any], prompt_template: Dict[str, Any]) -> Tuple[Optional[str], float, bool, bool]:
+    def generate(self, prompt: str, generation_params: Dict[str, Any], prompt_template: Dict[str, Any],
+                 early_stop: Optional[Dict[str, Any]] = None,
+                 thinking_budget: Optional[Dict[str, Any]] = None) -> Tuple[Optional[str], float, bool, bool]:
         # 1. Apply Template
         # Kobold typically handles raw strings, but if you have a system prompt in YAML, handle it here
         sys = prompt_template.get("system_prompt", "")
@@ -149,23 +533,92 @@ class KoboldBackend(LLMBackend):
         # 3. Request
         url = f"{self._api_base_url}/api/v1/generate"
         start_t = time.time()
-        fallback = False
+        self._reset_last()
+
+        if early_stop is not None or thinking_budget or self.output_stream is not None:
+            return self._generate_stream(payload, start_t, early_stop, thinking_budget)
 
         try:
             resp = requests.post(url, json=payload, timeout=self.timeout_config['primary'])
             resp.raise_for_status()
             data = resp.json()
             
-            text = data['results'][0]['text']
+            text = self._set_reasoning("", data['results'][0]['text'])
+            self.last_timings = self._read_perf_timings()
             return text.strip(), time.time() - start_t, True, False
 
-        except requests.exceptions.Timeout:
-            print("  [WARN] Primary timeout, attempting Kobold fallback/check...")
-            fallback = True
-            # Implement Kobold specific "check" endpoint logic if needed here
-            # For brevity, returning None, but you can paste your check_url logic here
-            return None, time.time() - start_t, False, True
         except Exception as e:
+            if is_timeout(e):
+                print("  [WARN] Primary timeout, attempting Kobold fallback/check...")
+                # Implement Kobold specific "check" endpoint logic if needed here
+                # For brevity, returning None, but you can paste your check_url logic here
+                return None, time.time() - start_t, False, True
+            print(f"  [ERROR] Gen failed: {e}")
+            return None, time.time() - start_t, False, False
+
+    def _read_perf_timings(self) -> Dict[str, Any]:
+        """
+        Prefill/decode timings of the last generation from /api/extra/perf, in
+        llama-server's timing keys. Best effort: {} if unavailable.
+        """
+        try:
+            res = requests.get(f"{self._api_base_url}/api/extra/perf", timeout=2)
+            perf = res.json() if res.status_code == 200 else {}
+        except Exception:
+            return {}
+        process_s, eval_s = perf.get("last_process"), perf.get("last_eval")
+        if process_s is None or eval_s is None:
+            return {}
+        timings = {'prompt_ms': process_s * 1000, 'predicted_ms': eval_s * 1000}
+        if perf.get("last_input_count") is not None:
+            timings['prompt_n'] = perf["last_input_count"]
+            if process_s > 0:
+                timings['prompt_per_second'] = perf["last_input_count"] / process_s
+        if perf.get("last_token_count") is not None:
+            timings['predicted_n'] = perf["last_token_count"]
+            if eval_s > 0:
+                timings['predicted_per_second'] = perf["last_token_count"] / eval_s
+        return timings
+
+    def count_tokens(self, text: str) -> Optional[int]:
+        try:
+            res = requests.post(f"{self._api_base_url}/api/extra/tokencount", json={"prompt": text}, timeout=30)
+            res.raise_for_status()
+            return int(res.json()["value"])
+        except Exception:
+            return None
+
+    def _abort(self):
+        try:
+            requests.post(f"{self._api_base_url}/api/extra/abort", timeout=5)
+        except Exception as e:
+            print(f"  [WARN] Abort request failed: {e}")
+
+    def _generate_stream(self, payload: Dict[str, Any], start_t: float, early_stop: Optional[Dict[str, Any]],
+                         thinking_budget: Optional[Dict[str, Any]]) -> Tuple[Optional[str], float, bool, bool]:
+        url = f"{self._api_base_url}/api/extra/generate/stream"
+        try:
+            with requests.post(url, json=payload, stream=True, timeout=self.timeout_config['primary']) as resp:
+                resp.raise_for_status()
+                chunks = (('content', event.get("token", "")) for event in self._sse_data(resp))
+                text = self._consume_stream(chunks, start_t, early_stop, thinking_budget)
+            budget_exceeded = bool(self.last_thinking and self.last_thinking['budget_exceeded'])
+            if self.last_early_stop or budget_exceeded:
+                # Kobold keeps generating after a disconnect unless told to stop
+                self._abort()
+            if budget_exceeded:
+                print(f"  [WARN] Thinking budget exceeded ({self.last_thinking['tokens']} tokens). Stopped.")
+                return None, time.time() - start_t, False, False
+            gen_time = time.time() - start_t
+            if not self.last_early_stop:
+                # The stream carries no timings; a generation that ran to the end left them in /api/extra/perf
+                self.last_timings = self._read_perf_timings()
+            return text.strip(), gen_time, True, False
+        except Exception as e:
+            if is_timeout(e):
+                print("  [WARN] Primary timeout while streaming.")
+                self._abort()
+                return None, time.time() - start_t, False, True
             print(f"  [ERROR] Gen failed: {e}")
             return None, time.time() - start_t, False, False
 
@@ -178,6 +631,9 @@ class LlamaCppBackend(LLMBackend):
     def get_model_flag(self, model_path: Path) -> List[str]:
         return ["-m", str(model_path)]
 
+    def get_draft_flag(self, draft_path: Path) -> List[str]:
+        return ["-md", str(draft_path)]
+
     def is_server_ready(self) -> bool:
         try:
             res = requests.get(f"{self._api_base_url}/health", timeout=1)
@@ -185,7 +641,35 @@ class LlamaCppBackend(LLMBackend):
         except:
             return False
 
-    def generate(self, prompt: str, generation_params: Dict[str, Any], prompt_template: Dict[str, Any]) -> Tuple[Optional[str], float, bool, bool]:
+    def count_tokens(self, text: str) -> Optional[int]:
+        try:
+            res = requests.post(f"{self._api_base_url}/tokenize", json={"content": text}, timeout=30)
+            res.raise_for_status()
+            return len(res.json()["tokens"])
+        except Exception:
+            return None
+
+    def get_live_tokens_decoded(self) -> Optional[int]:
+        try:
+            # /slots is enabled by default in llama-server (disabled with --no-slots)
+            res = requests.get(f"{self._api_base_url}/slots", timeout=0.5)
+            if res.status_code != 200:
+                return None
+            decoded = 0
+            for slot in res.json():
+                if not slot.get("is_processing"):
+                    continue
+                next_token = slot.get("next_token", {})
+                # Newer servers report next_token as a list (one entry per sequence)
+                for entry in next_token if isinstance(next_token, list) else [next_token]:
+                    decoded += entry.get("n_decoded", 0)
+            return decoded
+        except Exception:
+            return None
+
+    def generate(self, prompt: str, generation_params: Dict[str, Any], prompt_template: Dict[str, Any],
+                 early_stop: Optional[Dict[str, Any]] = None,
+                 thinking_budget: Optional[Dict[str, Any]] = None) -> Tuple[Optional[str], float, bool, bool]:
         # 1. Apply Template (OpenAI Chat Format)
         messages = []
         if prompt_template.get("system_prompt"):
@@ -203,6 +687,10 @@ class LlamaCppBackend(LLMBackend):
         # 3. Request
         url = f"{self._api_base_url}/v1/chat/completions"
         start_t = time.time()
+        self._reset_last()
+
+        if early_stop is not None or thinking_budget or self.output_stream is not None:
+            return self._generate_stream(url, payload, start_t, early_stop, thinking_budget)
         
         try:
             # Non-streaming for simplicity in this example, 
@@ -211,9 +699,50 @@ class LlamaCppBackend(LLMBackend):
             resp.raise_for_status()
             data = resp.json()
             
-            text = data['choices'][0]['message']['content']
+            message = data['choices'][0]['message']
+            # llama-server returns the trace separately when started with --reasoning-format
+            text = self._set_reasoning(message.get('reasoning_content') or "", message.get('content') or "")
+            # llama-server reports prefill/decode timings (and draft_n / draft_n_accepted
+            # when a draft model is loaded) alongside the completion
+            self.last_timings = data.get('timings', {}) or {}
             return text.strip(), time.time() - start_t, True, False
             
         except Exception as e:
+            # Timeouts are reported the same way by every backend, streamed or not
+            if is_timeout(e):
+                print("  [WARN] Primary timeout.")
+                return None, time.time() - start_t, False, True
             print(f"  [ERROR] Gen failed: {e}")
-            return None, time.time() - start_t, False, False
\ No newline at end of file
+            return None, time.time() - start_t, False, False
+
+    def _generate_stream(self, url: str, payload: Dict[str, Any], start_t: float, early_stop: Optional[Dict[str, Any]],
+                         thinking_budget: Optional[Dict[str, Any]]) -> Tuple[Optional[str], float, bool, bool]:
+        payload = dict(payload, stream=True)
+
+        def chunks(resp):
+            for chunk in self._sse_data(resp):
+                # The final chunk carries the timings (never reached if we stop early)
+                if chunk.get('timings'):
+                    self.last_timings = chunk['timings']
+                for choice in chunk.get('choices', []):
+                    delta = choice.get('delta') or {}
+                    if delta.get('reasoning_content'):
+                        yield 'reasoning', delta['reasoning_content']
+                    if delta.get('content'):
+                        yield 'content', delta['content']
+
+        try:
+            # Closing the connection (leaving the with block) makes llama-server cancel the task
+            with requests.post(url, json=payload, stream=True, timeout=self.timeout_config['primary']) as resp:
+                resp.raise_for_status()
+                text = self._consume_stream(chunks(resp), start_t, early_stop, thinking_budget)
+            if self.last_thinking and self.last_thinking['budget_exceeded']:
+                print(f"  [WARN] Thinking budget exceeded ({self.last_thinking['tokens']} tokens). Stopped.")
+                return None, time.time() - start_t, False, False
+            return text.strip(), time.time() - start_t, True, False
+        except Exception as e:
+            if is_timeout(e):
+                print("  [WARN] Primary timeout while streaming.")
+                return None, time.time() - start_t, False, True
+            print(f"  [ERROR] Gen failed: {e}")
+            return None, time.time() - start_t, False, False
@@ -0,0 +1,86 @@
+# utils/blob_store.py
+import os
+import hashlib
+import shutil
+from pathlib import Path
+from typing import Optional
+
+HASH_ALGORITHM = "sha256"
+CHUNK_SIZE = 1024 * 1024
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.new(HASH_ALGORITHM, data).hexdigest()
+
+def hash_file(path: Path) -> str:
+    """Streams a file through the content hash (never loads it whole)."""
+    h = hashlib.new(HASH_ALGORITHM)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def replace_text(path: Path, text: str):
+    """
+    Writes a file by renaming a temp file over it. Files under results/ may
+    be links into the blob store (dedupe_results.py --link), and writing
+    into a link would change the blob and every other copy linked to it;
+    the rename only replaces this one name.
+    """
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(text, encoding='utf-8')
+    os.replace(tmp, path)
+
+class BlobStore:
+    """
+    Content-addressed file store: each unique file is kept once at
+    <root>/<hash[:2]>/<hash><suffix>. The original suffix is kept so blobs
+    served directly (e.g. .html behind a symlink) get the right MIME type.
+    """
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def path_for(self, digest: str, suffix: str = "") -> Path:
+        return self.root / digest[:2] / f"{digest}{suffix}"
+
+    def has(self, digest: str, suffix: str = "") -> bool:
+        return self.path_for(digest, suffix).exists()
+
+    def put(self, path: Path, digest: Optional[str] = None) -> Path:
+        """Copies a file into the store (if not already present) and returns its blob path."""
+        path = Path(path)
+        digest = digest or hash_file(path)
+        blob = self.path_for(digest, path.suffix)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp = blob.with_name(blob.name + ".tmp")
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, blob)
+        return blob
+
+    def link_into(self, blob: Path, target: Path, mode: str):
+        """
+        Atomically replaces target with a link to blob.
+        mode: 'hardlink' or 'symlink' (relative, so the tree stays relocatable).
+        Tools that later rewrite a linked file must replace it (replace_text,
+        os.replace), never open it for writing.
+        """
+        target = Path(target)
+        tmp = target.with_name(f".{target.name}.linktmp")
+        if tmp.exists() or tmp.is_symlink():
+            tmp.unlink()
+        if mode == 'hardlink':
+            os.link(blob, tmp)
+        elif mode == 'symlink':
+            os.symlink(os.path.relpath(blob, target.parent), tmp)
+        else:
+            raise ValueError(f"Unknown link mode: {mode} (expected 'hardlink' or 'symlink')")
+        os.replace(tmp, target)
+
+    @staticmethod
+    def materialize(target: Path):
+        """Replaces a symlink/hardlink with an independent copy of its content."""
+        target = Path(target)
+        tmp = target.with_name(f".{target.name}.copytmp")
+        shutil.copyfile(target.resolve(), tmp)
+        os.replace(tmp, target)
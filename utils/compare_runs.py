@@ -0,0 +1,484 @@
+# utils/compare_runs.py
+import os
+import re
+import math
+import html
+import argparse
+import datetime
+from pathlib import Path
+
+from static_viewer import get_test_types, parse_result_filename
+from transcript_store import read_transcript, iter_transcripts
+
+# --- Configuration ---
+RESULTS_ROOT = 'results'            # Folder holding the dated run folders (YYYY.MM.DD)
+RESULTS_SUBDIR = 'results'          # Sub-folder of each dated run holding the .md transcripts
+PROMPTS_DIR = 'code_prompts'
+OUTPUT_HTML_FILENAME = 'results/comparison.html'
+OUTPUT_MD_FILENAME = 'results/comparison.md'
+
+# Prompts used by the early runs that no longer exist in code_prompts/
+LEGACY_TYPES = ['aiming', 'keycontrols', 'particles']
+
+# A change is only flagged when the paired test is significant AND the
+# geometric-mean change across prompts is at least this large.
+SIGNIFICANCE_LEVEL = 0.05
+MIN_CHANGE_PCT = 10.0
+
+DATE_DIR_PATTERN = re.compile(r'^\d{4}\.\d{2}\.\d{2}$')
+
+# Matches every timing comment format the runner has used over time:
+#   <!-- 94.60s -->   <!-- Generation Time: 129.94s -->   <!-- Time: 24.75s -->
+TIME_PATTERN = re.compile(r'<!--\s*(?:(?:Generation\s+)?Time:\s*)?([0-9]+(?:\.[0-9]+)?)s\s*-->')
+META_MARKER = '<!-- Benchmark Info -->'
+TOKENS_PATTERN = re.compile(r'<!--\s*Tokens/s:\s*([0-9]+(?:\.[0-9]+)?)\s*-->')
+# Streaming runs cut short after </html> (run_benchmarks.py --early-stop) have
+# truncated timings and are compared as their own series
+EARLY_STOP_MARKER = '<!-- Early Stop:'
+EARLY_STOP_SUFFIX = ' [early stop]'
+
+# --- Helper Functions ---
+
+def get_run_dates(results_root):
+    """Returns the dated run folders (oldest first) that contain transcripts."""
+    if not os.path.isdir(results_root):
+        print(f"Error: Results root not found: {results_root}")
+        return []
+
+    dates = []
+    for name in os.listdir(results_root):
+        if DATE_DIR_PATTERN.match(name) and os.path.isdir(os.path.join(results_root, name, RESULTS_SUBDIR)):
+            dates.append(name)
+    dates.sort()
+    return dates
+
+def parse_transcript(path):
+    """
+    Reads a .md transcript and returns its generation time (seconds), the
+    length of the generated text (excluding the appended metadata comments)
+    and the server-reported tokens/s if recorded.
+    Returns None if no timing comment is present.
+    """
+    try:
+        content = read_transcript(path)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"  [WARN] Could not read {path}: {e}")
+        return None
+
+    matches = list(TIME_PATTERN.finditer(content))
+    if not matches:
+        return None
+
+    last = matches[-1]
+    meta_start = content.rfind(META_MARKER)
+    text_end = meta_start if meta_start != -1 else last.start()
+    gen_time = float(last.group(1))
+    chars = len(content[:text_end].rstrip())
+    tokens = TOKENS_PATTERN.search(content, text_end)
+
+    return {
+        'time': gen_time,
+        'chars': chars,
+        'chars_per_sec': chars / gen_time if gen_time > 0 else 0.0,
+        'early_stop': EARLY_STOP_MARKER in content[text_end:],
+        'tokens_per_sec': float(tokens.group(1)) if tokens else None,
+    }
+
+def collect_runs(results_root, valid_types):
+    """
+    Scans every dated folder and groups transcripts by (model, prompt) and date.
+
+    Dated folders carry forward copies of older transcripts for models that were
+    not rerun, so each transcript (identified by model, prompt and timestamp) is
+    only attributed to the first date it appears in. Fallback (timed-out) runs
+    are skipped since their timings are not comparable, and early-stopped runs
+    are grouped under "<model> [early stop]".
+    """
+    runs = {}
+    seen = set()
+    dates = get_run_dates(results_root)
+
+    for date in dates:
+        source_dir = os.path.join(results_root, date, RESULTS_SUBDIR)
+        for path in iter_transcripts(Path(source_dir)):
+            file = path.name
+            if file.endswith('_fallback.md'):
+                continue
+            parsed = parse_result_filename(file, valid_types, extension='md')
+            if not parsed:
+                continue
+
+            key = (parsed['model'], parsed['type'], parsed['timestamp'])
+            if key in seen:
+                continue
+            seen.add(key)
+
+            sample = parse_transcript(path)
+            if sample is None:
+                continue
+
+            model = parsed['model'] + (EARLY_STOP_SUFFIX if sample['early_stop'] else '')
+            by_date = runs.setdefault((model, parsed['type']), {})
+            by_date.setdefault(date, []).append(sample)
+
+    return runs, dates
+
+def wilcoxon_signed_rank(diffs):
+    """
+    Two-sided Wilcoxon signed-rank test on paired differences.
+    Uses the exact null distribution for small samples and the normal
+    approximation otherwise. Returns 1.0 when there is nothing to test.
+    """
+    diffs = [d for d in diffs if d != 0]
+    n = len(diffs)
+    if n == 0:
+        return 1.0
+
+    # Rank absolute differences, averaging ties
+    order = sorted(range(n), key=lambda i: abs(diffs[i]))
+    ranks = [0.0] * n
+    i = 0
+    while i < n:
+        j = i
+        while j + 1 < n and abs(diffs[order[j + 1]]) == abs(diffs[order[i]]):
+            j += 1
+        avg_rank = (i + j) / 2 + 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = avg_rank
+        i = j + 1
+
+    w_plus = sum(r for r, d in zip(ranks, diffs) if d > 0)
+    total = n * (n + 1) / 2
+    w = min(w_plus, total - w_plus)
+
+    if n <= 20:
+        # Exact distribution of the rank sum (ranks doubled to keep ties integral)
+        scaled = [int(round(r * 2)) for r in ranks]
+        max_sum = sum(scaled)
+        counts = [0] * (max_sum + 1)
+        counts[0] = 1
+        for r in scaled:
+            for s in range(max_sum, r - 1, -1):
+                counts[s] += counts[s - r]
+        limit = int(round(w * 2))
+        p = 2 * sum(counts[:limit + 1]) / (2 ** n)
+        return min(p, 1.0)
+
+    mean = total / 2
+    sd = math.sqrt(n * (n + 1) * (2 * n + 1) / 24)
+    z = (w - mean + 0.5) / sd
+    p = math.erfc(-z / math.sqrt(2))
+    return min(p, 1.0)
+
+def classify(ratio, p_value, higher_is_better):
+    """Turns a candidate/baseline ratio and p-value into a verdict string."""
+    change_pct = (ratio - 1) * 100
+    if p_value >= SIGNIFICANCE_LEVEL or abs(change_pct) < MIN_CHANGE_PCT:
+        return 'unchanged'
+    improved = change_pct > 0 if higher_is_better else change_pct < 0
+    return 'improvement' if improved else 'regression'
+
+def compare_pair(runs, model, prompts, baseline, candidate):
+    """Compares one model between two dates over the prompts run on both."""
+    details = []
+    time_logs = []
+    tput_logs = []
+
+    for prompt in prompts:
+        by_date = runs[(model, prompt)]
+        base = by_date.get(baseline)
+        cand = by_date.get(candidate)
+        if not base or not cand:
+            continue
+
+        base_time = sum(s['time'] for s in base) / len(base)
+        cand_time = sum(s['time'] for s in cand) / len(cand)
+        base_tput = sum(s['chars_per_sec'] for s in base) / len(base)
+        cand_tput = sum(s['chars_per_sec'] for s in cand) / len(cand)
+        if min(base_time, cand_time, base_tput, cand_tput) <= 0:
+            continue
+
+        time_logs.append(math.log(cand_time / base_time))
+        tput_logs.append(math.log(cand_tput / base_tput))
+        details.append({
+            'prompt': prompt,
+            'base_time': base_time,
+            'cand_time': cand_time,
+            'base_tput': base_tput,
+            'cand_tput': cand_tput,
+        })
+
+    if not details:
+        return None
+
+    time_ratio = math.exp(sum(time_logs) / len(time_logs))
+    tput_ratio = math.exp(sum(tput_logs) / len(tput_logs))
+    time_p = wilcoxon_signed_rank(time_logs)
+    tput_p = wilcoxon_signed_rank(tput_logs)
+
+    return {
+        'model': model,
+        'baseline': baseline,
+        'candidate': candidate,
+        'n': len(details),
+        'time_ratio': time_ratio,
+        'time_p': time_p,
+        'time_verdict': classify(time_ratio, time_p, higher_is_better=False),
+        'tput_ratio': tput_ratio,
+        'tput_p': tput_p,
+        'tput_verdict': classify(tput_ratio, tput_p, higher_is_better=True),
+        'details': details,
+    }
+
+def build_comparisons(runs, dates, baseline=None, candidate=None):
+    """
+    Builds the list of model comparisons. With an explicit baseline/candidate
+    date only that pair is compared; otherwise every model is compared between
+    each pair of consecutive dates on which it was (re)run. A candidate alone
+    compares each model run on that date with its previous run.
+    """
+    prompts_by_model = {}
+    for model, prompt in runs:
+        prompts_by_model.setdefault(model, []).append(prompt)
+
+    comparisons = []
+    for model in sorted(prompts_by_model, key=str.lower):
+        prompts = sorted(prompts_by_model[model])
+        if baseline and candidate:
+            pairs = [(baseline, candidate)]
+        else:
+            model_dates = sorted({d for p in prompts for d in runs[(model, p)]})
+            pairs = list(zip(model_dates, model_dates[1:]))
+            if candidate:
+                pairs = [pair for pair in pairs if pair[1] == candidate]
+
+        for base, cand in pairs:
+            comparison = compare_pair(runs, model, prompts, base, cand)
+            if comparison:
+                comparisons.append(comparison)
+
+    return comparisons
+
+def format_change(ratio):
+    return f"{(ratio - 1) * 100:+.1f}%"
+
+# --- Report Writers ---
+
+def render_markdown(comparisons, generated_at):
+    lines = [
+        "# Cross-Run Comparison",
+        "",
+        f"Generated {generated_at}. Latency is generation time; throughput is output chars/sec.",
+        f"Changes are flagged when the Wilcoxon signed-rank test over prompts gives p < {SIGNIFICANCE_LEVEL}"
+        f" and the geometric-mean change is at least {MIN_CHANGE_PCT:.0f}%.",
+        "",
+    ]
+
+    if not comparisons:
+        lines.append("No model was run on more than one date.")
+        return "\n".join(lines) + "\n"
+
+    lines.extend([
+        "| Model | Baseline | Candidate | Prompts | Latency | p | Verdict | Throughput | p | Verdict |",
+        "|---|---|---|---|---|---|---|---|---|---|",
+    ])
+    for c in comparisons:
+        lines.append(
+            f"| {c['model']} | {c['baseline']} | {c['candidate']} | {c['n']} "
+            f"| {format_change(c['time_ratio'])} | {c['time_p']:.3f} | {c['time_verdict']} "
+            f"| {format_change(c['tput_ratio'])} | {c['tput_p']:.3f} | {c['tput_verdict']} |"
+        )
+
+    lines.extend(["", "## Details", ""])
+    for c in comparisons:
+        lines.extend([
+            f"### {c['model']} ({c['baseline']} → {c['candidate']})",
+            "",
+            "| Prompt | Baseline s | Candidate s | Latency | Baseline chars/s | Candidate chars/s | Throughput |",
+            "|---|---|---|---|---|---|---|",
+        ])
+        for d in c['details']:
+            lines.append(
+                f"| {d['prompt']} | {d['base_time']:.2f} | {d['cand_time']:.2f} "
+                f"| {format_change(d['cand_time'] / d['base_time'])} "
+                f"| {d['base_tput']:.1f} | {d['cand_tput']:.1f} "
+                f"| {format_change(d['cand_tput'] / d['base_tput'])} |"
+            )
+        lines.append("")
+
+    return "\n".join(lines) + "\n"
+
+def render_html(comparisons, generated_at):
+    def verdict_cell(verdict):
+        return f'<td class="{verdict}">{html.escape(verdict)}</td>'
+
+    if comparisons:
+        summary_rows = []
+        for c in comparisons:
+            summary_rows.append(
+                "<tr>"
+                f"<td>{html.escape(c['model'])}</td>"
+                f"<td>{c['baseline']}</td><td>{c['candidate']}</td><td>{c['n']}</td>"
+                f"<td>{format_change(c['time_ratio'])}</td><td>{c['time_p']:.3f}</td>{verdict_cell(c['time_verdict'])}"
+                f"<td>{format_change(c['tput_ratio'])}</td><td>{c['tput_p']:.3f}</td>{verdict_cell(c['tput_verdict'])}"
+                "</tr>"
+            )
+
+        detail_sections = []
+        for c in comparisons:
+            rows = []
+            for d in c['details']:
+                rows.append(
+                    "<tr>"
+                    f"<td>{html.escape(d['prompt'])}</td>"
+                    f"<td>{d['base_time']:.2f}</td><td>{d['cand_time']:.2f}</td>"
+                    f"<td>{format_change(d['cand_time'] / d['base_time'])}</td>"
+                    f"<td>{d['base_tput']:.1f}</td><td>{d['cand_tput']:.1f}</td>"
+                    f"<td>{format_change(d['cand_tput'] / d['base_tput'])}</td>"
+                    "</tr>"
+                )
+            detail_sections.append(
+                f"<details><summary>{html.escape(c['model'])} ({c['baseline']} &rarr; {c['candidate']})</summary>"
+                "<table><tr><th>Prompt</th><th>Baseline s</th><th>Candidate s</th><th>Latency</th>"
+                "<th>Baseline chars/s</th><th>Candidate chars/s</th><th>Throughput</th></tr>"
+                + "\n".join(rows) +
+                "</table></details>"
+            )
+
+        body_content = (
+            "<table><tr><th>Model</th><th>Baseline</th><th>Candidate</th><th>Prompts</th>"
+            "<th>Latency</th><th>p</th><th>Verdict</th><th>Throughput</th><th>p</th><th>Verdict</th></tr>"
+            + "\n".join(summary_rows) +
+            "</table>\n<h2>Details</h2>\n" + "\n".join(detail_sections)
+        )
+    else:
+        body_content = '<p class="info-message">No model was run on more than one date.</p>'
+
+    html_template = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Cross-Run Comparison</title>
+    <style>
+        body {
+            font-family: sans-serif;
+            margin: 15px;
+            background-color: #f4f4f4;
+        }
+        h1, h2 {
+            color: #333;
+            margin-top: 0;
+        }
+        table {
+            border-collapse: collapse;
+            background-color: #fff;
+            margin-bottom: 20px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        }
+        th, td {
+            border: 1px solid #ccc;
+            padding: 4px 8px;
+            font-size: 0.9em;
+            text-align: right;
+        }
+        th {
+            background-color: #eee;
+        }
+        td:first-child {
+            text-align: left;
+        }
+        td.regression {
+            color: red;
+            background-color: #fee;
+            font-weight: bold;
+        }
+        td.improvement {
+            color: #060;
+            background-color: #efe;
+            font-weight: bold;
+        }
+        details {
+            margin-bottom: 10px;
+        }
+        summary {
+            cursor: pointer;
+            font-weight: bold;
+            margin-bottom: 5px;
+        }
+        .info-message {
+            margin-top: 20px;
+            padding: 15px;
+            background-color: #eef;
+            border: 1px solid #ccd;
+            border-radius: 5px;
+            color: #336;
+        }
+    </style>
+</head>
+<body>
+
+    <h1>Cross-Run Comparison</h1>
+    <p class="info-message">__DESCRIPTION__</p>
+
+    __BODY_CONTENT__
+
+</body>
+</html>"""
+
+    description = (
+        f"Generated {html.escape(generated_at)}. Latency is generation time; throughput is output chars/sec. "
+        f"Changes are flagged when the Wilcoxon signed-rank test over prompts gives p &lt; {SIGNIFICANCE_LEVEL} "
+        f"and the geometric-mean change is at least {MIN_CHANGE_PCT:.0f}%."
+    )
+    return html_template.replace('__DESCRIPTION__', description) \
+                        .replace('__BODY_CONTENT__', body_content)
+
+# --- Main Logic ---
+
+def write_comparison_report(baseline=None, candidate=None, results_root=RESULTS_ROOT,
+                            output_md=OUTPUT_MD_FILENAME, output_html=OUTPUT_HTML_FILENAME):
+    """Builds the comparison and writes the markdown and HTML reports. Returns the comparisons."""
+    types_data = get_test_types(PROMPTS_DIR)
+    if types_data.get('error'):
+        print(f"Error: {types_data['error']}")
+        return None
+    valid_types = sorted(set(types_data['types']) | set(LEGACY_TYPES))
+
+    runs, dates = collect_runs(results_root, valid_types)
+    print(f"Found {len(runs)} model/prompt combinations across {len(dates)} dated runs.")
+
+    comparisons = build_comparisons(runs, dates, baseline, candidate)
+    regressions = [c for c in comparisons if 'regression' in (c['time_verdict'], c['tput_verdict'])]
+    improvements = [c for c in comparisons if 'improvement' in (c['time_verdict'], c['tput_verdict'])]
+
+    generated_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        with open(output_md, 'w', encoding='utf-8') as f:
+            f.write(render_markdown(comparisons, generated_at))
+        with open(output_html, 'w', encoding='utf-8') as f:
+            f.write(render_html(comparisons, generated_at))
+    except OSError as e:
+        print(f"Error: Failed to write comparison report: {e}")
+        return None
+
+    print(f"Comparisons: {len(comparisons)} | Regressions: {len(regressions)} | Improvements: {len(improvements)}")
+    for c in regressions:
+        print(f"  [REGRESSION] {c['model']} {c['baseline']} -> {c['candidate']}: "
+              f"latency {format_change(c['time_ratio'])}, throughput {format_change(c['tput_ratio'])}")
+    print(f"Successfully generated: {output_md}, {output_html}")
+    return comparisons
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare benchmark timings across dated result folders.")
+    parser.add_argument("--baseline", type=str, default=None, help="Baseline date folder (e.g. 2026.01.20).")
+    parser.add_argument("--candidate", type=str, default=None, help="Candidate date folder (e.g. 2026.02.04).")
+    args = parser.parse_args()
+
+    if bool(args.baseline) != bool(args.candidate):
+        parser.error("--baseline and --candidate must be given together")
+
+    write_comparison_report(args.baseline, args.candidate)
+
+if __name__ == "__main__":
+    main()
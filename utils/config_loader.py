@@ -1,5 +1,4 @@
 # utils/config_loader.py
-import yaml
 import os
 from pathlib import Path
 from typing import Dict, Any, List, Optional
@@ -14,6 +13,7 @@ class ConfigLoader:
         if not self.config_path.exists():
             raise FileNotFoundError(f"Config file not found at {config_path}")
 
+        import yaml  # Here rather than at the top: importing this module stays cheap
         with open(self.config_path, 'r') as f:
             self._data = yaml.safe_load(f)
 
@@ -40,6 +40,16 @@ class ConfigLoader:
     def server_config(self):
         return self._data.get('server', {})
 
+    @property
+    def pool_instances(self) -> List[Dict[str, Any]]:
+        """Per-instance settings for running several backend servers at once (run_benchmarks.py --pool)."""
+        return self._data.get('pool', {}).get('instances', [])
+
+    @property
+    def context_scaling_config(self) -> Dict[str, Any]:
+        """Settings for run_benchmarks.py --context-scaling (see context_scaling.py)."""
+        return self._data.get('context_scaling') or {}
+
     @property
     def default_gen_params(self) -> Dict[str, Any]:
         return self._data.get('default_generation_params', {}).copy()
@@ -61,7 +71,11 @@ class ConfigLoader:
         result = {
             "startup_args": [],
             "generation_params": self.default_gen_params,
-            "prompt_template": {}
+            "prompt_template": {},
+            "draft": None,
+            "sweep": None,
+            "early_stop": self.resolve_early_stop(None),
+            "thinking_budget": None
         }
 
         # Find match
@@ -94,8 +108,54 @@ class ConfigLoader:
 
             # Prompt Templates
             result["prompt_template"] = matched_rule.get("prompt_template", {})
+
+            # Speculative Decoding (optional draft model)
+            result["draft"] = self._resolve_draft(matched_rule.get("draft"))
+
+            # Parameter Sweep definition (used by run_benchmarks.py --sweep)
+            result["sweep"] = matched_rule.get("sweep")
+
+            # Streaming early-stop once the HTML document is complete
+            result["early_stop"] = self.resolve_early_stop(matched_rule.get("early_stop"))
+
+            # Cap on reasoning ({tokens, seconds}); generations exceeding it are stopped
+            result["thinking_budget"] = matched_rule.get("thinking_budget")
             
         return result
 
+    def resolve_early_stop(self, rule_value: Any) -> Optional[Dict[str, Any]]:
+        """
+        Merges a rule's 'early_stop' (true/false or a dict of overrides) over
+        server.early_stop. Returns None when early stopping is disabled.
+        """
+        settings = {"enabled": False, "grace_seconds": 0, "grace_chars": 0}
+        settings.update(self.server_config.get("early_stop") or {})
+        if isinstance(rule_value, bool):
+            settings["enabled"] = rule_value
+        elif isinstance(rule_value, dict):
+            settings.update(rule_value)
+            settings["enabled"] = rule_value.get("enabled", True)
+        if not settings.pop("enabled"):
+            return None
+        return settings
+
+    def _resolve_draft(self, draft: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Normalizes a rule's 'draft' block. Relative draft model paths are
+        resolved against paths.models.
+        """
+        if not draft or not draft.get("model"):
+            return None
+
+        draft_path = Path(draft["model"]).expanduser()
+        if not draft_path.is_absolute() and self.paths.get('models'):
+            draft_path = self.paths['models'] / draft_path
+
+        return {
+            "model": draft_path.resolve(),
+            "startup_args": draft.get("startup_args", []),
+            "generation_params": draft.get("generation_params", {})
+        }
+
 # Singleton instance for easy import, or instantiate in main
 # config = ConfigLoader() 
\ No newline at end of file
@@ -0,0 +1,219 @@
+# utils/context_scaling.py
+import html
+import math
+import random
+from typing import Dict, Any, List, Optional, Callable
+
+# Context scaling settings live at the top level of config.yaml, e.g.
+#
+#   context_scaling:
+#     lengths: [2048, 8192, 32768, 65536]   # target prompt lengths in tokens
+#     prompts: ["ball_bound"]               # optional subset of prompt stems
+#     filler: "stack"                       # stack (other prompts) | synthetic (generated code)
+#     max_tokens: 256                       # decode length per request
+#     seed: 0
+#     kv_cache:                             # name -> extra startup args
+#       f16: []
+#       q8_0: ["--cache-type-k", "q8_0", "--cache-type-v", "q8_0"]
+
+DEFAULT_LENGTHS = [2048, 8192, 32768, 65536]
+DEFAULT_MAX_TOKENS = 256
+DEFAULT_KV_CACHE = {'default': []}
+CHARS_PER_TOKEN = 3.5          # Starting estimate; refined with the server's tokenizer when it has one
+CONTEXT_MARGIN = 512           # Template and chat-format tokens on top of the prompt
+CONTEXT_FLAGS = {'llamacpp': '--ctx-size', 'koboldcpp': '--contextsize'}
+
+FILLER_HEADER = "Background material for reference only. It is not part of the task.\n\n"
+TASK_HEADER = "\n\n---\n\nTask:\n"
+
+def scaling_settings(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    config = config or {}
+    return {
+        'lengths': sorted(int(n) for n in config.get('lengths', DEFAULT_LENGTHS)),
+        'prompts': config.get('prompts'),
+        'filler': config.get('filler', 'stack'),
+        'max_tokens': config.get('max_tokens', DEFAULT_MAX_TOKENS),
+        'seed': config.get('seed', 0),
+        'kv_cache': config.get('kv_cache') or DEFAULT_KV_CACHE,
+    }
+
+def context_size_args(backend_name: str, lengths: List[int], max_tokens: int) -> List[str]:
+    """Startup args giving the server room for the longest prompt plus the decode."""
+    flag = CONTEXT_FLAGS.get(backend_name)
+    return [flag, str(max(lengths) + max_tokens + CONTEXT_MARGIN)] if flag else []
+
+# --- Filler ---
+
+def synthetic_code(rng: random.Random, index: int) -> str:
+    """One deterministic JavaScript-like function; code filler tokenizes like real code prompts."""
+    names = ['state', 'entity', 'particle', 'body', 'wall', 'ctx', 'frame', 'world']
+    ops = ['+', '-', '*']
+    lines = [f"function update_{index}({rng.choice(names)}, dt) {{"]
+    for n in range(rng.randint(4, 10)):
+        a, b = rng.choice(names), rng.choice(names)
+        lines.append(f"    const v{n} = {a}.values[{rng.randint(0, 63)}] {rng.choice(ops)} "
+                     f"{b}.speed * {rng.random():.3f} {rng.choice(ops)} dt;")
+        if rng.random() < 0.3:
+            lines.append(f"    if (v{n} > {rng.randint(1, 500)}) {{ {a}.hits += 1; }}")
+    lines.append(f"    return v0 {rng.choice(ops)} {rng.random():.3f};")
+    lines.append("}")
+    return "\n".join(lines) + "\n\n"
+
+def filler_blocks(prompt_texts: List[str], mode: str, seed: int):
+    """
+    Endless deterministic stream of filler blocks. 'stack' cycles through the
+    other benchmark prompts (as numbered documents), 'synthetic' generates code.
+    """
+    rng = random.Random(seed)
+    n = 0
+    while True:
+        n += 1
+        if mode == 'stack' and prompt_texts:
+            yield f"### Document {n}\n\n{prompt_texts[(n - 1) % len(prompt_texts)].strip()}\n\n"
+        elif mode in ('stack', 'synthetic'):
+            yield synthetic_code(rng, n)
+        else:
+            raise ValueError(f"Unknown filler mode: {mode} (expected 'stack' or 'synthetic')")
+
+def build_filler(prompt_texts: List[str], mode: str, seed: int, target_chars: int) -> str:
+    parts, length = [], 0
+    for block in filler_blocks(prompt_texts, mode, seed):
+        if length >= target_chars:
+            break
+        parts.append(block)
+        length += len(block)
+    return "".join(parts)[:target_chars]
+
+def pad_prompt(prompt: str, other_prompts: List[str], target_tokens: int, mode: str, seed: int,
+               count_tokens: Callable[[str], Optional[int]]) -> Dict[str, Any]:
+    """
+    Prefixes prompt with filler so the whole text is ~target_tokens long.
+    Filler is a prefix of one deterministic stream, so every length (and every
+    model) sees the same text. Uses count_tokens (the server tokenizer) to
+    correct the chars-per-token estimate; returns {'text', 'tokens', 'estimated'}.
+    """
+    fixed = FILLER_HEADER + TASK_HEADER + prompt
+    chars_per_token = CHARS_PER_TOKEN
+    text, tokens = prompt, None
+    for _ in range(3):
+        fixed_tokens = len(fixed) / chars_per_token
+        filler_chars = max(int((target_tokens - fixed_tokens) * chars_per_token), 0)
+        text = FILLER_HEADER + build_filler(other_prompts, mode, seed, filler_chars) + TASK_HEADER + prompt
+        tokens = count_tokens(text)
+        if tokens is None:
+            return {'text': text, 'tokens': round(len(text) / CHARS_PER_TOKEN), 'estimated': True}
+        if abs(tokens - target_tokens) <= max(target_tokens * 0.02, 16):
+            break
+        chars_per_token = len(text) / tokens
+    return {'text': text, 'tokens': tokens, 'estimated': False}
+
+# --- Report ---
+
+SERIES_COLORS = ['#1f77b4', '#d62728', '#2ca02c', '#ff7f0e', '#9467bd', '#8c564b']
+CHARTS = [
+    ('prefill_tps', 'Prefill tokens/s'),
+    ('decode_tps', 'Decode tokens/s'),
+    ('ttft', 'Time to first token (s)'),
+]
+
+def aggregate(rows: List[Dict[str, Any]]) -> Dict[str, Dict[int, Dict[str, Optional[float]]]]:
+    """kv setting -> target length -> mean of each metric over prompts (None if never measured)."""
+    grouped: Dict[str, Dict[int, List[Dict[str, Any]]]] = {}
+    for r in rows:
+        if r['success']:
+            grouped.setdefault(r['kv_cache'], {}).setdefault(r['target_tokens'], []).append(r)
+    result = {}
+    for kv, by_length in grouped.items():
+        result[kv] = {}
+        for length, samples in sorted(by_length.items()):
+            point = {}
+            for metric in ['prompt_tokens'] + [m for m, _ in CHARTS]:
+                values = [s[metric] for s in samples if s.get(metric) is not None]
+                point[metric] = sum(values) / len(values) if values else None
+            result[kv][length] = point
+    return result
+
+def render_svg_chart(series: Dict[str, Dict[int, Dict[str, Optional[float]]]], metric: str, title: str) -> str:
+    """Line chart of metric vs context length (log2 x axis), one line per KV cache setting."""
+    width, height, pad_l, pad_r, pad_t, pad_b = 520, 300, 60, 110, 30, 40
+    points = {kv: [(length, p[metric]) for length, p in by_length.items() if p[metric] is not None]
+              for kv, by_length in series.items()}
+    xs = sorted({x for pts in points.values() for x, _ in pts})
+    ys = [y for pts in points.values() for _, y in pts]
+    if not xs or not ys:
+        return f'<p>{html.escape(title)}: no data.</p>'
+
+    x_min, x_max = math.log2(xs[0]), math.log2(xs[-1])
+    y_max = max(ys) * 1.1 or 1.0
+
+    def sx(x):
+        span = (x_max - x_min) or 1.0
+        return pad_l + (math.log2(x) - x_min) / span * (width - pad_l - pad_r)
+
+    def sy(y):
+        return height - pad_b - y / y_max * (height - pad_t - pad_b)
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" class="chart">',
+             f'<text x="{width / 2 - pad_r / 2}" y="18" text-anchor="middle" font-weight="bold">{html.escape(title)}</text>',
+             f'<line x1="{pad_l}" y1="{height - pad_b}" x2="{width - pad_r}" y2="{height - pad_b}" stroke="#333"/>',
+             f'<line x1="{pad_l}" y1="{pad_t}" x2="{pad_l}" y2="{height - pad_b}" stroke="#333"/>']
+    for x in xs:
+        label = f"{x // 1024}k" if x >= 1024 else str(x)
+        parts.append(f'<text x="{sx(x):.1f}" y="{height - pad_b + 16}" text-anchor="middle" font-size="11">{label}</text>')
+    for i in range(5):
+        y = y_max * i / 4
+        parts.append(f'<text x="{pad_l - 6}" y="{sy(y) + 4:.1f}" text-anchor="end" font-size="11">{y:.3g}</text>')
+        parts.append(f'<line x1="{pad_l}" y1="{sy(y):.1f}" x2="{width - pad_r}" y2="{sy(y):.1f}" stroke="#eee"/>')
+    for n, (kv, pts) in enumerate(sorted(points.items())):
+        color = SERIES_COLORS[n % len(SERIES_COLORS)]
+        coords = " ".join(f"{sx(x):.1f},{sy(y):.1f}" for x, y in pts)
+        parts.append(f'<polyline points="{coords}" fill="none" stroke="{color}" stroke-width="2"/>')
+        parts += [f'<circle cx="{sx(x):.1f}" cy="{sy(y):.1f}" r="3" fill="{color}"/>' for x, y in pts]
+        parts.append(f'<text x="{width - pad_r + 10}" y="{pad_t + 16 * n + 10}" font-size="12" fill="{color}">{html.escape(kv)}</text>')
+    parts.append('</svg>')
+    return "".join(parts)
+
+def render_scaling_markdown(model_name: str, rows: List[Dict[str, Any]]) -> str:
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else "n/a"
+
+    lines = [
+        f"# Context Scaling: {model_name}",
+        "",
+        "Means over prompts per KV cache setting and target context length. "
+        "Prompt tokens is the measured prompt length (server count where available).",
+        "",
+        "| KV cache | Target | Prompt tokens | Prefill tok/s | Decode tok/s | TTFT s |",
+        "|---|---|---|---|---|---|",
+    ]
+    for kv, by_length in aggregate(rows).items():
+        for length, p in by_length.items():
+            lines.append(f"| {kv} | {length} | {fmt(p['prompt_tokens'], '.0f')} | {fmt(p['prefill_tps'], '.1f')} "
+                         f"| {fmt(p['decode_tps'], '.1f')} | {fmt(p['ttft'], '.2f')} |")
+    failed = [r for r in rows if not r['success']]
+    if failed:
+        lines += ["", f"{len(failed)} failed requests: " +
+                  ", ".join(f"{r['kv_cache']}/{r['target_tokens']}/{r['prompt']}" for r in failed)]
+    return "\n".join(lines) + "\n"
+
+def render_scaling_html(model_name: str, rows: List[Dict[str, Any]], generated_at: str) -> str:
+    series = aggregate(rows)
+    charts = "\n".join(render_svg_chart(series, metric, title) for metric, title in CHARTS)
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <title>Context Scaling: {html.escape(model_name)}</title>
+    <style>
+        body {{ font-family: sans-serif; margin: 15px; background-color: #f4f4f4; }}
+        h1 {{ color: #333; margin-top: 0; }}
+        .chart {{ background-color: #fff; margin: 0 15px 15px 0; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
+    </style>
+</head>
+<body>
+    <h1>Context Scaling: {html.escape(model_name)}</h1>
+    <p>Generated {html.escape(generated_at)}. X axis: target context length (tokens, log scale); one line per KV cache setting.</p>
+    {charts}
+</body>
+</html>
+"""
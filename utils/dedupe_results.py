@@ -0,0 +1,120 @@
+# utils/dedupe_results.py
+import os
+import json
+import argparse
+from pathlib import Path
+
+from blob_store import BlobStore, hash_file, HASH_ALGORITHM
+
+# --- Configuration ---
+RESULTS_ROOT = 'results'              # Folder holding the dated run folders
+BLOB_DIR = 'results/.blobs'           # Content-addressed store shared by all dated folders
+MANIFEST_FILENAME = 'manifest.json'   # Written into each dated folder
+ARTIFACT_SUBDIRS = ['results', 'html']  # Per-date folders holding .md transcripts / extracted .html
+
+# --- Helper Functions ---
+
+def iter_artifacts(date_dir: Path):
+    """Yields (relative_path, path) for every artifact file in a dated run folder."""
+    for sub in ARTIFACT_SUBDIRS:
+        folder = date_dir / sub
+        if not folder.is_dir():
+            continue
+        for path in sorted(folder.iterdir()):
+            if path.name.startswith('.') or not (path.is_file() or path.is_symlink()):
+                continue
+            yield f"{sub}/{path.name}", path
+
+def build_manifests(results_root: Path):
+    """
+    Hashes every artifact in every dated folder.
+    Returns {date: {relative_path: {'hash', 'size'}}} and {hash: [paths]}.
+    """
+    manifests = {}
+    occurrences = {}
+    for date_dir in sorted(p for p in results_root.iterdir() if p.is_dir() and not p.name.startswith('.')):
+        files = {}
+        for rel, path in iter_artifacts(date_dir):
+            try:
+                digest = hash_file(path)
+                size = path.stat().st_size
+            except OSError as e:
+                print(f"  [WARN] Cannot read {path}: {e}")
+                continue
+            files[rel] = {'hash': digest, 'size': size}
+            occurrences.setdefault(digest, []).append(path)
+        if files:
+            manifests[date_dir.name] = files
+    return manifests, occurrences
+
+def write_manifests(results_root: Path, manifests: dict):
+    for date, files in manifests.items():
+        manifest = {'algorithm': HASH_ALGORITHM, 'files': files}
+        manifest_path = results_root / date / MANIFEST_FILENAME
+        manifest_path.write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding='utf-8')
+
+def dedupe(occurrences: dict, store: BlobStore, mode: str):
+    """Moves content seen more than once into the blob store and links every copy to it."""
+    linked = 0
+    saved_bytes = 0
+    for digest, paths in occurrences.items():
+        if len(paths) < 2:
+            continue
+        blob = store.put(paths[0], digest)
+        for path in paths:
+            if mode == 'symlink' and path.is_symlink() and path.resolve() == blob.resolve():
+                continue
+            if mode == 'hardlink' and not path.is_symlink() and os.path.samefile(path, blob):
+                continue
+            store.link_into(blob, path, mode)
+            linked += 1
+        saved_bytes += (len(paths) - 1) * blob.stat().st_size
+    return linked, saved_bytes
+
+def restore(results_root: Path):
+    """Replaces every link in the legacy layout with an independent copy."""
+    restored = 0
+    for date_dir in sorted(p for p in results_root.iterdir() if p.is_dir() and not p.name.startswith('.')):
+        for _, path in iter_artifacts(date_dir):
+            if path.is_symlink() or path.stat().st_nlink > 1:
+                BlobStore.materialize(path)
+                restored += 1
+    return restored
+
+# --- Main Execution ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed deduplication of result artifacts.")
+    parser.add_argument(
+        "--link",
+        choices=["none", "hardlink", "symlink"],
+        default="none",
+        help="How duplicated files are replaced: 'none' only writes manifests and reports savings."
+    )
+    parser.add_argument("--restore", action="store_true", help="Undo linking by turning every link back into a copy.")
+    args = parser.parse_args()
+
+    results_root = Path(RESULTS_ROOT)
+    if not results_root.is_dir():
+        print(f"Error: Results directory '{results_root}' not found.")
+        return
+
+    if args.restore:
+        print(f"Restored {restore(results_root)} linked files to independent copies.")
+        return
+
+    manifests, occurrences = build_manifests(results_root)
+    write_manifests(results_root, manifests)
+
+    total_files = sum(len(f) for f in manifests.values())
+    duplicated = {d: p for d, p in occurrences.items() if len(p) > 1}
+    dup_bytes = sum((len(p) - 1) * p[0].stat().st_size for p in duplicated.values())
+    print(f"Manifests written for {len(manifests)} dated folders ({total_files} files, {len(occurrences)} unique).")
+    print(f"Duplicated content: {len(duplicated)} blobs, {dup_bytes / (1024**2):.2f} MiB reclaimable.")
+
+    if args.link != "none":
+        linked, saved = dedupe(occurrences, BlobStore(Path(BLOB_DIR)), args.link)
+        print(f"Linked {linked} files into '{BLOB_DIR}' ({args.link}), saving {saved / (1024**2):.2f} MiB.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+# utils/distributed.py
+import os
+import json
+import time
+import hmac
+import socket
+import platform
+import threading
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from output_stream import write_atomic
+
+# A work item is one model variant x one prompt. Workers claim all pending
+# prompts of one model at a time so each claim costs a single model load.
+
+MAX_ATTEMPTS = 2          # Failed items are retried once (possibly on another worker)
+CLAIM_RETRY_SECONDS = 15  # Told to workers when only other workers' items remain
+DONE_GRACE_SECONDS = 5    # The coordinator keeps answering 'done' this long past one retry interval
+MAX_CLAIM_FAILURES = 20   # Consecutive failed claims before a worker gives up on the coordinator
+LOOPBACK_HOSTS = {'127.0.0.1', '::1', 'localhost'}  # Binding anywhere else requires a token
+TOKEN_HEADER = 'X-Coordinator-Token'
+
+def hardware_info() -> Dict[str, Any]:
+    """Best-effort description of this node, recorded with every result."""
+    info = {
+        'hostname': socket.gethostname(),
+        'platform': platform.platform(),
+        'cpu': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'ram_gib': None,
+        'gpus': [],
+    }
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    info['cpu'] = line.split(':', 1)[1].strip()
+                    break
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    info['ram_gib'] = round(int(line.split()[1]) / (1024**2), 1)
+                    break
+    except OSError:
+        pass
+    try:
+        out = subprocess.run(
+            ["nvidia-smi", "--query-gpu=name,memory.total", "--format=csv,noheader"],
+            capture_output=True, text=True, timeout=5
+        ).stdout
+        info['gpus'] = [line.strip() for line in out.splitlines() if line.strip()]
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return info
+
+def hardware_summary(info: Dict[str, Any]) -> str:
+    gpus = "; ".join(info.get('gpus') or []) or "no GPU"
+    return f"{info.get('cpu')} x{info.get('cpu_count')}, {info.get('ram_gib')} GiB RAM, {gpus}"
+
+class WorkQueue:
+    """
+    Thread-safe model x prompt queue with leases. A claimed batch must be
+    finished before its lease expires, otherwise its items go back to pending.
+    """
+    def __init__(self, items: List[Dict[str, Any]], retry_seconds: float = CLAIM_RETRY_SECONDS):
+        # item: {'id', 'model', 'variant', 'prompt', 'prompt_text'}
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self.items = {item['id']: dict(item, state='pending', attempts=0, worker=None, lease_until=None)
+                      for item in items}
+        self.workers: Dict[str, Dict[str, Any]] = {}
+
+    def requeue_expired(self):
+        """Returns items whose lease ran out to pending (also checked on every claim)."""
+        with self._lock:
+            self._requeue_expired(time.time())
+
+    def _requeue_expired(self, now: float):
+        for item in self.items.values():
+            if item['state'] == 'leased' and item['lease_until'] < now:
+                print(f"  [QUEUE] Lease expired for {item['variant']} | {item['prompt']} ({item['worker']}). Requeued.")
+                item['state'] = 'pending'
+                item['worker'] = None
+
+    def claim(self, worker_id: str, hardware: Dict[str, Any], available_models: List[str],
+              lease_base: float, lease_per_item: float) -> Dict[str, Any]:
+        """Returns {'items': [...]}, {'wait': seconds} or {'done': True}."""
+        with self._lock:
+            now = time.time()
+            self.workers.setdefault(worker_id, {'hardware': hardware, 'completed': 0, 'failed': 0})
+            self.workers[worker_id]['last_seen'] = now
+            self._requeue_expired(now)
+
+            available = set(available_models)
+            pending = [i for i in self.items.values() if i['state'] == 'pending' and i['model'] in available]
+            if not pending:
+                in_flight = any(i['state'] == 'leased' and i['model'] in available for i in self.items.values())
+                return {'wait': self.retry_seconds} if in_flight else {'done': True}
+
+            # Take the variant with the most pending prompts so one load does the most work
+            by_variant: Dict[str, List[Dict[str, Any]]] = {}
+            for item in pending:
+                by_variant.setdefault(item['variant'], []).append(item)
+            batch = max(by_variant.values(), key=len)
+
+            lease_until = now + lease_base + lease_per_item * len(batch)
+            for item in batch:
+                item['state'] = 'leased'
+                item['worker'] = worker_id
+                item['lease_until'] = lease_until
+                item['attempts'] += 1
+            return {'items': [{k: item[k] for k in ('id', 'model', 'variant', 'prompt', 'prompt_text')} for item in batch]}
+
+    def complete(self, item_id: str, worker_id: str, success: bool, lease_extension: float) -> bool:
+        """Records a result. Returns False if the item was not leased to this worker."""
+        with self._lock:
+            item = self.items.get(item_id)
+            if not item or item['state'] != 'leased' or item['worker'] != worker_id:
+                return False
+            stats = self.workers.get(worker_id, {})
+            if success:
+                item['state'] = 'done'
+                stats['completed'] = stats.get('completed', 0) + 1
+            else:
+                item['state'] = 'pending' if item['attempts'] < MAX_ATTEMPTS else 'failed'
+                item['worker'] = None
+                stats['failed'] = stats.get('failed', 0) + 1
+            # Results stream in one by one; each one extends the lease on the rest of the batch
+            for other in self.items.values():
+                if other['state'] == 'leased' and other['worker'] == worker_id:
+                    other['lease_until'] = max(other['lease_until'], time.time() + lease_extension)
+            return True
+
+    def release(self, item_ids: List[str], worker_id: str):
+        """Returns items a worker could not run (e.g. its server failed to start)."""
+        with self._lock:
+            for item_id in item_ids:
+                item = self.items.get(item_id)
+                if item and item['state'] == 'leased' and item['worker'] == worker_id:
+                    item['state'] = 'pending' if item['attempts'] < MAX_ATTEMPTS else 'failed'
+                    item['worker'] = None
+
+    def worker_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return json.loads(json.dumps(self.workers))
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+            for item in self.items.values():
+                counts[item['state']] += 1
+            return counts
+
+    def finished(self) -> bool:
+        counts = self.counts()
+        return counts['pending'] == 0 and counts['leased'] == 0
+
+def run_coordinator(queue: WorkQueue, host: str, port: int, results_dir: Path,
+                    lease_base: float, lease_per_item: float, poll_interval: float = 5.0,
+                    token: Optional[str] = None) -> Dict[str, int]:
+    """
+    Serves the work queue until every item is done or failed.
+    Endpoints: POST /claim, POST /result, POST /release, GET /status.
+    Result files are written into results_dir as they arrive. With a token,
+    every request must carry it in the X-Coordinator-Token header; without
+    one, only loopback interfaces may be served.
+    """
+    if not token and host not in LOOPBACK_HOSTS:
+        raise ValueError(f"Refusing to serve the work queue on {host} without a token")
+    write_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, data, code=200):
+            payload = json.dumps(data).encode('utf-8')
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _authorized(self) -> bool:
+            if token and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, ''), token):
+                self.send_error(401)
+                return False
+            return True
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            if self.path == "/status":
+                self._send_json({'counts': queue.counts(), 'workers': queue.worker_snapshot()})
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            try:
+                data = self._read_json()
+            except (ValueError, json.JSONDecodeError):
+                self.send_error(400)
+                return
+
+            if self.path == "/claim":
+                self._send_json(queue.claim(data['worker_id'], data.get('hardware', {}),
+                                            data.get('models', []), lease_base, lease_per_item))
+            elif self.path == "/result":
+                accepted = queue.complete(data['id'], data['worker_id'], data.get('success', False), lease_per_item)
+                if accepted and data.get('success') and data.get('filename'):
+                    # Only accept plain filenames; never let a worker write outside results_dir
+                    filename = Path(data['filename']).name
+                    with write_lock:
+                        write_atomic(results_dir / filename, [data['content']])
+                    print(f"  [RESULT] {data['worker_id']}: {filename} ({data.get('gen_time', 0):.2f}s)")
+                elif accepted:
+                    print(f"  [FAIL] {data['worker_id']}: {data.get('variant')} | {data.get('prompt')} : {data.get('reason')}")
+                self._send_json({'accepted': accepted})
+            elif self.path == "/release":
+                queue.release(data.get('ids', []), data['worker_id'])
+                self._send_json({'released': True})
+            else:
+                self.send_error(404)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="coordinator", daemon=True).start()
+    print(f"Coordinator listening on http://{host}:{port} ({len(queue.items)} work items)")
+
+    try:
+        last_counts = None
+        while not queue.finished():
+            time.sleep(poll_interval)
+            # Workers that died stop claiming, so their leases must not wait for someone else's claim
+            queue.requeue_expired()
+            counts = queue.counts()
+            if counts != last_counts:
+                print(f"  [QUEUE] {counts}")
+                last_counts = counts
+        # Workers told to wait just before the end come back one retry interval
+        # later; they must still get 'done' rather than a refused connection
+        time.sleep(queue.retry_seconds + DONE_GRACE_SECONDS)
+    finally:
+        server.shutdown()
+
+    workers_path = results_dir / "workers.json"
+    workers_path.write_text(json.dumps(queue.worker_snapshot(), indent=2), encoding='utf-8')
+    print(f"  Worker hardware recorded in {workers_path}")
+    return queue.counts()
+
+def coordinator_gone(error: BaseException) -> bool:
+    """True if a request failed because nothing listens on the coordinator's port any more."""
+    while error is not None:
+        if isinstance(error, ConnectionRefusedError):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+class CoordinatorClient:
+    """Worker-side HTTP client for the coordinator endpoints."""
+    def __init__(self, base_url: str, worker_id: str, hardware: Dict[str, Any], timeout: float = 30,
+                 token: Optional[str] = None):
+        import requests  # Only needed on workers
+        self._requests = requests
+        self.base_url = base_url.rstrip('/')
+        self.worker_id = worker_id
+        self.hardware = hardware
+        self.timeout = timeout
+        self.headers = {TOKEN_HEADER: token} if token else {}
+
+    def _post(self, path: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        data = dict(data, worker_id=self.worker_id)
+        res = self._requests.post(f"{self.base_url}{path}", json=data, headers=self.headers, timeout=self.timeout)
+        res.raise_for_status()
+        return res.json()
+
+    def claim(self, models: List[str]) -> Dict[str, Any]:
+        return self._post("/claim", {'hardware': self.hardware, 'models': models})
+
+    def submit(self, item: Dict[str, Any], success: bool, filename: Optional[str] = None,
+               content: Optional[str] = None, gen_time: float = 0.0, reason: str = "") -> bool:
+        return self._post("/result", {
+            'id': item['id'], 'variant': item['variant'], 'prompt': item['prompt'],
+            'success': success, 'filename': filename, 'content': content,
+            'gen_time': gen_time, 'reason': reason,
+        }).get('accepted', False)
+
+    def release(self, items: List[Dict[str, Any]]):
+        self._post("/release", {'ids': [i['id'] for i in items]})
+
+class LocalQueueClient:
+    """
+    In-process stand-in for CoordinatorClient, used when several backend
+    servers on one host share a WorkQueue (run_benchmarks.py --pool).
+    """
+    def __init__(self, queue: WorkQueue, results_dir: Path, worker_id: str, hardware: Dict[str, Any],
+                 lease_base: float, lease_per_item: float, write_lock: threading.Lock):
+        self.queue = queue
+        self.results_dir = results_dir
+        self.worker_id = worker_id
+        self.hardware = hardware
+        self.lease_base = lease_base
+        self.lease_per_item = lease_per_item
+        self.write_lock = write_lock
+
+    def claim(self, models: List[str]) -> Dict[str, Any]:
+        return self.queue.claim(self.worker_id, self.hardware, models, self.lease_base, self.lease_per_item)
+
+    def submit(self, item: Dict[str, Any], success: bool, filename: Optional[str] = None,
+               content: Optional[str] = None, gen_time: float = 0.0, reason: str = "") -> bool:
+        accepted = self.queue.complete(item['id'], self.worker_id, success, self.lease_per_item)
+        if accepted and success and filename:
+            with self.write_lock:
+                write_atomic(self.results_dir / Path(filename).name, [content])
+        return accepted
+
+    def release(self, items: List[Dict[str, Any]]):
+        self.queue.release([i['id'] for i in items], self.worker_id)
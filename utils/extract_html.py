@@ -1,15 +1,25 @@
 import re
+import argparse
 from pathlib import Path
 
+from blob_store import hash_bytes, replace_text
+from transcript_store import read_transcript, read_html_block, iter_transcripts
+
 # --- Configuration ---
 SOURCE_FOLDER_NAME = "results/2026.02.04/results"  # Name of the folder containing .md files
 OUTPUT_FOLDER_NAME = "results/2026.02.04/html"     # Name of the folder to save extracted HTML files
+# Extracted HTML keyed by transcript content hash, shared by all dated folders so that
+# transcripts carried forward unchanged are only pattern-matched once. Relative to the
+# results root (the folder holding the dated folders), not the working directory (None disables)
+EXTRACT_CACHE_SUBDIR = ".cache/extract"
+EXTRACTOR_VERSION = 1  # Bump when extraction changes in a way the pattern and placeholder below do not show
 
 # Define the closing tag pattern separately for clarity and robustness
 # Allows optional whitespace before the closing >
 END_TAG_PATTERN = r"</html\s*>"
 # Use a user-friendly version for messages
 END_MARKER_DISPLAY = "</html>"
+DATE_DIR_PATTERN = re.compile(r'^\d{4}\.\d{2}\.\d{2}$')
 
 # Updated Regex pattern to find the HTML block:
 # - Optionally starts with <!DOCTYPE html...> followed by optional whitespace.
@@ -58,51 +68,89 @@ NO_RESULT_HTML = f"""<!DOCTYPE html>
 """
 # --- End Configuration ---
 
-def extract_last_html(source_dir: Path, output_dir: Path):
+# Part of every cache key: a new extractor version, pattern or placeholder page
+# invalidates the cached extractions instead of serving the old ones
+EXTRACTOR_KEY = hash_bytes(f"{EXTRACTOR_VERSION}\n{HTML_PATTERN.pattern}\n{HTML_PATTERN.flags}\n{NO_RESULT_HTML}".encode('utf-8'))
+
+def extract_cache_dir(source_dir: Path):
     """
-    Finds markdown files in the source directory. For each file, it attempts
-    to extract the last HTML block (matching robust criteria).
-    It ALWAYS creates an output .html file in the output directory:
-    - If a match is found, the output file contains the extracted HTML.
-    - If no match is found, the output file contains a default "No Valid Result" HTML page.
+    Extraction cache for transcripts in source_dir (<results root>/<YYYY.MM.DD>/results):
+    <results root>/.cache/extract. Folders outside that layout get a cache next
+    to source_dir instead. None when caching is disabled.
     """
-    if not source_dir.is_dir():
-        print(f"Error: Source directory '{source_dir}' not found or is not a directory.")
-        return
+    if not EXTRACT_CACHE_SUBDIR:
+        return None
+    run_dir = Path(source_dir).expanduser().resolve().parent
+    results_root = run_dir.parent if DATE_DIR_PATTERN.match(run_dir.name) else run_dir
+    return results_root / EXTRACT_CACHE_SUBDIR
 
-    # Ensure the output directory exists, create if not
-    try:
-        output_dir.mkdir(parents=True, exist_ok=True)
-        print(f"Output directory '{output_dir}' ensured.")
-    except OSError as e:
-        print(f"Error: Could not create output directory '{output_dir}': {e}")
-        return # Stop if we can't create the output folder
+class HtmlCompletionWatcher:
+    """
+    Watches a growing generation for a complete HTML document, using the same
+    HTML_PATTERN as extraction. The full pattern is only run when a chunk
+    brings in a new closing tag, so feeding token-sized chunks stays cheap.
+    """
+    # Longest closing-tag text that may be split across chunks ("</html   >")
+    _TAIL = 16
 
-    print(f"\nStarting processing from folder: '{source_dir}'")
-    files_processed = 0
-    html_files_created = 0
-    files_with_errors = 0
+    def __init__(self):
+        self._parts = []
+        self._length = 0
+        self._tail = ""
+        self.complete_at = None  # Length of the text when the first complete document closed
 
-    # Iterate through items in the source directory
-    for item_path in source_dir.iterdir():
-        # Check if it's a file, ends with .md, and doesn't start with '.'
-        if (item_path.is_file() and
-            item_path.suffix.lower() == ".md" and
-            not item_path.name.startswith('.')):
+    def feed(self, chunk: str) -> bool:
+        """Appends a chunk; returns True once a complete HTML document has been seen."""
+        self._parts.append(chunk)
+        self._length += len(chunk)
+        if self.complete_at is None:
+            window = self._tail + chunk
+            if re.search(END_TAG_PATTERN, window, re.IGNORECASE) and HTML_PATTERN.search("".join(self._parts)):
+                self.complete_at = self._length
+            self._tail = window[-self._TAIL:]
+        return self.complete_at is not None
 
-            files_processed += 1
-            print(f"\nProcessing file: {item_path.name}")
+    @property
+    def length(self) -> int:
+        return self._length
 
-            # Determine output path regardless of match success
-            output_filename = item_path.stem + ".html"
-            output_html_path = output_dir / output_filename
-            content_to_write = None
-            match_found = False
+def extract_file(item_path: Path, output_dir: Path, cache_dir: Path = None) -> bool:
+    """
+    Extracts the last HTML block from a single markdown file into output_dir
+    (or writes the default "No Valid Result" page). Returns True if an output
+    file was written. If cache_dir is given, extraction results are cached
+    there by transcript content hash and extractor version.
+    """
+    print(f"\nProcessing file: {item_path.name}")
 
-            try:
-                # Read the content of the markdown file
-                content = item_path.read_text(encoding='utf-8')
+    # Determine output path regardless of match success
+    output_filename = item_path.stem + ".html"
+    output_html_path = output_dir / output_filename
+    content_to_write = None
+    match_found = False
+
+    try:
+        # Compressed transcripts (.md.zst) index their HTML block: read just that frame
+        compressed, html_block = read_html_block(item_path)
+        if compressed:
+            content_to_write = html_block if html_block is not None else NO_RESULT_HTML
+            match_found = html_block is not None
+            print("  Compressed transcript. Using its indexed HTML block.")
+        else:
+            # Read the content of the markdown file
+            content = read_transcript(item_path)
 
+            # Identical transcripts (e.g. carried forward into a later dated
+            # folder) are only pattern-matched once
+            cache_path = None
+            if cache_dir is not None:
+                cache_path = cache_dir / (hash_bytes((EXTRACTOR_KEY + content).encode('utf-8')) + ".html")
+
+            if cache_path is not None and cache_path.is_file():
+                content_to_write = cache_path.read_text(encoding='utf-8')
+                match_found = content_to_write != NO_RESULT_HTML
+                print("  Identical transcript already extracted. Using cached result.")
+            else:
                 # Find all occurrences of the HTML pattern
                 # Use search() instead of findall() if we only expect one block or always want the first large block
                 # Sticking with findall() and taking the last match is often safer for benchmark logs
@@ -121,38 +169,79 @@ def extract_last_html(source_dir: Path, output_dir: Path):
                     # Use the display marker in the message
                     print(f"  No valid HTML block (matching pattern ending with {END_MARKER_DISPLAY}) found. Preparing default 'No Result' HTML.")
 
-            except FileNotFoundError:
-                 print(f"  Error: Source file not found during processing: {item_path.name}")
-                 files_with_errors += 1
-                 continue # Skip to the next file
-            except IOError as e:
-                print(f"  Error reading file {item_path.name}: {e}")
-                files_with_errors += 1
-                continue # Skip to the next file
-            except Exception as e:
-                 print(f"  An unexpected error occurred while processing {item_path.name}: {e}")
-                 files_with_errors += 1
-                 continue # Skip to the next file
-
-            # --- Write the output file (either extracted content or boilerplate) ---
-            if content_to_write is not None:
-                try:
-                    output_html_path.write_text(content_to_write, encoding='utf-8')
-                    # Display the relative path to the created file
-                    status = "extracted content" if match_found else "default content"
-                    print(f"  Successfully created: {output_html_path} (with {status})")
-                    html_files_created += 1
-                except IOError as e:
-                    print(f"  Error writing file {output_html_path}: {e}")
-                    files_with_errors += 1
-                except Exception as e:
-                     print(f"  An unexpected error occurred while writing {output_html_path}: {e}")
-                     files_with_errors += 1
-            else:
-                # This case should ideally not be reached if reading logic is correct,
-                # but included for completeness.
-                print(f"  Skipping write for {output_html_path} due to prior processing error.")
-                files_with_errors += 1
+                if cache_path is not None:
+                    cache_path.write_text(content_to_write, encoding='utf-8')
+
+    except FileNotFoundError:
+         print(f"  Error: Source file not found during processing: {item_path.name}")
+         return False
+    except IOError as e:
+        print(f"  Error reading file {item_path.name}: {e}")
+        return False
+    except Exception as e:
+         print(f"  An unexpected error occurred while processing {item_path.name}: {e}")
+         return False
+
+    # --- Write the output file (either extracted content or boilerplate) ---
+    if content_to_write is not None:
+        try:
+            # Replaced, not rewritten: the page may be a link into the dedupe blob store
+            replace_text(output_html_path, content_to_write)
+            # Display the relative path to the created file
+            status = "extracted content" if match_found else "default content"
+            print(f"  Successfully created: {output_html_path} (with {status})")
+            return True
+        except IOError as e:
+            print(f"  Error writing file {output_html_path}: {e}")
+        except Exception as e:
+             print(f"  An unexpected error occurred while writing {output_html_path}: {e}")
+    else:
+        # This case should ideally not be reached if reading logic is correct,
+        # but included for completeness.
+        print(f"  Skipping write for {output_html_path} due to prior processing error.")
+    return False
+
+def extract_last_html(source_dir: Path, output_dir: Path, cache_dir: Path = None):
+    """
+    Finds markdown files in the source directory. For each file, it attempts
+    to extract the last HTML block (matching robust criteria).
+    It ALWAYS creates an output .html file in the output directory:
+    - If a match is found, the output file contains the extracted HTML.
+    - If no match is found, the output file contains a default "No Valid Result" HTML page.
+    If cache_dir is given, extraction results are cached there by transcript content hash
+    and extractor version.
+    """
+    if not source_dir.is_dir():
+        print(f"Error: Source directory '{source_dir}' not found or is not a directory.")
+        return
+
+    # Ensure the output directory exists, create if not
+    try:
+        output_dir.mkdir(parents=True, exist_ok=True)
+        print(f"Output directory '{output_dir}' ensured.")
+    except OSError as e:
+        print(f"Error: Could not create output directory '{output_dir}': {e}")
+        return # Stop if we can't create the output folder
+
+    if cache_dir is not None:
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            print(f"Warning: Could not create cache directory '{cache_dir}', caching disabled: {e}")
+            cache_dir = None
+
+    print(f"\nStarting processing from folder: '{source_dir}'")
+    files_processed = 0
+    html_files_created = 0
+    files_with_errors = 0
+
+    # Iterate through the transcripts (.md, or .md.zst read transparently) in the source directory
+    for item_path in iter_transcripts(source_dir):
+        files_processed += 1
+        if extract_file(item_path, output_dir, cache_dir):
+            html_files_created += 1
+        else:
+            files_with_errors += 1
 
 
     print(f"\n--------------------------------------------------")
@@ -167,9 +256,16 @@ def extract_last_html(source_dir: Path, output_dir: Path):
 
 # --- Main Execution ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract the last HTML block from each result transcript.")
+    parser.add_argument("--source", type=str, default=SOURCE_FOLDER_NAME, help="Folder containing the .md transcripts.")
+    parser.add_argument("--output", type=str, default=OUTPUT_FOLDER_NAME, help="Folder to write the extracted .html files to.")
+    args = parser.parse_args()
+
     # Source directory (relative to script location or CWD)
-    source_directory = Path(SOURCE_FOLDER_NAME)
+    source_directory = Path(args.source)
     # Output directory (relative to where the script is run - CWD)
-    output_directory = Path(OUTPUT_FOLDER_NAME)
+    output_directory = Path(args.output)
+
+    cache_directory = extract_cache_dir(source_directory)
 
-    extract_last_html(source_directory, output_directory)
\ No newline at end of file
+    extract_last_html(source_directory, output_directory, cache_directory)
\ No newline at end of file
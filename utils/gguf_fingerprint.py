@@ -0,0 +1,125 @@
+# utils/gguf_fingerprint.py
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from load_bench import model_files
+
+# --- Configuration ---
+FINGERPRINT_CACHE_FILE = 'results/.cache/fingerprints.json'
+FINGERPRINT_VERSION = 'gguf1'         # Bump when the sampling below changes
+HEADER_BYTES = 4 * 1024**2             # GGUF metadata (incl. chat template) and tensor table
+SAMPLE_BLOCKS = 32                     # Fixed-offset blocks spread over the tensor data
+BLOCK_BYTES = 64 * 1024
+DIGEST_BYTES = 16
+FINGERPRINT_WORKERS = 8                # Sampled reads are I/O bound; threads overlap the seeks
+
+# A fingerprint reads about 6 MiB per file whatever its size: the header, 32
+# blocks at fixed fractions of the file and the last block, plus the size.
+# Re-quantized or re-uploaded weights under the same filename change it, as
+# does a patched chat template. Results are cached in FINGERPRINT_CACHE_FILE
+# by (real path, size, mtime, inode), so unchanged files are never re-read.
+# The digest is BLAKE2b from the standard library: at ~6 MiB per file the
+# hash costs a few ms next to the reads, so a non-cryptographic hash would
+# not be measurably faster and would add a dependency.
+
+def sample_offsets(size: int) -> List[int]:
+    if size <= HEADER_BYTES + BLOCK_BYTES:
+        return []
+    span = size - HEADER_BYTES - BLOCK_BYTES
+    offsets = [HEADER_BYTES + span * n // SAMPLE_BLOCKS for n in range(SAMPLE_BLOCKS)]
+    return offsets + [size - BLOCK_BYTES]
+
+def fingerprint_file(path: Path) -> str:
+    """Sampled digest of one file (no caching)."""
+    size = path.stat().st_size
+    h = hashlib.blake2b(digest_size=DIGEST_BYTES)
+    h.update(f"{FINGERPRINT_VERSION}:{size}:".encode('ascii'))
+    with open(path, 'rb') as f:
+        h.update(f.read(HEADER_BYTES))
+        for offset in sample_offsets(size):
+            f.seek(offset)
+            h.update(f.read(BLOCK_BYTES))
+    return h.hexdigest()
+
+class FingerprintCache:
+    """File digests keyed by real path, valid while size, mtime and inode match."""
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, dict]] = None
+        self._dirty = False
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        if self.path and self.path.is_file():
+            try:
+                self._entries = json.loads(self.path.read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e:
+                print(f"  [WARN] Ignoring unreadable fingerprint cache {self.path}: {e}")
+
+    def file_digest(self, path: Path) -> str:
+        real = os.path.realpath(path)
+        st = os.stat(real)
+        stamp = [st.st_size, st.st_mtime_ns, st.st_ino]
+        with self._lock:
+            self._load()
+            entry = self._entries.get(real)
+            if entry and entry['stamp'] == stamp and entry['version'] == FINGERPRINT_VERSION:
+                self.hits += 1
+                return entry['digest']
+        digest = fingerprint_file(Path(real))
+        with self._lock:
+            self.misses += 1
+            self._entries[real] = {'stamp': stamp, 'version': FINGERPRINT_VERSION, 'digest': digest}
+            self._dirty = True
+        return digest
+
+    def save(self):
+        with self._lock:
+            if not (self.path and self._dirty):
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f".{self.path.name}.tmp")
+            tmp.write_text(json.dumps(self._entries, indent=1, sort_keys=True), encoding='utf-8')
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+# Shared by the runner and the replay cache; persisted by fingerprint_models()
+CACHE = FingerprintCache(Path(FINGERPRINT_CACHE_FILE) if FINGERPRINT_CACHE_FILE else None)
+
+def model_fingerprint(model_path: Path, cache: FingerprintCache = CACHE) -> str:
+    """'gguf1:<digest>' for a model; split GGUFs combine the digests of all their parts."""
+    parts = model_files(Path(model_path))
+    digests = [cache.file_digest(p) for p in parts]
+    if len(digests) == 1:
+        return f"{FINGERPRINT_VERSION}:{digests[0]}"
+    combined = hashlib.blake2b('\n'.join(digests).encode('ascii'), digest_size=DIGEST_BYTES).hexdigest()
+    return f"{FINGERPRINT_VERSION}:{combined}"
+
+def fingerprint_models(model_paths: List[Path], cache: FingerprintCache = CACHE,
+                       workers: int = FINGERPRINT_WORKERS) -> Dict[Path, Optional[str]]:
+    """Fingerprints every model in parallel (None for unreadable files) and saves the cache."""
+    def one(path):
+        try:
+            return model_fingerprint(path, cache)
+        except OSError as e:
+            print(f"  [WARN] Cannot fingerprint {path.name}: {e}")
+            return None
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(model_paths)))) as pool:
+        results = dict(zip(model_paths, pool.map(one, model_paths)))
+    cache.save()
+    print(f"Fingerprinted {len(model_paths)} models in {time.time() - start:.2f}s "
+          f"({cache.hits} cached, {cache.misses} read)")
+    return results
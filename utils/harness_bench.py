@@ -0,0 +1,337 @@
+# utils/harness_bench.py
+import gc
+import re
+import json
+import time
+import random
+import argparse
+import datetime
+import tempfile
+import statistics
+import tracemalloc
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Optional
+
+# Micro-benchmarks of the harness's own hot paths, run offline on the
+# transcripts already in results/ plus synthetic corpora scaled from them:
+#
+#   extract_pattern   extract_html.HTML_PATTERN over the largest transcript, repeated x scale
+#   parse_filenames   static_viewer.parse_result_filename over every result name x scale
+#   get_all_results   static_viewer.get_all_results on a folder of (empty) result files x scale
+#   model_config      ConfigLoader.get_model_config for every model name against rules x scale
+#   output_exists     run_benchmarks.check_if_output_exists for every model x prompt, folder x scale
+#
+# Times are the best of --repeats runs; peak memory comes from a separate
+# tracemalloc run. Each time is also divided by a fixed pure-Python
+# calibration workload, so a baseline saved on one machine can be checked
+# on another. --save-baseline stores the report; later runs fail (exit 1)
+# when a benchmark is slower or needs more memory than the baseline allows.
+
+# --- Configuration ---
+RESULTS_ROOT = 'results'
+PROMPTS_DIR = 'code_prompts'
+REPORT_DIR = 'results/harness_bench'
+BASELINE_FILE = 'results/harness_bench/baseline.json'
+SCALES = [1, 10, 100]
+REPEATS = 5
+BENCH_BUDGET_S = 20            # Slow benchmarks at large scales get fewer repeats (at least 1)
+SEED = 0
+TIME_TOLERANCE = 0.25          # Allowed slowdown of the calibrated time
+MEMORY_TOLERANCE = 0.25        # Allowed growth of peak memory
+MIN_TIME_DELTA_S = 0.0005      # Differences below this are timer noise, never regressions
+MIN_MEMORY_DELTA_KIB = 64
+CONFIRM_ATTEMPTS = 2           # Re-measurements of a flagged benchmark before it counts as a regression
+SYNTHETIC_MODELS = 60          # Used when results/ is empty
+SYNTHETIC_RULES = 10           # Rules per scale unit on top of config.example.yaml's
+
+# --- Corpus ---
+
+def load_corpus(results_root: Path, prompts_dir: Path) -> Dict[str, Any]:
+    """Result names, prompt types and the largest transcript from the real results."""
+    from static_viewer import get_test_types
+    from transcript_store import iter_transcripts, read_transcript
+    from compare_runs import get_run_dates, LEGACY_TYPES
+
+    types = get_test_types(str(prompts_dir)).get('types', []) + LEGACY_TYPES
+    names, largest = set(), ""
+    for date in get_run_dates(str(results_root)):
+        for path in iter_transcripts(results_root / date / 'results'):
+            names.add(path.stem)
+            text = read_transcript(path)
+            if len(text) > len(largest):
+                largest = text
+    return {'types': types, 'names': sorted(names), 'largest_transcript': largest}
+
+def synthetic_names(corpus: Dict[str, Any], scale: int, rng: random.Random) -> List[str]:
+    """Result stems (<model>_<type>_<timestamp>) x scale, derived from the real ones."""
+    from static_viewer import parse_result_filename
+    parsed = [parse_result_filename(n + '.md', corpus['types'], extension='md') for n in corpus['names']]
+    parsed = [p for p in parsed if p]
+    if not parsed:
+        parsed = [{'model': f"Model-{m}-Q4_K_M", 'type': t, 'timestamp': '20260101_000000'}
+                  for m in range(SYNTHETIC_MODELS) for t in corpus['types']]
+    names = []
+    for copy in range(scale):
+        for p in parsed:
+            model = p['model'] if copy == 0 else f"{p['model']}-v{copy}"
+            stamp = f"2026{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}_{rng.randint(0, 235959):06d}"
+            names.append(f"{model}_{p['type']}_{stamp if copy else p['timestamp']}")
+    return names
+
+def synthetic_transcript(corpus: Dict[str, Any], scale: int) -> str:
+    """The largest transcript repeated: many HTML blocks, as in long revise-and-repeat answers."""
+    base = corpus['largest_transcript'] or ("<p>filler</p>\n" * 2000 +
+                                            "```html\n<!DOCTYPE html>\n<html><body></body></html>\n```\n")
+    return base * scale
+
+def synthetic_rules(scale: int) -> List[Dict[str, Any]]:
+    """config.example.yaml's model rules (if present) after SYNTHETIC_RULES x scale non-matching ones."""
+    import yaml
+    example = Path(__file__).resolve().with_name('config.example.yaml')
+    real = (yaml.safe_load(example.read_text(encoding='utf-8')) or {}).get('models', []) if example.is_file() else []
+    filler = [{'pattern': f"zz-unused-model-{n}", 'match_all': ['q4'] if n % 3 == 0 else [],
+               'generation_params': {'temperature': 0.2}} for n in range(SYNTHETIC_RULES * scale)]
+    # Filler first: lookups walk the list, and real names match the rules at the end
+    return filler + [{k: v for k, v in r.items() if k != 'draft'} for r in real]
+
+# --- Benchmarks ---
+# Each takes (corpus, scale, workdir) and returns (function to time, item count).
+# Items are characters for extract_pattern and rule checks for model_config.
+
+def bench_extract_pattern(corpus, scale, workdir):
+    from extract_html import HTML_PATTERN
+    text = synthetic_transcript(corpus, scale)
+    return (lambda: HTML_PATTERN.findall(text)), len(text)
+
+def bench_parse_filenames(corpus, scale, workdir):
+    from static_viewer import parse_result_filename
+    names = [n + '.html' for n in synthetic_names(corpus, scale, random.Random(SEED))]
+    types = corpus['types']
+    return (lambda: [parse_result_filename(n, types) for n in names]), len(names)
+
+def bench_get_all_results(corpus, scale, workdir):
+    from static_viewer import get_all_results
+    folder = workdir / f"html_x{scale}"
+    folder.mkdir()
+    names = synthetic_names(corpus, scale, random.Random(SEED))
+    for n in names:
+        (folder / f"{n}.html").touch()
+    types = corpus['types']
+    return (lambda: get_all_results(str(folder), types)), len(names)
+
+def bench_model_config(corpus, scale, workdir):
+    import yaml
+    from config_loader import ConfigLoader
+    config_path = workdir / f"config_x{scale}.yaml"
+    config_path.write_text(yaml.safe_dump({
+        'paths': {}, 'server': {}, 'backends': {},
+        'default_generation_params': {'temperature': 0.7, 'max_tokens': 8192},
+        'models': synthetic_rules(scale),
+    }), encoding='utf-8')
+    cfg = ConfigLoader(str(config_path))
+    from static_viewer import parse_result_filename
+    models = sorted({p['model'] for p in (parse_result_filename(n + '.md', corpus['types'], extension='md')
+                                          for n in corpus['names']) if p}) or [f"Model-{m}" for m in range(SYNTHETIC_MODELS)]
+    files = [m + '.gguf' for m in models]
+    return (lambda: [cfg.get_model_config(f) for f in files]), len(files) * len(cfg._data['models'])
+
+def bench_output_exists(corpus, scale, workdir):
+    from run_benchmarks import check_if_output_exists
+    from static_viewer import parse_result_filename
+    folder = workdir / f"results_x{scale}"
+    folder.mkdir()
+    names = synthetic_names(corpus, scale, random.Random(SEED))
+    for n in names:
+        (folder / f"{n}.md").touch()
+    # Same lookups at every scale (the real model x prompt pairs); only the folder grows
+    parsed = [parse_result_filename(n + '.md', corpus['types'], extension='md') for n in synthetic_names(corpus, 1, random.Random(SEED))]
+    pairs = sorted({(p['model'], p['type']) for p in parsed if p})
+    return (lambda: [check_if_output_exists(folder, m, t) for m, t in pairs]), len(pairs)
+
+BENCHMARKS: Dict[str, Callable] = {
+    'extract_pattern': bench_extract_pattern,
+    'parse_filenames': bench_parse_filenames,
+    'get_all_results': bench_get_all_results,
+    'model_config': bench_model_config,
+    'output_exists': bench_output_exists,
+}
+
+# --- Measurement ---
+
+CALIBRATION_PATTERN = re.compile(r'(\w+)_(\d+)')
+
+
+def calibration_workload():
+    """A fixed mix of dict, string, sort and regex work; its best time is the unit for calibrated times."""
+    d = {}
+    for i in range(50000):
+        key = f"model_{i % 977}"
+        d[key] = d.get(key, 0) + i
+    sorted(d.items(), key=lambda kv: kv[1])
+    CALIBRATION_PATTERN.findall(" ".join(d) * 5)
+
+def time_once(fn) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def peak_memory_kib(fn) -> float:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+def run_suite(cases: List[tuple], repeats: int, results_root: Path, prompts_dir: Path) -> Dict[str, Any]:
+    """Times and measures every (benchmark name, scale) in cases; returns the report dict."""
+    corpus = load_corpus(results_root, prompts_dir)
+    print(f"Corpus: {len(corpus['names'])} transcripts, {len(corpus['types'])} types, "
+          f"largest {len(corpus['largest_transcript']) / 1024:.0f} KiB")
+    # Calibration runs are spread over the whole suite, so a slow or fast
+    # phase of a busy machine affects the unit and the benchmarks alike
+    calibration_runs = [time_once(calibration_workload) for _ in range(repeats)]
+    rows = []
+    with tempfile.TemporaryDirectory(prefix='harness_bench_') as tmp:
+        for name, scale in cases:
+            fn, items = BENCHMARKS[name](corpus, scale, Path(tmp))
+            calibration_runs.append(time_once(calibration_workload))
+            warmup = time_once(fn)  # Imports, compiled regex caches, directory entries
+            runs = max(1, min(repeats, int(BENCH_BUDGET_S / max(warmup, 1e-9))))
+            times = [time_once(fn) for _ in range(runs)]
+            row = {
+                'name': name, 'scale': scale, 'items': items, 'runs': runs,
+                'best_s': min(times), 'median_s': statistics.median(times),
+                'peak_kib': peak_memory_kib(fn),
+            }
+            rows.append(row)
+            print(f"  {name:16} x{scale:<4} {row['best_s'] * 1000:9.2f} ms best, {row['median_s'] * 1000:9.2f} ms median, "
+                  f"{row['peak_kib']:9.0f} KiB peak ({items} items)")
+    calibration = min(calibration_runs)
+    for row in rows:
+        row['calibrated'] = row['best_s'] / calibration
+    print(f"Calibration: {calibration * 1000:.2f} ms (best of {len(calibration_runs)})")
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'calibration_s': calibration,
+        'corpus': {'transcripts': len(corpus['names']), 'types': len(corpus['types']),
+                   'largest_transcript_chars': len(corpus['largest_transcript'])},
+        'rows': rows,
+    }
+
+# --- Baseline ---
+
+def find_regressions(report: Dict[str, Any], baseline: Dict[str, Any],
+                     time_tolerance: float = TIME_TOLERANCE, memory_tolerance: float = MEMORY_TOLERANCE) -> List[tuple]:
+    """(name, scale, message) per benchmark x scale that got slower or hungrier than the baseline allows."""
+    base_rows = {(r['name'], r['scale']): r for r in baseline.get('rows', [])}
+    calibration = report['calibration_s']
+    problems = []
+    for row in report['rows']:
+        base = base_rows.get((row['name'], row['scale']))
+        if base is None:
+            continue
+        label = f"{row['name']} x{row['scale']}"
+        allowed = base['calibrated'] * (1 + time_tolerance)
+        if row['calibrated'] > allowed and (row['calibrated'] - base['calibrated']) * calibration > MIN_TIME_DELTA_S:
+            problems.append((row['name'], row['scale'], f"{label}: {row['calibrated'] / base['calibrated'] - 1:+.0%} time "
+                            f"({row['best_s'] * 1000:.2f} ms, baseline {base['calibrated'] * calibration * 1000:.2f} ms here)"))
+        if (row['peak_kib'] > base['peak_kib'] * (1 + memory_tolerance)
+                and row['peak_kib'] - base['peak_kib'] > MIN_MEMORY_DELTA_KIB):
+            problems.append((row['name'], row['scale'], f"{label}: {row['peak_kib'] / base['peak_kib'] - 1:+.0%} peak memory "
+                            f"({row['peak_kib']:.0f} KiB, baseline {base['peak_kib']:.0f} KiB)"))
+    return problems
+
+def render_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> str:
+    base_rows = {(r['name'], r['scale']): r for r in (baseline or {}).get('rows', [])}
+    lines = [
+        "# Harness Benchmarks",
+        "",
+        f"Created {report['created']}. Calibration workload: {report['calibration_s'] * 1000:.2f} ms. "
+        "Calibrated = best time / calibration; the baseline is compared on that.",
+        "",
+        "| Benchmark | Scale | Items | Best ms | Median ms | µs/item | Peak KiB | Calibrated | vs baseline |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for r in report['rows']:
+        base = base_rows.get((r['name'], r['scale']))
+        change = f"{r['calibrated'] / base['calibrated'] - 1:+.0%}" if base else "n/a"
+        lines.append(f"| {r['name']} | {r['scale']} | {r['items']} | {r['best_s'] * 1000:.2f} | {r['median_s'] * 1000:.2f} "
+                     f"| {r['best_s'] / max(r['items'], 1) * 1e6:.3f} | {r['peak_kib']:.0f} | {r['calibrated']:.3f} | {change} |")
+    return "\n".join(lines) + "\n"
+
+# --- Main Logic ---
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the harness's hot paths on real and synthetic result corpora.")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help="Benchmarks to run (default: all).")
+    parser.add_argument("--scales", type=str, default=",".join(map(str, SCALES)),
+                        help=f"Comma-separated corpus multipliers (default: {','.join(map(str, SCALES))}).")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="Timed runs per benchmark (best is kept).")
+    parser.add_argument("--results-root", type=str, default=RESULTS_ROOT, help="Real corpus: the dated run folders.")
+    parser.add_argument("--prompts", type=str, default=PROMPTS_DIR, help="Prompt folder (result types).")
+    parser.add_argument("--baseline", type=str, default=BASELINE_FILE, help="Baseline report to check against.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline instead of checking.")
+    parser.add_argument("--tolerance", type=float, default=TIME_TOLERANCE, help="Allowed calibrated slowdown (0.25 = 25%%).")
+    args = parser.parse_args()
+
+    scales = [int(s) for s in args.scales.split(',') if s.strip()]
+    baseline_path = Path(args.baseline)
+    baseline = None
+    if not args.save_baseline and baseline_path.is_file():
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+
+    cases = [(name, scale) for name in args.only for scale in scales]
+    report = run_suite(cases, args.repeats, Path(args.results_root), Path(args.prompts))
+
+    # A busy machine makes single runs slow at random: flagged benchmarks are
+    # measured again and only count if they stay over the limit every time
+    for attempt in range(CONFIRM_ATTEMPTS):
+        if baseline is None:
+            break
+        flagged = sorted({(name, scale) for name, scale, _ in find_regressions(report, baseline, args.tolerance)})
+        if not flagged:
+            break
+        print(f"Re-measuring {len(flagged)} flagged benchmarks (attempt {attempt + 1}/{CONFIRM_ATTEMPTS})...")
+        retry = run_suite(flagged, args.repeats, Path(args.results_root), Path(args.prompts))
+        retried = {(r['name'], r['scale']): r for r in retry['rows']}
+        for i, row in enumerate(report['rows']):
+            again = retried.get((row['name'], row['scale']))
+            if again:
+                # Keep the better of both measurements, in this report's calibration unit
+                ratio = report['calibration_s'] / retry['calibration_s']
+                report['rows'][i] = dict(row,
+                    best_s=min(row['best_s'], again['best_s'] * ratio),
+                    median_s=min(row['median_s'], again['median_s'] * ratio),
+                    calibrated=min(row['calibrated'], again['calibrated']),
+                    peak_kib=min(row['peak_kib'], again['peak_kib']))
+
+    report_dir = Path(REPORT_DIR)
+    report_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    (report_dir / f"harness_{stamp}.json").write_text(json.dumps(report, indent=2), encoding='utf-8')
+    (report_dir / f"harness_{stamp}.md").write_text(render_report(report, baseline), encoding='utf-8')
+    print(f"Report: {report_dir / f'harness_{stamp}.md'}")
+
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2), encoding='utf-8')
+        print(f"Baseline saved: {baseline_path}")
+        return 0
+    if baseline is None:
+        print(f"[INFO] No baseline at {baseline_path}; run with --save-baseline to create one.")
+        return 0
+    problems = find_regressions(report, baseline, args.tolerance)
+    if problems:
+        print(f"[ERROR] {len(problems)} regressions against {baseline_path}:")
+        for _, _, message in problems:
+            print(f"  - {message}")
+        return 1
+    print(f"No regressions against {baseline_path}.")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,162 @@
+# utils/llmbench.py
+import sys
+import argparse
+import datetime
+from pathlib import Path
+
+# --- Configuration ---
+RESULTS_ROOT = 'results'
+RUN_RESULTS_SUBDIR = 'results'   # <run-dir>/results: raw .md transcripts
+RUN_HTML_SUBDIR = 'html'         # <run-dir>/html: extracted .html pages
+RUN_INDEX_FILENAME = 'index.html'
+
+# Pipeline stages and the stages each one depends on
+STAGES = {
+    'generate': [],
+    'extract': ['generate'],
+    'validate': ['extract'],
+    'score': ['extract'],
+    'publish': ['extract'],
+}
+STAGE_ORDER = ['generate', 'extract', 'validate', 'score', 'publish']
+
+# --- Helper Functions ---
+
+def default_run_dir() -> Path:
+    """Today's dated run folder, e.g. results/2026.02.04"""
+    return Path(RESULTS_ROOT) / datetime.date.today().strftime("%Y.%m.%d")
+
+def resolve_stages(targets, skip):
+    """Returns the targets plus all their dependencies, in execution order, minus skipped stages."""
+    needed = set()
+    def visit(stage):
+        if stage in needed:
+            return
+        needed.add(stage)
+        for dep in STAGES[stage]:
+            visit(dep)
+    for target in targets:
+        visit(target)
+    return [s for s in STAGE_ORDER if s in needed and s not in skip]
+
+# --- Stages ---
+# Each stage returns a process-style exit code (0 = success).
+
+def stage_generate(run_dir: Path, extra_args, extract: bool = True) -> int:
+    """Runs run_benchmarks.py in-process, extracting each model's HTML as soon as its generation finishes."""
+    from run_benchmarks import main as run_benchmarks_main
+    argv = ["--results-dir", str(run_dir / RUN_RESULTS_SUBDIR)]
+    if extract:
+        argv.extend(["--extract-dir", str(run_dir / RUN_HTML_SUBDIR)])
+    argv.extend(extra_args)
+    print(f"[generate] run_benchmarks {' '.join(argv)}")
+    return run_benchmarks_main(argv)
+
+def stage_extract(run_dir: Path) -> int:
+    from extract_html import extract_last_html, extract_cache_dir
+    source_dir = run_dir / RUN_RESULTS_SUBDIR
+    if not source_dir.is_dir():
+        print(f"[extract] Error: '{source_dir}' not found.")
+        return 1
+    extract_last_html(source_dir, run_dir / RUN_HTML_SUBDIR, extract_cache_dir(source_dir))
+    return 0
+
+def stage_validate(run_dir: Path) -> int:
+    from validate_outputs import validate_dirs, write_reports, get_checker, validate_cache_dir
+    if not (run_dir / RUN_HTML_SUBDIR).is_dir():
+        print(f"[validate] Error: '{run_dir / RUN_HTML_SUBDIR}' not found.")
+        return 1
+    write_reports(validate_dirs([run_dir], get_checker(), validate_cache_dir(run_dir)))
+    return 0
+
+def stage_score(run_dir: Path, baseline=None, candidate=None) -> int:
+    """Scores run_dir (unless --candidate names another date) against each model's previous run."""
+    from compare_runs import write_comparison_report, OUTPUT_MD_FILENAME, OUTPUT_HTML_FILENAME
+    results_root = run_dir.parent
+    comparisons = write_comparison_report(
+        baseline, candidate or run_dir.name, results_root=str(results_root),
+        output_md=str(results_root / Path(OUTPUT_MD_FILENAME).name),
+        output_html=str(results_root / Path(OUTPUT_HTML_FILENAME).name),
+    )
+    return 0 if comparisons is not None else 1
+
+def stage_publish(run_dir: Path) -> int:
+    from static_viewer import generate_viewer
+    from viewer_index import generate_index_viewer
+    generate_viewer(
+        results_dir=str(run_dir / RUN_HTML_SUBDIR),
+        output_filename=str(run_dir / RUN_INDEX_FILENAME)
+    )
+    # The all-runs page next to the dated folders picks up this run too
+    generate_index_viewer(results_root=str(run_dir.parent), output_filename=str(run_dir.parent / RUN_INDEX_FILENAME))
+    # Hashed shared assets, minified pages and .gz/.br siblings for static hosting
+    from site_build import build_site
+    return 0 if build_site(run_dir.parent) is not None else 1
+
+def run_stage(stage: str, args, extra_args) -> int:
+    run_dir = Path(args.run_dir) if args.run_dir else default_run_dir()
+    if stage == 'generate':
+        return stage_generate(run_dir, extra_args, extract=not getattr(args, 'no_extract', False))
+    if stage == 'extract':
+        return stage_extract(run_dir)
+    if stage == 'validate':
+        return stage_validate(run_dir)
+    if stage == 'score':
+        return stage_score(run_dir, getattr(args, 'baseline', None), getattr(args, 'candidate', None))
+    if stage == 'publish':
+        return stage_publish(run_dir)
+    raise ValueError(f"Unknown stage: {stage}")
+
+# --- Main Execution ---
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="llmbench",
+        description="LocalLLM Visual Code Test: generate -> extract -> validate/score -> publish."
+    )
+    parser.add_argument(
+        "--run-dir",
+        type=str,
+        default=None,
+        help=f"Dated run folder (default: {RESULTS_ROOT}/<today YYYY.MM.DD>)."
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="Run the benchmarks (extra args are passed to run_benchmarks.py).")
+    gen.add_argument("--no-extract", action="store_true", help="Don't extract HTML while generating.")
+    sub.add_parser("extract", help="Extract HTML from the run's transcripts.")
+    sub.add_parser("validate", help="Syntax/structure-check the run's extracted HTML.")
+    score = sub.add_parser("score", help="Write the cross-run comparison report.")
+    score.add_argument("--baseline", type=str, default=None)
+    score.add_argument("--candidate", type=str, default=None)
+    sub.add_parser("publish", help="Generate the run's static viewer page and rebuild the servable site.")
+
+    pipe = sub.add_parser("pipeline", help="Run stages with their dependencies (extra args go to generate).")
+    pipe.add_argument(
+        "--targets",
+        nargs="+",
+        choices=STAGE_ORDER,
+        default=["validate", "score", "publish"],
+        help="Stages to reach; their dependencies run first."
+    )
+    pipe.add_argument("--skip", nargs="+", choices=STAGE_ORDER, default=[], help="Stages to leave out.")
+
+    args, extra_args = parser.parse_known_args(argv)
+    if extra_args and args.command not in ("generate", "pipeline"):
+        parser.error(f"unrecognized arguments: {' '.join(extra_args)}")
+
+    if args.command != "pipeline":
+        return run_stage(args.command, args, extra_args)
+
+    stages = resolve_stages(args.targets, set(args.skip))
+    print(f"Pipeline: {' -> '.join(stages) or '(nothing to do)'}")
+    for stage in stages:
+        print(f"\n=== {stage} ===")
+        code = run_stage(stage, args, extra_args)
+        if code != 0:
+            print(f"[FATAL] Stage '{stage}' failed (exit code {code}). Stopping pipeline.")
+            return code
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+# utils/load_bench.py
+import os
+import re
+import mmap
+import ctypes
+import ctypes.util
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# Load strategies per backend: name -> extra startup args. 'mmap' is the
+# default for both servers (weights are paged in from the file on demand).
+LOAD_STRATEGIES = {
+    'llamacpp': {
+        'mmap': [],
+        'no-mmap': ['--no-mmap'],
+        'mlock': ['--mlock'],
+    },
+    'koboldcpp': {
+        'mmap': [],
+        'no-mmap': ['--nommap'],
+        'mlock': ['--usemlock'],
+    },
+}
+CACHE_STATES = ('cold', 'warm')
+DEFAULT_REPEATS = 2
+READY_POLL_SECONDS = 0.25          # Much finer than wait_for_server's default, we are timing it
+RESIDENCY_WINDOW = 1024**3         # mincore() is queried one 1 GiB mapping at a time
+
+MULTIPART_PATTERN = re.compile(r'-(\d+)-of-(\d+)\.gguf$')
+
+# --- Model Files ---
+
+def model_files(model_path: Path) -> List[Path]:
+    """All files of a model: the path itself, or every part of a split GGUF (-00001-of-0000N)."""
+    model_path = Path(model_path)
+    match = MULTIPART_PATTERN.search(model_path.name)
+    if not match:
+        return [model_path]
+    total = match.group(2)
+    prefix = model_path.name[:match.start()]
+    parts = [model_path.with_name(f"{prefix}-{n:0{len(total)}d}-of-{total}.gguf") for n in range(1, int(total) + 1)]
+    return [p for p in parts if p.is_file()]
+
+# --- Page Cache ---
+
+def evict_page_cache(paths: List[Path]) -> bool:
+    """
+    Drops the files' clean pages from the page cache (posix_fadvise DONTNEED).
+    Pages still mapped or locked by a running process stay resident, so call
+    this with the server stopped. Returns False where fadvise is unavailable.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)  # Dirty pages can't be dropped
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+def warm_page_cache(paths: List[Path], chunk_size: int = 16 * 1024**2):
+    """Reads the files end to end so their pages are cached."""
+    for path in paths:
+        with open(path, 'rb', buffering=0) as f:
+            while f.read(chunk_size):
+                pass
+
+_libc = None
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        libc.mmap.restype = ctypes.c_void_p
+        libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_long]
+        libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_char_p]
+        _libc = libc
+    return _libc
+
+def page_cache_residency(paths: List[Path]) -> Optional[float]:
+    """
+    Fraction (0..1) of the files' pages currently in the page cache, via
+    mincore(). Best effort: None where mincore is not available.
+    """
+    try:
+        libc = _load_libc()
+    except (OSError, AttributeError):
+        return None
+    page = mmap.PAGESIZE
+    resident = total = 0
+    for path in paths:
+        size = path.stat().st_size
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            for offset in range(0, size, RESIDENCY_WINDOW):
+                length = min(RESIDENCY_WINDOW, size - offset)
+                addr = libc.mmap(None, length, mmap.PROT_READ, mmap.MAP_SHARED, fd, offset)
+                if addr in (None, ctypes.c_void_p(-1).value):
+                    return None
+                try:
+                    pages = (length + page - 1) // page
+                    vec = ctypes.create_string_buffer(pages)
+                    if libc.mincore(addr, length, vec) != 0:
+                        return None
+                    resident += pages - vec.raw[:pages].count(0)  # Non-zero byte = page resident
+                    total += pages
+                finally:
+                    libc.munmap(addr, length)
+        finally:
+            os.close(fd)
+    return resident / total if total else None
+
+# --- Report ---
+
+def median(values: List[float]) -> Optional[float]:
+    values = sorted(values)
+    if not values:
+        return None
+    mid = len(values) // 2
+    return values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+
+def fastest_strategies(rows: List[Dict[str, Any]]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Per cache state, the strategy with the lowest median time-to-ready (None if none loaded)."""
+    best = {}
+    for state in CACHE_STATES:
+        candidates = [r for r in rows if r['cache'] == state and r['ready_median'] is not None]
+        best[state] = min(candidates, key=lambda r: r['ready_median']) if candidates else None
+    return best
+
+def render_load_report(results: List[Dict[str, Any]]) -> str:
+    """Markdown report: time-to-ready per model x strategy x cache state, plus the fastest strategy per model."""
+    def fmt(value, spec, scale=1.0):
+        return format(value / scale, spec) if value is not None else "n/a"
+
+    lines = [
+        "# Model Load Benchmark",
+        "",
+        "Time-to-ready (spawn until the server reports ready) per load strategy. "
+        "Cold = the model's pages were evicted from the page cache first; warm = fully cached. "
+        "Residency is the share of the file in the page cache just before the server started.",
+        "",
+        "| Model | Size GiB | Strategy | Cache | Ready s (median) | Runs | Residency | Peak memory GiB |",
+        "|---|---|---|---|---|---|---|---|",
+    ]
+    for model in results:
+        for r in model['rows']:
+            lines.append(
+                f"| {model['model']} | {fmt(model['size_bytes'], '.1f', 1024**3)} | {r['strategy']} | {r['cache']} "
+                f"| {fmt(r['ready_median'], '.2f')} | {len(r['ready_times'])}/{r['attempted']} "
+                f"| {fmt(r['residency'], '.0%')} | {fmt(r['memory_bytes'], '.2f', 1024**3)} |"
+            )
+
+    lines += ["", "## Fastest Strategy", "", "| Model | Size GiB | Cold | Warm |", "|---|---|---|---|"]
+    for model in sorted(results, key=lambda m: m['size_bytes']):
+        best = fastest_strategies(model['rows'])
+        cells = [f"{b['strategy']} ({b['ready_median']:.2f}s)" if b else "n/a" for b in (best['cold'], best['warm'])]
+        lines.append(f"| {model['model']} | {fmt(model['size_bytes'], '.1f', 1024**3)} | {cells[0]} | {cells[1]} |")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,132 @@
+# utils/output_stream.py
+import os
+import json
+import time
+import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional
+
+# --- Configuration ---
+PARTIAL_FOLDER_NAME = '.partial'   # Inside each results folder; dot-prefixed, so no tool reads it as results
+THINK_OPEN_BLOCK = "<think>\n"
+THINK_CLOSE_BLOCK = "\n</think>\n\n"
+SIDECAR_INTERVAL_S = 5             # While generating, the sidecar is rewritten at most this often...
+SIDECAR_INTERVAL_CHARS = 16 * 1024  # ...or after this many new characters, whichever comes first
+
+# A generation is written to <results>/.partial/<name>.md as its tokens
+# arrive (flushed per chunk, so a crash or Ctrl+C loses at most the chunk
+# in flight), with a <name>.md.json sidecar describing the run: model,
+# prompt, backend, start time, characters written and status. The sidecar
+# is refreshed every SIDECAR_INTERVAL_S / SIDECAR_INTERVAL_CHARS while
+# tokens arrive, so after a hard crash (SIGKILL, power loss) it is at most
+# that far behind the text. On success the file is rewritten in its final
+# form (trimmed answer, <think> block, metadata comments), fsynced and
+# renamed into the results folder in one step, so readers never see
+# half-written transcripts. On failure or interruption both files stay in
+# .partial with the sidecar's status set to 'failed' or 'interrupted';
+# they are removed once the same model x prompt completes. This bounds the
+# write path only: the backend still collects the whole answer as one
+# string (trimming, reasoning separation, replay cache, early stop), so peak
+# memory still grows with the output length.
+
+def write_atomic(path: Path, parts: Iterable[str]):
+    """Writes parts one after another to a temp file next to path, then renames it into place."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for part in parts:
+            f.write(part)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+class OutputStream:
+    """
+    One generation being written to disk. The backend calls write() for each
+    streamed piece; the runner then calls commit() with the final transcript
+    or abort() with a reason.
+    """
+    def __init__(self, results_dir: Path, filename: str, meta: Dict[str, Any]):
+        self.partial_dir = Path(results_dir) / PARTIAL_FOLDER_NAME
+        self.partial_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.partial_dir / filename
+        self.sidecar = self.path.with_name(self.path.name + '.json')
+        self.meta = dict(meta, started=datetime.datetime.now().isoformat(timespec='seconds'))
+        self.chars = 0
+        self.closed = False
+        self._kind = 'content'
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._write_sidecar('generating')
+
+    def _write_sidecar(self, status: str, reason: Optional[str] = None):
+        info = dict(self.meta, status=status, chars=self.chars,
+                    updated=datetime.datetime.now().isoformat(timespec='seconds'))
+        if reason:
+            info['reason'] = reason
+        write_atomic(self.sidecar, [json.dumps(info, indent=2)])
+        self._sidecar_t = time.monotonic()
+        self._sidecar_chars = self.chars
+
+    def write(self, kind: str, text: str):
+        """Appends a streamed piece ('reasoning' or 'content'); reasoning goes inside a <think> block."""
+        if kind != self._kind:
+            self._file.write(THINK_OPEN_BLOCK if kind == 'reasoning' else THINK_CLOSE_BLOCK)
+            self._kind = kind
+        self._file.write(text)
+        self._file.flush()
+        self.chars += len(text)
+        if (self.chars - self._sidecar_chars >= SIDECAR_INTERVAL_CHARS or
+                time.monotonic() - self._sidecar_t >= SIDECAR_INTERVAL_S):
+            self._write_sidecar('generating')
+
+    def reset(self):
+        """Drops what was streamed so far."""
+        self._file.seek(0)
+        self._file.truncate()
+        self._kind = 'content'
+        self.chars = 0
+
+    def commit(self, final_path: Path, parts: Iterable[str]) -> Path:
+        """
+        Replaces the streamed text with the final transcript (written part by
+        part, never joined in memory) and renames it to final_path. Older
+        partials of the same model x prompt are removed.
+        """
+        self.reset()
+        for part in parts:
+            self._file.write(part)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self.closed = True
+        os.replace(self.path, final_path)
+        self.sidecar.unlink(missing_ok=True)
+        # Matched on the sidecar's fields, not the filename: 'ball' is a prefix of 'ball_bound'
+        for stale in list_partials(self.partial_dir.parent):
+            if stale.get('variant') == self.meta['variant'] and stale.get('prompt_stem') == self.meta['prompt_stem']:
+                Path(stale['path']).unlink(missing_ok=True)
+                Path(stale['path'] + '.json').unlink(missing_ok=True)
+        return Path(final_path)
+
+    def abort(self, reason: str, status: str = 'failed'):
+        """Keeps the streamed text in .partial and records why the output is incomplete."""
+        if self.closed:
+            return
+        self._file.close()
+        self.closed = True
+        self._write_sidecar(status, reason)
+
+def list_partials(results_dir: Path) -> List[Dict[str, Any]]:
+    """Sidecars of the incomplete outputs kept in results_dir/.partial, oldest first."""
+    partial_dir = Path(results_dir) / PARTIAL_FOLDER_NAME
+    if not partial_dir.is_dir():
+        return []
+    partials = []
+    for sidecar in sorted(partial_dir.glob('*.json')):
+        try:
+            info = json.loads(sidecar.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue
+        info['path'] = str(sidecar.with_suffix(''))
+        partials.append(info)
+    return sorted(partials, key=lambda p: p.get('started', ''))
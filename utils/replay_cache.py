@@ -0,0 +1,143 @@
+# utils/replay_cache.py
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+# --- Configuration ---
+DEFAULT_CACHE_DIR = 'results/.cache/replay'
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_MB = 512
+CACHE_VERSION = 2                      # 2: sampled model fingerprints
+
+# A cache entry is one finished generation (answer, reasoning, timings) stored
+# as <dir>/<key[:2]>/<key>.json. The key covers everything that decides the
+# output: model file, backend, startup args, prompt, template and generation
+# params. Only deterministic requests are cached (fixed seed >= 0, or greedy
+# sampling with temperature 0); with seed -1 every run is a new sample.
+
+def model_fingerprint(model_path: Path) -> str:
+    """Sampled identity of the model file(s), cached by path, size, mtime and inode (gguf_fingerprint.py)."""
+    from gguf_fingerprint import model_fingerprint as sampled_fingerprint
+    return sampled_fingerprint(model_path)
+
+def is_deterministic(generation_params: Dict[str, Any]) -> bool:
+    seed = generation_params.get('seed', -1)
+    if seed is not None and int(seed) >= 0:
+        return True
+    return generation_params.get('temperature') == 0
+
+def make_key(identity: Dict[str, Any], prompt: str, generation_params: Dict[str, Any],
+             prompt_template: Dict[str, Any], early_stop: Optional[Dict[str, Any]],
+             thinking_budget: Optional[Dict[str, Any]]) -> str:
+    material = {
+        'version': CACHE_VERSION,
+        'identity': identity,
+        'prompt_sha256': hashlib.sha256(prompt.encode('utf-8')).hexdigest(),
+        'prompt_template': prompt_template,
+        'generation_params': generation_params,
+        'early_stop': early_stop,
+        'thinking_budget': thinking_budget,
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+class ReplayCache:
+    """
+    Size-bounded LRU store of finished generations. Recency is the entry
+    file's mtime (touched on every hit), so it survives across runs; the
+    in-memory index is built from the directory on first use.
+    """
+    def __init__(self, root: Path, max_entries: int = DEFAULT_MAX_ENTRIES, max_mb: float = DEFAULT_MAX_MB):
+        self.root = Path(root)
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024**2)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # Pool threads share one cache
+        self._index: Optional[Dict[str, list]] = None   # key -> [last_used, size]
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def _load_index(self):
+        if self._index is not None:
+            return
+        self._index = {}
+        if not self.root.is_dir():
+            return
+        for path in self.root.glob('*/*.json'):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            self._index[path.stem] = [st.st_mtime, st.st_size]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                entry = json.loads(path.read_text(encoding='utf-8'))
+                now = time.time()  # Set explicitly: filesystem mtime granularity can be coarse
+                os.utime(path, (now, now))
+                self._index[key][0] = now
+            except (OSError, ValueError) as e:
+                print(f"  [WARN] Dropping unreadable replay entry {key[:12]}: {e}")
+                self._index.pop(key, None)
+                path.unlink(missing_ok=True)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry
+
+    def contains(self, key: str) -> bool:
+        with self._lock:
+            self._load_index()
+            return key in self._index
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        payload = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        path = self._path(key)
+        with self._lock:
+            self._load_index()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.tmp")
+            tmp.write_bytes(payload)
+            os.replace(tmp, path)
+            now = time.time()
+            os.utime(path, (now, now))
+            self._index[key] = [now, len(payload)]
+            self._evict()
+
+    def _evict(self):
+        """Drops least recently used entries until both bounds hold."""
+        total = sum(size for _, size in self._index.values())
+        if len(self._index) <= self.max_entries and total <= self.max_bytes:
+            return
+        for key, (_, size) in sorted(self._index.items(), key=lambda kv: kv[1][0]):
+            if len(self._index) <= self.max_entries and total <= self.max_bytes:
+                break
+            self._path(key).unlink(missing_ok=True)
+            del self._index[key]
+            total -= size
+
+    def summary(self) -> str:
+        with self._lock:
+            self._load_index()
+            total = sum(size for _, size in self._index.values())
+            return (f"{self.hits} hits, {self.misses} misses, {len(self._index)} entries "
+                    f"({total / 1024**2:.1f}/{self.max_bytes / 1024**2:.0f} MiB)")
+
+def cache_from_config(settings: Dict[str, Any]) -> ReplayCache:
+    """Builds the cache from server.replay_cache in config.yaml."""
+    return ReplayCache(
+        Path(settings.get('dir', DEFAULT_CACHE_DIR)).expanduser(),
+        max_entries=settings.get('max_entries', DEFAULT_MAX_ENTRIES),
+        max_mb=settings.get('max_mb', DEFAULT_MAX_MB),
+    )
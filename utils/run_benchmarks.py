@@ -5,24 +5,39 @@ import time
 import datetime
 import signal
 import re
+import json
+import os
+import threading
+import subprocess
 from pathlib import Path
+from typing import Optional, Dict, Any, List
 
-# --- Import New Config Logic ---
-try:
-    from config_loader import ConfigLoader
-    from backend import KoboldBackend, LlamaCppBackend
-except ImportError as e:
-    print(f"[FATAL] Import Error: {e}")
-    print("Ensure you are running this from the parent directory or have set PYTHONPATH.")
-    sys.exit(1)
-
-# --- Load Configuration ---
-try:
-    # Looks for config.yaml in current dir or parent dir
-    cfg = ConfigLoader("config.yaml") 
-except Exception as e:
-    print(f"[FATAL] Configuration Load Error: {e}")
-    sys.exit(1)
+from timeline import TRACER
+
+# Importing this module has no side effects and only pulls in the standard
+# library: the config (yaml), the backends (requests) and the mode-specific
+# modules are imported by the functions that use them. main() is the CLI;
+# other tools drive a run in-process through BenchmarkRunner:
+#
+#   runner = BenchmarkRunner(load_config(), parse_options(["--backend", "llamacpp"]))
+#   found = runner.discover()                  # models, prompts, output folders
+#   result = runner.execute(found, runner.plan(found))
+#   runner.report(result)
+
+# --- Configuration ---
+CONFIG_FILENAME = "config.yaml"
+BACKEND_NAMES = ["llamacpp", "koboldcpp"]
+STARTUP_BUDGET_MS = 50                    # `import run_benchmarks` in a fresh interpreter (--startup-check)
+STARTUP_SAMPLES = 3                       # Fastest of N imports; the first one also pays for cold .pyc reads
+HEAVY_MODULES = ('requests', 'yaml')      # Must not be imported by `import run_benchmarks`
+MULTIPART_PATTERN = re.compile(r'-(\d+)-of-(\d+)\.gguf$')
+META_MARKER = '<!-- Benchmark Info -->'
+THREAD_FLAGS = ('-t', '--threads')        # Same spelling in llama-server and koboldcpp
+COORDINATOR_TOKEN_ENV = 'LLMBENCH_COORDINATOR_TOKEN'  # Keeps the shared secret out of `ps`
+FINGERPRINT_PATTERN = re.compile(r'<!--\s*Model Fingerprint:\s*(\S+)\s*-->')
+
+class BenchmarkError(RuntimeError):
+    """A run cannot start: missing folders, no models or prompts, or a backend that can't be set up."""
 
 # --- Helper Functions ---
 def print_with_timestamp(message: str, start_time: datetime.datetime):
@@ -35,260 +50,1442 @@ def wait_for_server(backend, startup_wait_time: int, check_interval: int = 3):
     """Waits for the server to become ready."""
     print(f"  Waiting up to {startup_wait_time}s for {backend.get_backend_name()}...")
     start_wait = time.time()
-    
-    while time.time() - start_wait < startup_wait_time:
-        if backend.is_server_ready():
-            print(f"  Server is ready (took {time.time() - start_wait:.1f}s).")
-            return True
-        time.sleep(check_interval)
+
+    with TRACER.span('wait ready', 'server', interval=check_interval):
+        while time.time() - start_wait < startup_wait_time:
+            with TRACER.span('poll', 'server'):
+                ready = backend.is_server_ready()
+            if ready:
+                print(f"  Server is ready (took {time.time() - start_wait:.1f}s).")
+                return True
+            with TRACER.span('poll sleep', 'idle'):
+                time.sleep(check_interval)
 
     print(f"  [ERROR] Server did not become ready within {startup_wait_time}s.")
-    print(f"  Stderr glimpse:\n---\n{backend.get_process_stderr()[-2000:]}\n---") 
+    print(f"  Stderr glimpse:\n---\n{backend.get_process_stderr()[-2000:]}\n---")
     return False
 
-def check_if_output_exists(results_dir: Path, model_stem: str, prompt_stem: str) -> bool:
-    """Checks if an output file exists for the given model/prompt combo."""
+_recorded_fingerprints: Dict[tuple, Optional[str]] = {}
+
+def get_recorded_fingerprint(path: Path) -> Optional[str]:
+    """Model fingerprint in an output's metadata (None for outputs written before fingerprinting)."""
+    key = (str(path), path.stat().st_mtime_ns)
+    if key not in _recorded_fingerprints:
+        from transcript_store import read_transcript, logical_path
+        try:
+            content = read_transcript(logical_path(path))
+        except (OSError, ValueError, RuntimeError):
+            content = ""
+        match = FINGERPRINT_PATTERN.search(content, max(content.rfind(META_MARKER), 0))
+        _recorded_fingerprints[key] = match.group(1) if match else None
+    return _recorded_fingerprints[key]
+
+def check_if_output_exists(results_dir: Path, model_stem: str, prompt_stem: str,
+                           fingerprint: Optional[str] = None) -> bool:
+    """
+    Checks if an output file exists for the given model/prompt combo. With a
+    fingerprint, outputs generated from a different file under the same name
+    don't count (outputs without a recorded fingerprint still do).
+    """
     safe_model = model_stem.replace('/', '_').replace('\\', '_').replace(':','_')
     safe_prompt = prompt_stem.replace('/', '_').replace('\\', '_').replace(':','_')
-    pattern = f"{safe_model}_{safe_prompt}_*.md"
+    # Transcripts may have been compressed in place (transcript_store.py: .md -> .md.zst)
+    pattern = f"{safe_model}_{safe_prompt}_*.md*"
     try:
-        return any(results_dir.glob(pattern))
+        existing = list(results_dir.glob(pattern))
     except Exception:
         return False
+    if fingerprint is None or not existing:
+        return bool(existing)
+    return any(get_recorded_fingerprint(p) in (None, fingerprint) for p in existing)
+
+def get_output_filename(model_stem: str, prompt_stem: str, fallback: bool) -> str:
+    """Builds the timestamped output filename for a model/prompt combo."""
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_model = model_stem.replace('/', '_').replace('\\', '_').replace(':', '_')
+    safe_prompt = prompt_stem.replace('/', '_').replace('\\', '_').replace(':', '_')
+    suffix = '_fallback' if fallback else ''
+    return f"{safe_model}_{safe_prompt}_{timestamp}{suffix}.md"
+
+def build_meta_comment(backend_name: str, model_name: str, prompt_name: str, gen_time: float,
+                       fallback: bool, timings: dict, hardware: Optional[dict] = None,
+                       early_stop: Optional[dict] = None, thinking: Optional[dict] = None,
+                       replayed: bool = False, load: Optional[dict] = None,
+                       timeout: Optional[dict] = None, fingerprint: Optional[str] = None) -> str:
+    """The HTML comment block appended to every saved output."""
+    meta_comment = (
+        f"\n\n<!-- Benchmark Info -->\n"
+        f"<!-- Backend: {backend_name} -->\n"
+        f"<!-- Model: {model_name} -->\n"
+        f"<!-- Prompt: {prompt_name} -->\n"
+        f"<!-- Time: {gen_time:.2f}s -->\n"
+        f"<!-- Fallback: {fallback} -->"
+    )
+    if fingerprint:
+        # Identity of the GGUF file(s); resume checks compare it, not just the filename
+        meta_comment += f"\n<!-- Model Fingerprint: {fingerprint} -->"
+    if timings.get('predicted_per_second'):
+        meta_comment += f"\n<!-- Tokens/s: {timings['predicted_per_second']:.2f} -->"
+    if thinking:
+        tokens = f"{thinking['tokens']} tokens, " if thinking.get('tokens') is not None else ""
+        seconds = f"{thinking['seconds']:.2f}s, " if thinking.get('seconds') is not None else ""
+        meta_comment += f"\n<!-- Thinking: {tokens}{seconds}{thinking['chars']} chars -->"
+    if early_stop:
+        # Time above is truncated; compare_runs keeps these apart from full-length runs
+        meta_comment += (
+            f"\n<!-- Early Stop: HTML complete at {early_stop['html_complete_s']:.2f}s, "
+            f"stopped at {early_stop['stopped_s']:.2f}s ({early_stop['chars_after_html']} chars after </html>) -->"
+        )
+    if load:
+        residency = f", page cache {load['residency']:.0%}" if load.get('residency') is not None else ""
+        meta_comment += f"\n<!-- Load: {load['seconds']:.1f}s{residency} -->"
+    if timeout and timeout['expected'] is not None:
+        meta_comment += f"\n<!-- Timeout: {timeout['timeout']:.0f}s (expected {timeout['expected']:.0f}s, {timeout['basis']}) -->"
+    if replayed:
+        # Answer and timings come from the replay cache, not a new generation
+        meta_comment += "\n<!-- Replayed: True -->"
+    if hardware:
+        from distributed import hardware_summary
+        meta_comment += f"\n<!-- Host: {hardware['hostname']} -->"
+        meta_comment += f"\n<!-- Hardware: {hardware_summary(hardware)} -->"
+    return meta_comment
+
+def read_prompt(prompt_path: Path) -> str:
+    raw_text = prompt_path.read_text(encoding='utf-8', errors='replace')
+    # Sanitize BOM if present
+    return raw_text[1:] if raw_text.startswith('\ufeff') else raw_text
+
+def get_latest_output_time(results_dir: Path, model_stem: str, prompt_stem: str) -> Optional[float]:
+    """Returns the generation time recorded in the newest output for a model/prompt combo."""
+    from compare_runs import parse_transcript
+    from static_viewer import parse_result_filename
+    from transcript_store import logical_path
+    safe_model = model_stem.replace('/', '_').replace('\\', '_').replace(':','_')
+    safe_prompt = prompt_stem.replace('/', '_').replace('\\', '_').replace(':','_')
+    existing = set()
+    for path in results_dir.glob(f"{safe_model}_{safe_prompt}_*.md*"):
+        path = logical_path(path)
+        # The glob also matches longer prompt stems ('ball' -> 'ball_bound_...'); fallbacks don't parse
+        parsed = parse_result_filename(path.name, [safe_prompt], extension='md')
+        if parsed and parsed['model'] == safe_model:
+            existing.add(path)
+    existing = sorted(existing)
+    if not existing:
+        return None
+    sample = parse_transcript(existing[-1])
+    return sample['time'] if sample else None
+
+def get_run_variants(model_stem: str, model_config: dict) -> list:
+    """
+    Returns the (output_stem, config) pairs to benchmark for a model.
+    Models with a draft configured are run standalone first, then with the
+    draft model loaded for speculative decoding.
+    """
+    variants = [(model_stem, dict(model_config, draft=None))]
+    draft = model_config.get('draft')
+    if draft:
+        draft_config = dict(model_config)
+        draft_config['generation_params'] = {**model_config['generation_params'], **draft.get('generation_params', {})}
+        variants.append((f"{model_stem}+draft-{Path(draft['model']).stem}", draft_config))
+    return variants
+
+def output_parts(backend, answer: str, meta_comment: str = "") -> list:
+    """
+    Saved transcript as parts to write in order (never joined for the file):
+    the reasoning trace (if any) in a leading <think> block, the answer, the metadata.
+    """
+    parts = ["<think>\n", backend.last_reasoning, "\n</think>\n\n"] if backend.last_reasoning else []
+    return parts + [answer, meta_comment]
+
+def format_output(backend, answer: str) -> str:
+    """Saved transcript: the reasoning trace (if any) in a leading <think> block, then the answer."""
+    return "".join(output_parts(backend, answer))
+
+def get_failure_reason(backend, timeout_outcome: Optional[dict] = None) -> str:
+    if timeout_outcome and timeout_outcome['timed_out']:
+        return f"Predicted Timeout ({timeout_outcome['timeout']:.0f}s, {timeout_outcome['basis']})"
+    if backend.last_thinking and backend.last_thinking.get('budget_exceeded'):
+        return "Thinking Budget Exceeded"
+    return "Generation Failed"
 
-def get_backend_instance(backend_name: str, config_loader: ConfigLoader, host: str, port: int):
+def get_acceptance_rate(timings: dict) -> Optional[float]:
+    """Draft acceptance rate from llama-server timings (None if no draft tokens)."""
+    drafted = timings.get('draft_n') or 0
+    if drafted <= 0:
+        return None
+    return timings.get('draft_n_accepted', 0) / drafted
+
+def build_draft_meta(draft: dict, timings: dict, gen_time: float, base_time: Optional[float]) -> tuple:
+    """
+    Metadata lines for a speculative output (draft model, acceptance, speedup
+    over the standalone base_time), plus the acceptance and speedup themselves.
+    """
+    acceptance = get_acceptance_rate(timings)
+    speedup = base_time / gen_time if base_time and gen_time > 0 else None
+    meta_comment = f"\n<!-- Draft: {draft['model'].name} -->"
+    if acceptance is not None:
+        meta_comment += (
+            f"\n<!-- Draft Acceptance: {acceptance:.3f} "
+            f"({timings.get('draft_n_accepted', 0)}/{timings.get('draft_n', 0)}) -->"
+        )
+    if speedup is not None:
+        meta_comment += f"\n<!-- Speedup: {speedup:.2f}x -->"
+    return meta_comment, acceptance, speedup
+
+def extract_outputs(output_paths: list, extract_dir: Path, cache_dir: Optional[Path]):
+    """Extracts the HTML of a finished model's outputs (runs on the extraction worker thread)."""
+    from extract_html import extract_file
+    extract_dir.mkdir(parents=True, exist_ok=True)
+    if cache_dir is not None:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    with TRACER.span('extract', 'extract', files=len(output_paths)):
+        extracted = sum(1 for p in output_paths if extract_file(p, extract_dir, cache_dir))
+    print(f"  [EXTRACT] {extracted}/{len(output_paths)} outputs extracted to {extract_dir}")
+
+def parse_cpu_list(spec) -> list:
+    """'0-3,8,10-11' (taskset syntax) or a list of ints -> sorted core ids."""
+    if isinstance(spec, (list, tuple)):
+        return sorted(int(c) for c in spec)
+    cores = set()
+    for part in str(spec).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            lo, hi = part.split('-', 1)
+            cores.update(range(int(lo), int(hi) + 1))
+        else:
+            cores.add(int(part))
+    return sorted(cores)
+
+def get_backend_instance(backend_name: str, config_loader, host: str, port: int, **instance):
+    from backend import KoboldBackend, LlamaCppBackend
     if backend_name == "koboldcpp":
-        return KoboldBackend(config_loader, host, port)
+        return KoboldBackend(config_loader, host, port, **instance)
     elif backend_name == "llamacpp":
-        return LlamaCppBackend(config_loader, host, port)
+        return LlamaCppBackend(config_loader, host, port, **instance)
     else:
         raise ValueError(f"Unknown backend: {backend_name}")
 
-# --- Argument Parsing ---
-# Defaults are now pulled from config.yaml
-available_backends = list(cfg.get_backend_names()) if hasattr(cfg, 'get_backend_names') else ["llamacpp", "koboldcpp"]
-
-parser = argparse.ArgumentParser(description="Run LLM Benchmarks via YAML Config.")
-parser.add_argument(
-    "--backend",
-    type=str,
-    default=cfg.server_config.get('default_backend', "llamacpp"),
-    choices=available_backends,
-    help="The LLM backend to use (must be defined in config.yaml). llamacpp | koboldcpp"
-)
-parser.add_argument(
-    "--port",
-    type=int,
-    default=cfg.server_config.get('port', 5000),
-    help="Port for the backend server."
-)
-parser.add_argument(
-    "--host",
-    type=str,
-    default=cfg.server_config.get('host', '127.0.0.1'),
-    help="Host IP for the backend server."
-)
-
-args = parser.parse_args()
+# --- Configuration & Options ---
 
-# --- Main Execution ---
-start_time = datetime.datetime.now()
-print_with_timestamp(f"Starting Benchmark (Backend: {args.backend})", start_time)
-
-# 1. Setup Directories
-model_dir = cfg.paths.get('models')
-prompt_dir = cfg.paths.get('prompts')
-results_dir = cfg.paths.get('results')
-
-# filter by size
-max_size_gigs = cfg.server_config.get('max_size_gigs')
-min_size_gigs = cfg.server_config.get('min_size_gigs')
-max_size_bytes = max_size_gigs * (1024**3)  
-min_size_bytes = min_size_gigs * (1024**3)   # 1 GiB
-
-
-
-if not model_dir or not model_dir.exists():
-    print(f"[ERROR] Model directory not found: {model_dir}")
-    sys.exit(1)
-if not prompt_dir or not prompt_dir.exists():
-    print(f"[ERROR] Prompt directory not found: {prompt_dir}")
-    sys.exit(1)
-
-results_dir.mkdir(parents=True, exist_ok=True)
-
-# 2. Discover Files
-print(f"Scanning models in: {model_dir}")
-# Filter for .gguf, ignore hidden, ignore multi-part parts > 1
-
-potential_paths = model_dir.glob('*.gguf')
-filtered_model_paths = []
-for path in potential_paths:
-    model_filename = path.name
-    if not path.is_file(): continue
-    if model_filename.startswith('.') or model_filename.startswith('._'):
-        # print(f"  [INFO] Skipping hidden/system file: {model_filename}")
-        continue
-    # --- Add any specific model filename filtering here if needed ---
-    # if 'exclude_this' in model_filename.lower(): continue
-
-    # --- Filter out subsequent parts of multi-file models ---
-    # This regex looks for the pattern "-<part_num>-of-<total_parts>.gguf" at the end of the filename.
-    match = re.search(r'-(\d+)-of-(\d+)\.gguf$', model_filename)
-    if match:
-        part_number = int(match.group(1))
-        # If it's a multi-part file, only include the first part (e.g., -00001-of-...).
-        if part_number > 1:
-            # print(f"  [INFO] Skipping subsequent model part: {model_filename}")
-            continue
+def load_config(config_path: str = CONFIG_FILENAME):
+    """Loads config.yaml (current dir or parent dir)."""
+    from config_loader import ConfigLoader
+    return ConfigLoader(config_path)
 
-    try:
-        file_size = path.stat().st_size
-        if max_size_bytes is not None and file_size > max_size_bytes:
-            print(f"  [INFO] Skipping model: {model_filename} (Size {file_size / (1024**3):.2f} GiB > {max_size_bytes / (1024**3):.0f} GiB)")
-            continue
-        if min_size_bytes is not None and file_size < min_size_bytes:
-            print(f"  [INFO] Skipping model: {model_filename} (Size {file_size / (1024**3):.2f} GiB < {min_size_bytes / (1024**3):.0f} GiB)")
-            continue
-    except OSError as e:
-        print(f"  [WARN] Cannot access file stats for {model_filename} (skipped): {e}")
-        continue
-    filtered_model_paths.append(path)
-
-all_models = sorted(filtered_model_paths)
-
-
-
-print(f"Scanning prompts in: {prompt_dir}")
-all_prompts = sorted([p for p in prompt_dir.glob('*.md') if not p.name.startswith('.')])
-
-if not all_models:
-    print("[ERROR] No models found.")
-    sys.exit(1)
-if not all_prompts:
-    print("[ERROR] No prompts found.")
-    sys.exit(1)
-
-print(f"Found {len(all_models)} models and {len(all_prompts)} prompts.")
-
-# 3. Initialize Backend
-try:
-    backend = get_backend_instance(args.backend, cfg, args.host, args.port)
-except Exception as e:
-    print(f"[FATAL] Failed to initialize backend: {e}")
-    sys.exit(1)
-
-# 4. Signal Handling
-def signal_handler(sig, frame):
-    print("\nCtrl+C detected. Shutting down...")
-    backend.stop_server()
-    sys.exit(1)
-signal.signal(signal.SIGINT, signal_handler)
-
-# --- Run Loop ---
-run_counter = 0
-failed_runs = []
-
-for i, model_path in enumerate(all_models):
-    model_name = model_path.name
-    model_stem = model_path.stem
-    
-    # --- CONFIGURATION MATCHING ---
-    # This is where the magic happens. We get the specific config for this model
-    # from the YAML file (merged with defaults).
-    model_config = cfg.get_model_config(model_name)
-    
-    print("\n" + "="*60)
-    print(f"Model {i+1}/{len(all_models)}: {model_name}")
-    print("="*60)
-    # Debug print to verify config loaded
-    # print(f"  [Config] Startup Args: {model_config.get('startup_args')}")
-    # print(f"  [Config] Gen Params: {model_config.get('generation_params')}")
-
-    # Check if we should skip this model entirely (if all outputs exist)
-    existing_outputs = sum(1 for p in all_prompts if check_if_output_exists(results_dir, model_stem, p.stem))
-    if existing_outputs == len(all_prompts):
-        print(f"  [SKIP] All {len(all_prompts)} outputs exist. Skipping model.")
-        continue
-
-    # Start Server
-    if not backend.start_server(model_path, model_config):
-        print("  [ERROR] Failed to start server. Skipping model.")
-        failed_runs.append((model_name, "ALL", "Server Start Failed"))
-        continue
-
-    # Wait for Ready
-    if not wait_for_server(backend, cfg.server_config.get('startup_wait', 420)):
-        backend.stop_server()
-        failed_runs.append((model_name, "ALL", "Server Timeout"))
-        continue
-
-    # Process Prompts
-    for j, prompt_path in enumerate(all_prompts):
-        prompt_name = prompt_path.name
-        
-        if check_if_output_exists(results_dir, model_stem, prompt_path.stem):
-            print(f"    [SKIP] Output exists for {prompt_name}")
+def build_parser() -> argparse.ArgumentParser:
+    """
+    CLI options. Defaults that come from config.yaml are left as None here and
+    filled in by resolve_options(), so parsing (and --help) never loads the config.
+    """
+    from load_bench import DEFAULT_REPEATS
+    parser = argparse.ArgumentParser(description="Run LLM Benchmarks via YAML Config.")
+    parser.add_argument(
+        "--backend",
+        type=str,
+        default=None,
+        choices=BACKEND_NAMES,
+        help="The LLM backend to use (must be defined in config.yaml; default: server.default_backend). llamacpp | koboldcpp"
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=None,
+        help="Port for the backend server (default: server.port)."
+    )
+    parser.add_argument(
+        "--host",
+        type=str,
+        default=None,
+        help="Host IP for the backend server (default: server.host)."
+    )
+
+    parser.add_argument(
+        "--results-dir",
+        type=str,
+        default=None,
+        help="Folder to write .md outputs to (overrides paths.results in config.yaml)."
+    )
+    parser.add_argument(
+        "--extract-dir",
+        type=str,
+        default=None,
+        help="If set, extract each model's HTML into this folder as soon as its generation finishes."
+    )
+    parser.add_argument(
+        "--status-port",
+        type=int,
+        default=None,
+        help="Serve live progress (/, /metrics, /status.json) on this port (default: server.status_port). 0 disables."
+    )
+    parser.add_argument(
+        "--coordinator",
+        type=int,
+        default=0,
+        metavar="PORT",
+        help="Serve the model x prompt work queue on this port for --worker nodes instead of generating locally."
+    )
+    parser.add_argument(
+        "--coordinator-host",
+        type=str,
+        default="127.0.0.1",
+        help="Interface the coordinator listens on (anything but loopback requires --coordinator-token)."
+    )
+    parser.add_argument(
+        "--coordinator-token",
+        type=str,
+        default=os.environ.get(COORDINATOR_TOKEN_ENV),
+        help=f"Shared secret between coordinator and workers (default: ${COORDINATOR_TOKEN_ENV})."
+    )
+    parser.add_argument(
+        "--worker",
+        type=str,
+        default=None,
+        metavar="URL",
+        help="Claim work from the coordinator at URL (e.g. http://10.0.0.5:5100) and run it on this node."
+    )
+    parser.add_argument(
+        "--worker-id",
+        type=str,
+        default=None,
+        help="Name of this worker (default: <hostname>:<port>)."
+    )
+    parser.add_argument(
+        "--pool",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Run N backend servers side by side on this host (see pool in config.yaml), each taking models off a shared queue."
+    )
+    parser.add_argument(
+        "--early-stop",
+        action="store_true",
+        help="Stream every generation and stop once a complete HTML document is out (see server.early_stop)."
+    )
+    parser.add_argument(
+        "--stream-outputs",
+        action="store_true",
+        help="Stream every generation to <results>/.partial and move it into place when done (see server.stream_outputs)."
+    )
+    parser.add_argument(
+        "--replay-cache",
+        action="store_true",
+        help="Answer deterministic requests (fixed seed or temperature 0) from the replay cache (see server.replay_cache)."
+    )
+    parser.add_argument(
+        "--adaptive-timeout",
+        action="store_true",
+        help="Predict each model x prompt deadline from earlier runs instead of one primary_timeout (see server.adaptive_timeout)."
+    )
+    parser.add_argument(
+        "--load-bench",
+        action="store_true",
+        help="Time model loading (cold vs warm page cache; mmap, no-mmap and mlock) instead of running prompts."
+    )
+    parser.add_argument(
+        "--load-repeats",
+        type=int,
+        default=DEFAULT_REPEATS,
+        help="Loads per model x strategy x cache state in --load-bench mode."
+    )
+    parser.add_argument(
+        "--context-scaling",
+        action="store_true",
+        help="Measure prefill/decode speed and time to first token as prompts are padded to longer contexts (see context_scaling in config.yaml)."
+    )
+    parser.add_argument(
+        "--context-lengths",
+        type=str,
+        default=None,
+        help="Comma-separated target context lengths in tokens for --context-scaling (overrides config.yaml)."
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        metavar="PATH",
+        help="Record a timeline of the run (spawn, load, polling, prefill/decode, writes, cooldowns, extraction) "
+             "and write it to PATH as Chrome Trace Event JSON (open in ui.perfetto.dev)."
+    )
+    parser.add_argument(
+        "--sweep",
+        action="store_true",
+        help="Run the parameter sweeps defined on model rules (models.<pattern>.sweep) instead of the benchmark."
+    )
+    parser.add_argument(
+        "--startup-check",
+        action="store_true",
+        help=f"Measure the import time of this module against its budget ({STARTUP_BUDGET_MS} ms) and exit."
+    )
+    return parser
+
+def parse_options(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    return build_parser().parse_args(argv)
+
+def resolve_options(cfg, options: argparse.Namespace) -> argparse.Namespace:
+    """Fills the options left at None with their config.yaml defaults (returns a copy)."""
+    server = cfg.server_config
+    resolved = argparse.Namespace(**vars(options))
+    if resolved.backend is None:
+        resolved.backend = server.get('default_backend', "llamacpp")
+    if resolved.port is None:
+        resolved.port = server.get('port', 5000)
+    if resolved.host is None:
+        resolved.host = server.get('host', '127.0.0.1')
+    if resolved.status_port is None:
+        resolved.status_port = server.get('status_port', 0)
+    return resolved
+
+# --- Startup Budget ---
+
+def measure_import_time() -> Dict[str, Any]:
+    """
+    Imports this module in a fresh interpreter with -X importtime. Returns the
+    cumulative import time in ms, the slowest modules by self time and which
+    of HEAVY_MODULES came along.
+    """
+    utils_dir = str(Path(__file__).resolve().parent)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in (utils_dir, os.environ.get('PYTHONPATH')) if p))
+    code = f"import sys, run_benchmarks; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          capture_output=True, text=True, env=env, check=True)
+    modules = []
+    total_us = None
+    # "import time:  self [us] | cumulative | imported package"; nesting is shown by indentation
+    for line in proc.stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)', line)
+        if not match:
             continue
+        self_us, cumulative_us, name = int(match.group(1)), int(match.group(2)), match.group(4)
+        modules.append((self_us, name))
+        if name == 'run_benchmarks' and not match.group(3):
+            total_us = cumulative_us
+    return {
+        'total_ms': total_us / 1000 if total_us is not None else None,
+        'slowest': [(name, us / 1000) for us, name in sorted(modules, reverse=True)[:5]],
+        'heavy': [m for m in proc.stdout.strip().split(',') if m],
+    }
 
-        print(f"    Running Prompt {j+1}/{len(all_prompts)}: {prompt_name}")
-        
+def check_startup(budget_ms: float = STARTUP_BUDGET_MS, samples: int = STARTUP_SAMPLES) -> bool:
+    """Prints the import cost of this module and returns False if it is over budget or imports a heavy module."""
+    runs = [measure_import_time() for _ in range(samples)]
+    best = min(runs, key=lambda r: r['total_ms'] if r['total_ms'] is not None else float('inf'))
+    if best['total_ms'] is None:
+        print("[ERROR] Could not read the import time of run_benchmarks.")
+        return False
+    print(f"import run_benchmarks: {best['total_ms']:.1f} ms (best of {samples}, budget {budget_ms} ms)")
+    for name, ms in best['slowest']:
+        print(f"  {ms:7.2f} ms  {name}")
+    ok = True
+    if best['total_ms'] > budget_ms:
+        print(f"[ERROR] Over the startup budget by {best['total_ms'] - budget_ms:.1f} ms.")
+        ok = False
+    if best['heavy']:
+        print(f"[ERROR] Imported at startup: {', '.join(best['heavy'])} (import them where they are used).")
+        ok = False
+    return ok
+
+# --- Runner ---
+
+class BenchmarkRunner:
+    """
+    One benchmark run: discover() finds models and prompts, plan() works out
+    which model variant x prompt outputs are missing, execute() generates them
+    and report() prints the summary. The other modes (sweep, load bench,
+    context scaling, coordinator, worker, pool) start from discover() too.
+    """
+    def __init__(self, cfg, options: Optional[argparse.Namespace] = None):
+        self.cfg = cfg
+        self.options = resolve_options(cfg, options if options is not None else parse_options([]))
+        self.start_time = datetime.datetime.now()
+        self.backend = None
+        self.pool_backends = []
+        self.replay_cache = None
+        self.timeouts = None
+        self._hardware = None
+
+    def log(self, message: str):
+        print_with_timestamp(message, self.start_time)
+
+    @property
+    def startup_wait(self) -> int:
+        return self.cfg.server_config.get('startup_wait', 420)
+
+    @property
+    def cooldown_wait(self) -> int:
+        return self.cfg.server_config.get('cooldown_wait', 5)
+
+    @property
+    def stream_outputs(self) -> bool:
+        # Opt-in: streamed timings are not comparable with earlier whole-answer runs
+        return self.options.stream_outputs or bool(self.cfg.server_config.get('stream_outputs', False))
+
+    @property
+    def hardware(self) -> Dict[str, Any]:
+        if self._hardware is None:
+            from distributed import hardware_info
+            self._hardware = hardware_info()
+        return self._hardware
+
+    def get_early_stop(self, variant_config: dict) -> Optional[dict]:
+        """Early-stop settings for a variant; --early-stop turns it on for every model."""
+        if variant_config.get('early_stop') is None and self.options.early_stop:
+            return self.cfg.resolve_early_stop(True)
+        return variant_config.get('early_stop')
+
+    def ensure_backend(self):
+        """The main backend, created on first use (coordinator mode never needs one)."""
+        if self.backend is None:
+            from replay_cache import cache_from_config
+            try:
+                self.backend = get_backend_instance(self.options.backend, self.cfg, self.options.host, self.options.port)
+            except Exception as e:
+                raise BenchmarkError(f"Failed to initialize backend: {e}") from e
+            # Replay cache: shared by every backend instance of this run (the main one and any pool servers)
+            replay_settings = self.cfg.server_config.get('replay_cache') or {}
+            if self.options.replay_cache or replay_settings.get('enabled'):
+                self.replay_cache = cache_from_config(replay_settings)
+            self.backend.replay_cache = self.replay_cache
+        return self.backend
+
+    def timeout_settings(self) -> Dict[str, Any]:
+        from timeout_predictor import timeout_settings
+        settings = timeout_settings(self.cfg.server_config.get('adaptive_timeout'))
+        settings['enabled'] = settings['enabled'] or bool(self.options.adaptive_timeout)
+        return settings
+
+    def ensure_timeout_predictor(self, found: Dict[str, Any]):
+        """The per model x prompt deadline predictor (None unless adaptive timeouts are on)."""
+        settings = self.timeout_settings()
+        if self.timeouts is None and settings['enabled']:
+            from load_bench import model_files
+            from timeout_predictor import TimeoutPredictor, load_history
+            history = load_history(Path(settings['history']).expanduser(), [p.stem for p in found['prompts']])
+            sizes = {p.stem: sum(f.stat().st_size for f in model_files(p)) for p in found['models']}
+            self.timeouts = TimeoutPredictor(history, sizes, settings, self.cfg.server_config.get('primary_timeout', 600))
+            print(f"Adaptive timeouts: {sum(len(t) for t in history.values())} earlier runs of "
+                  f"{len({m for m, _ in history})} models in {settings['history']}")
+        return self.timeouts
+
+    def max_item_timeout(self) -> float:
+        """Longest a single generation may take (coordinator and pool leases are sized from it)."""
+        primary = self.cfg.server_config.get('primary_timeout', 600)
+        settings = self.timeout_settings()
+        return max(primary, settings['max_seconds']) if settings['enabled'] else primary
+
+    def apply_timeout(self, backend, variant_stem: str, prompt_stem: str, model_path: Path) -> Optional[dict]:
+        """Sets the backend's deadline for the next generation; returns the prediction (None if not adaptive)."""
+        if self.timeouts is None:
+            return None
+        from load_bench import model_files
+        size = sum(f.stat().st_size for f in model_files(model_path)) if variant_stem == model_path.stem else None
+        prediction = self.timeouts.predict(variant_stem, prompt_stem, size)
+        backend.timeout_config['primary'] = prediction['timeout']
+        return prediction
+
+    def record_timeout(self, backend, prediction: Optional[dict], gen_time: float, success: bool) -> Optional[dict]:
+        """Logs how far the run was from its prediction; returns the outcome (None if nothing was predicted)."""
+        if prediction is None or backend.last_replayed:
+            return None
+        from timeout_predictor import format_prediction
+        outcome = self.timeouts.record(prediction, gen_time, success)
+        if outcome['timed_out']:
+            print(f"      [TIMEOUT] Stopped at the predicted deadline {format_prediction(prediction)}")
+        elif outcome['error'] is not None:
+            print(f"      Timeout {prediction['timeout']:.0f}s, expected {prediction['expected']:.0f}s "
+                  f"({prediction['basis']}): prediction error {outcome['error']:+.0%}")
+        return outcome
+
+    def variant_fingerprint(self, model_path: Path, variant_config: dict) -> Optional[str]:
+        """Identity of the files a variant runs: the model, plus the draft model for speculative variants."""
+        from gguf_fingerprint import model_fingerprint
         try:
-            # Read Prompt
-            raw_text = prompt_path.read_text(encoding='utf-8', errors='replace')
-            # Sanitize BOM if present
-            if raw_text.startswith('\ufeff'): raw_text = raw_text[1:]
-            
-            # GENERATE
-            # We pass the YAML-derived configs directly to the backend
-            generated_text, gen_time, success, fallback = backend.generate(
-                prompt=raw_text,
-                generation_params=model_config['generation_params'],
-                prompt_template=model_config['prompt_template']
-            )
-
-            if success and generated_text:
-                # Save
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                safe_model = model_stem.replace('/', '_').replace('\\', '_').replace(':', '_')
-                safe_prompt = prompt_path.stem.replace('/', '_').replace('\\', '_').replace(':', '_')
-                suffix = '_fallback' if fallback else ''
-                out_filename = f"{safe_model}_{safe_prompt}_{timestamp}{suffix}.md"
-                
-                meta_comment = (
-                    f"\n\n<!-- Benchmark Info -->\n"
-                    f"<!-- Backend: {backend.get_backend_name()} -->\n"
-                    f"<!-- Model: {model_name} -->\n"
-                    f"<!-- Prompt: {prompt_name} -->\n"
-                    f"<!-- Time: {gen_time:.2f}s -->\n"
-                    f"<!-- Fallback: {fallback} -->"
+            fingerprint = model_fingerprint(model_path)
+            draft = variant_config.get('draft')
+            return f"{fingerprint}+{model_fingerprint(draft['model'])}" if draft else fingerprint
+        except OSError as e:
+            print(f"  [WARN] Cannot fingerprint {model_path.name}: {e}")
+            return None
+
+    def shutdown(self):
+        """Stops every server this run started."""
+        for b in ([self.backend] if self.backend else []) + self.pool_backends:
+            b.stop_server()
+
+    # --- Discover ---
+
+    def discover(self) -> Dict[str, Any]:
+        """Output folders plus the models (size-filtered, first part of split GGUFs) and prompts to run."""
+        cfg = self.cfg
+        model_dir = cfg.paths.get('models')
+        prompt_dir = cfg.paths.get('prompts')
+        results_dir = Path(self.options.results_dir).expanduser().resolve() if self.options.results_dir else cfg.paths.get('results')
+        extract_dir = Path(self.options.extract_dir).expanduser().resolve() if self.options.extract_dir else None
+
+        # filter by size
+        max_size_gigs = cfg.server_config.get('max_size_gigs')
+        min_size_gigs = cfg.server_config.get('min_size_gigs')
+        max_size_bytes = max_size_gigs * (1024**3) if max_size_gigs is not None else None
+        min_size_bytes = min_size_gigs * (1024**3) if min_size_gigs is not None else None
+
+        if not model_dir or not model_dir.exists():
+            raise BenchmarkError(f"Model directory not found: {model_dir}")
+        if not prompt_dir or not prompt_dir.exists():
+            raise BenchmarkError(f"Prompt directory not found: {prompt_dir}")
+
+        results_dir.mkdir(parents=True, exist_ok=True)
+
+        print(f"Scanning models in: {model_dir}")
+        # Filter for .gguf, ignore hidden, ignore multi-part parts > 1
+        filtered_model_paths = []
+        for path in model_dir.glob('*.gguf'):
+            model_filename = path.name
+            if not path.is_file(): continue
+            if model_filename.startswith('.') or model_filename.startswith('._'):
+                continue
+            # --- Add any specific model filename filtering here if needed ---
+            # if 'exclude_this' in model_filename.lower(): continue
+
+            # --- Filter out subsequent parts of multi-file models ---
+            # If it's a multi-part file, only include the first part (e.g., -00001-of-...).
+            match = MULTIPART_PATTERN.search(model_filename)
+            if match and int(match.group(1)) > 1:
+                continue
+
+            try:
+                file_size = path.stat().st_size
+                if max_size_bytes is not None and file_size > max_size_bytes:
+                    print(f"  [INFO] Skipping model: {model_filename} (Size {file_size / (1024**3):.2f} GiB > {max_size_bytes / (1024**3):.0f} GiB)")
+                    continue
+                if min_size_bytes is not None and file_size < min_size_bytes:
+                    print(f"  [INFO] Skipping model: {model_filename} (Size {file_size / (1024**3):.2f} GiB < {min_size_bytes / (1024**3):.0f} GiB)")
+                    continue
+            except OSError as e:
+                print(f"  [WARN] Cannot access file stats for {model_filename} (skipped): {e}")
+                continue
+            filtered_model_paths.append(path)
+
+        print(f"Scanning prompts in: {prompt_dir}")
+        models = sorted(filtered_model_paths)
+        prompts = sorted([p for p in prompt_dir.glob('*.md') if not p.name.startswith('.')])
+
+        if not models:
+            raise BenchmarkError("No models found.")
+        if not prompts:
+            raise BenchmarkError("No prompts found.")
+
+        print(f"Found {len(models)} models and {len(prompts)} prompts.")
+        from gguf_fingerprint import fingerprint_models
+        fingerprints = fingerprint_models(models)
+        return {'models': models, 'prompts': prompts, 'results_dir': results_dir, 'extract_dir': extract_dir,
+                'fingerprints': fingerprints}
+
+    # --- Plan ---
+
+    def plan(self, found: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Per model: its config and variants, each with the prompts that have no
+        output yet. execute() checks again before every prompt, so outputs
+        written by another process in the meantime are still skipped.
+        """
+        from output_stream import PARTIAL_FOLDER_NAME, list_partials
+        partials = list_partials(found['results_dir'])
+        if partials:
+            print(f"  [PARTIAL] {len(partials)} incomplete outputs from failed or interrupted runs are kept in "
+                  f"{found['results_dir'] / PARTIAL_FOLDER_NAME} (removed once their prompt completes).")
+        work = []
+        for model_path in found['models']:
+            model_config = self.cfg.get_model_config(model_path.name)
+            variants = []
+            for variant_stem, variant_config in get_run_variants(model_path.stem, model_config):
+                fingerprint = self.variant_fingerprint(model_path, variant_config)
+                pending = [p for p in found['prompts']
+                           if not check_if_output_exists(found['results_dir'], variant_stem, p.stem, fingerprint)]
+                stale = sum(1 for p in pending if check_if_output_exists(found['results_dir'], variant_stem, p.stem))
+                if stale:
+                    print(f"  [STALE] {variant_stem}: {stale} outputs came from a different file with this name; rerunning them.")
+                variants.append({'stem': variant_stem, 'config': variant_config, 'pending': pending,
+                                 'fingerprint': fingerprint})
+            work.append({'model_path': model_path, 'model_config': model_config, 'variants': variants})
+        return work
+
+    # --- Execute ---
+
+    def execute(self, found: Dict[str, Any], work: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Runs the planned model variants one after another on the main backend."""
+        from concurrent.futures import ThreadPoolExecutor
+        from extract_html import extract_cache_dir
+        from load_bench import model_files, page_cache_residency
+        from output_stream import OutputStream, write_atomic
+        from status_server import RunStatus, start_status_server
+
+        backend = self.ensure_backend()
+        self.ensure_timeout_predictor(found)
+        all_prompts, results_dir, extract_dir = found['prompts'], found['results_dir'], found['extract_dir']
+        node_hardware = self.hardware
+        result = {'succeeded': 0, 'failed': [], 'speculative': [], 'outputs': []}
+        failed_runs, speculative_runs = result['failed'], result['speculative']
+
+        # Extraction runs on a single background worker so a model's outputs are
+        # processed while the next model is loading
+        extract_executor = ThreadPoolExecutor(max_workers=1) if extract_dir else None
+        extract_futures = []
+
+        # Live progress: the loop below only assigns attributes on run_status; the
+        # status server thread reads them when a page is requested
+        total_items = sum(len(entry['variants']) for entry in work) * len(all_prompts)
+        run_status = RunStatus(total_items)
+        if self.options.status_port:
+            try:
+                start_status_server(run_status, "127.0.0.1", self.options.status_port, backend.get_live_tokens_decoded)
+                print(f"Status page: http://127.0.0.1:{self.options.status_port}/ (metrics at /metrics)")
+            except OSError as e:
+                print(f"[WARN] Could not start status server on port {self.options.status_port}: {e}")
+
+        for i, entry in enumerate(work):
+            model_path = entry['model_path']
+            model_name = model_path.name
+            model_stem = model_path.stem
+            variants = entry['variants']
+
+            print("\n" + "="*60)
+            print(f"Model {i+1}/{len(work)}: {model_name}")
+            print("="*60)
+
+            # Check if we should skip this model entirely (if all outputs exist)
+            if not any(v['pending'] for v in variants):
+                existing_outputs = len(all_prompts) * len(variants)
+                print(f"  [SKIP] All {existing_outputs} outputs exist. Skipping model.")
+                run_status.skip_items(existing_outputs)
+                continue
+
+            for variant in variants:
+                variant_stem, variant_config, pending_prompts = variant['stem'], variant['config'], variant['pending']
+                fingerprint = variant['fingerprint']
+                draft = variant_config.get('draft')
+                if draft:
+                    print(f"  --- Speculative decoding with draft: {draft['model'].name} ---")
+
+                run_status.skip_items(len(all_prompts) - len(pending_prompts))
+                if not pending_prompts:
+                    print(f"  [SKIP] All outputs exist for {variant_stem}.")
+                    continue
+
+                # Start Server (not needed when every pending prompt can be replayed from the cache)
+                variant_start_ns = TRACER.now_ns()
+                variant_outputs = []
+                early_stop = self.get_early_stop(variant_config)
+                replay_only = self.replay_cache is not None and all(
+                    backend.has_replay(model_path, variant_config, read_prompt(p), early_stop, variant_config.get('thinking_budget'))
+                    for p in pending_prompts
+                )
+                load_info = None
+                if replay_only:
+                    print(f"  [REPLAY] All {len(pending_prompts)} pending prompts are cached. Not loading the model.")
+                else:
+                    # Whether the GGUF came from the page cache or disk decides most of the load time
+                    load_info = {'residency': page_cache_residency(model_files(model_path))}
+                    load_start = time.time()
+                    if not backend.start_server(model_path, variant_config):
+                        print("  [ERROR] Failed to start server. Skipping model.")
+                        failed_runs.append((variant_stem, "ALL", "Server Start Failed"))
+                        run_status.fail_items(len(pending_prompts))
+                        continue
+
+                    # Wait for Ready
+                    if not wait_for_server(backend, self.startup_wait):
+                        backend.stop_server()
+                        failed_runs.append((variant_stem, "ALL", "Server Timeout"))
+                        run_status.fail_items(len(pending_prompts))
+                        continue
+                    load_info['seconds'] = time.time() - load_start
+
+                # Process Prompts
+                for j, prompt_path in enumerate(all_prompts):
+                    prompt_name = prompt_path.name
+
+                    if check_if_output_exists(results_dir, variant_stem, prompt_path.stem, fingerprint):
+                        print(f"    [SKIP] Output exists for {prompt_name}")
+                        continue
+
+                    print(f"    Running Prompt {j+1}/{len(all_prompts)}: {prompt_name}")
+                    run_status.start_item(variant_stem, prompt_name)
+                    prompt_start_ns = TRACER.now_ns()
+                    stream = None
+
+                    try:
+                        # Read Prompt
+                        raw_text = read_prompt(prompt_path)
+                        prediction = self.apply_timeout(backend, variant_stem, prompt_path.stem, model_path)
+
+                        # The answer goes to results/.partial as it arrives (see output_stream.py)
+                        if self.stream_outputs:
+                            stream = OutputStream(results_dir, get_output_filename(variant_stem, prompt_path.stem, False), {
+                                'backend': backend.get_backend_name(), 'model': model_name, 'variant': variant_stem,
+                                'prompt': prompt_name, 'prompt_stem': prompt_path.stem, 'fingerprint': fingerprint,
+                            })
+                            backend.output_stream = stream
+
+                        # GENERATE
+                        # We pass the YAML-derived configs directly to the backend (answered
+                        # from the replay cache instead when enabled and already generated)
+                        generated_text, gen_time, success, fallback = backend.generate_or_replay(
+                            model_path, variant_config, raw_text,
+                            early_stop=early_stop,
+                            thinking_budget=variant_config.get('thinking_budget')
+                        )
+                        timings = backend.last_timings
+                        outcome = self.record_timeout(backend, prediction, gen_time, bool(success and generated_text))
+
+                        if success and generated_text:
+                            # Save
+                            out_filename = get_output_filename(variant_stem, prompt_path.stem, fallback)
+                            meta_comment = build_meta_comment(
+                                backend.get_backend_name(), model_name, prompt_name, gen_time, fallback, timings, node_hardware,
+                                backend.last_early_stop, backend.last_thinking, backend.last_replayed,
+                                None if backend.last_replayed else load_info, prediction, fingerprint
+                            )
+
+                            if draft:
+                                base_time = get_latest_output_time(results_dir, model_stem, prompt_path.stem)
+                                draft_comment, acceptance, speedup = build_draft_meta(draft, timings, gen_time, base_time)
+                                meta_comment += draft_comment
+                                speculative_runs.append((model_name, draft['model'].name, prompt_name, acceptance, speedup))
+
+                            with TRACER.span('write', 'io', file=out_filename):
+                                parts = output_parts(backend, generated_text, meta_comment)
+                                if stream:
+                                    stream.commit(results_dir / out_filename, parts)
+                                else:
+                                    write_atomic(results_dir / out_filename, parts)
+                            variant_outputs.append(results_dir / out_filename)
+                            if backend.last_replayed:
+                                print(f"      Saved from replay cache (originally {gen_time:.2f}s)")
+                            elif backend.last_early_stop:
+                                print(f"      Saved ({gen_time:.2f}s, stopped early: HTML complete at "
+                                      f"{backend.last_early_stop['html_complete_s']:.2f}s)")
+                            else:
+                                print(f"      Saved ({gen_time:.2f}s)")
+                            result['succeeded'] += 1
+                            run_status.finish_item(True)
+                        else:
+                            print("      [FAIL] Generation failed or returned empty.")
+                            run_status.finish_item(False)
+                            reason = get_failure_reason(backend, outcome)
+                            failed_runs.append((variant_stem, prompt_name, reason))
+                            if stream:
+                                stream.abort(reason)
+
+                    except Exception as e:
+                        print(f"      [ERROR] Unexpected error: {e}")
+                        failed_runs.append((variant_stem, prompt_name, f"Exception: {e}"))
+                        if stream:
+                            stream.abort(f"Exception: {e}")
+                        if run_status.item_start is not None:
+                            run_status.finish_item(False)
+                    finally:
+                        # Also runs on Ctrl+C (SystemExit): what was streamed stays in results/.partial
+                        backend.output_stream = None
+                        if stream and not stream.closed:
+                            stream.abort("Interrupted", status='interrupted')
+                    TRACER.complete(prompt_name, prompt_start_ns, TRACER.now_ns() - prompt_start_ns, 'prompt')
+
+                # Cleanup Model
+                backend.stop_server()
+                TRACER.complete(variant_stem, variant_start_ns, TRACER.now_ns() - variant_start_ns, 'model',
+                                outputs=len(variant_outputs))
+                result['outputs'].extend(variant_outputs)
+
+                if extract_executor and variant_outputs:
+                    extract_futures.append(extract_executor.submit(extract_outputs, variant_outputs, extract_dir,
+                                                                   extract_cache_dir(results_dir)))
+
+                if not replay_only and (i < len(work) - 1 or variant is not variants[-1]):
+                    print(f"  Cooldown {self.cooldown_wait}s...")
+                    with TRACER.span('cooldown', 'idle'):
+                        time.sleep(self.cooldown_wait)
+
+        if extract_executor:
+            with TRACER.span('wait for extraction', 'extract'):
+                extract_executor.shutdown(wait=True)
+            for future in extract_futures:
+                if future.exception():
+                    print(f"  [ERROR] Extraction failed: {future.exception()}")
+        return result
+
+    # --- Report ---
+
+    def report(self, result: Dict[str, Any]):
+        print("\n" + "="*60)
+        print("Benchmark Finished")
+        print(f"Total Successful Runs: {result['succeeded']}")
+        print(f"Failures: {len(result['failed'])}")
+        if result['failed']:
+            for m, p, r in result['failed']:
+                print(f"  - {m} | {p} : {r}")
+        if self.replay_cache:
+            print(f"Replay Cache: {self.replay_cache.summary()}")
+        if self.timeouts:
+            print(f"Timeout Predictions: {self.timeouts.summary()}")
+        if result['speculative']:
+            print("Speculative Decoding:")
+            for m, d, p, acceptance, speedup in result['speculative']:
+                acceptance_str = f"{acceptance:.1%}" if acceptance is not None else "n/a"
+                speedup_str = f"{speedup:.2f}x" if speedup is not None else "n/a"
+                print(f"  - {m} + {d} | {p} : acceptance {acceptance_str}, speedup {speedup_str}")
+
+    # --- Sweep Mode ---
+
+    def run_sweeps(self, found: Dict[str, Any]) -> int:
+        """Runs the sweep of every model whose rule defines one; returns the number of models swept."""
+        sweep_dir = found['results_dir'] / "sweeps"
+        sweep_dir.mkdir(parents=True, exist_ok=True)
+        backend = self.ensure_backend()
+        swept = 0
+        for model_path in found['models']:
+            model_config = self.cfg.get_model_config(model_path.name)
+            if not model_config.get('sweep'):
+                continue
+            try:
+                self.run_model_sweep(model_path, model_config, found['prompts'], sweep_dir)
+                swept += 1
+            except Exception as e:
+                print(f"  [ERROR] Sweep failed for {model_path.name}: {e}")
+                backend.stop_server()
+        if swept == 0:
+            print("[WARN] No matching model rule defines a 'sweep' block.")
+        self.log(f"Sweep Finished ({swept} models)")
+        return swept
+
+    def run_model_sweep(self, model_path: Path, model_config: dict, prompts: list, sweep_dir: Path):
+        """
+        Runs every point of a model's sweep definition. Points sharing startup args
+        reuse the loaded server; the server is only restarted when they change.
+        Writes a JSON log and a markdown Pareto report to sweep_dir.
+        """
+        from sweep import expand_sweep, startup_key, startup_args_to_cli, point_label, pareto_frontier, render_sweep_report
+        backend = self.ensure_backend()
+        sweep_cfg = model_config['sweep']
+        prompt_subset = sweep_cfg.get('prompts')
+        if prompt_subset:
+            prompts = [p for p in prompts if p.stem in prompt_subset]
+        points = expand_sweep(sweep_cfg)
+        self.log(f"Sweep {model_path.name}: {len(points)} points x {len(prompts)} prompts")
+
+        rows = []
+        current_key = None
+        load_time = None
+        server_ok = False
+        for n, point in enumerate(points):
+            key = startup_key(point)
+            if key != current_key:
+                backend.stop_server()
+                current_key = key
+                point_config = dict(model_config, draft=None)
+                point_config['startup_args'] = list(model_config.get('startup_args', [])) + startup_args_to_cli(point['startup'])
+                load_start = time.time()
+                server_ok = (backend.start_server(model_path, point_config) and
+                             wait_for_server(backend, self.startup_wait))
+                load_time = time.time() - load_start if server_ok else None
+
+            label = point_label(point)
+            row = {'label': label, 'startup_args': list(key), 'generation_params': point['generation_params'],
+                   'load_time': load_time, 'memory_bytes': None, 'throughput': None,
+                   'ok': 0, 'attempted': len(prompts), 'prompts': {}}
+            rows.append(row)
+            print(f"    Point {n+1}/{len(points)}: {label}")
+            if not server_ok:
+                print("      [FAIL] Server did not start for this point.")
+                continue
+
+            gen_params = {**model_config['generation_params'], **point['generation_params']}
+            rates = []
+            for prompt_path in prompts:
+                text, gen_time, success, _ = backend.generate(
+                    prompt=read_prompt(prompt_path),
+                    generation_params=gen_params,
+                    prompt_template=model_config['prompt_template']
                 )
-                
-                (results_dir / out_filename).write_text(generated_text + meta_comment, encoding='utf-8')
-                print(f"      Saved ({gen_time:.2f}s)")
-                run_counter += 1
+                if not (success and text):
+                    row['prompts'][prompt_path.stem] = {'success': False, 'time': gen_time}
+                    continue
+                rate = backend.last_timings.get('predicted_per_second') or (len(text) / gen_time if gen_time > 0 else None)
+                row['prompts'][prompt_path.stem] = {'success': True, 'time': gen_time, 'throughput': rate}
+                row['ok'] += 1
+                if rate:
+                    rates.append(rate)
+
+            row['memory_bytes'] = backend.get_process_memory()
+            if rates:
+                row['throughput'] = sum(rates) / len(rates)
+            print(f"      {row['ok']}/{len(prompts)} ok, throughput {row['throughput'] or 0:.2f}")
+
+        backend.stop_server()
+
+        # llama-server reports decode tokens/s; koboldcpp points fall back to chars/s
+        has_token_rates = backend.get_backend_name() == "llamacpp"
+        frontier = pareto_frontier(rows)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        safe_model = model_path.stem.replace('/', '_').replace('\\', '_').replace(':', '_')
+        base_name = f"{safe_model}_sweep_{timestamp}"
+        (sweep_dir / f"{base_name}.json").write_text(json.dumps({
+            'model': model_path.name,
+            'backend': backend.get_backend_name(),
+            'sweep': sweep_cfg,
+            'points': rows,
+            'pareto': [r['label'] for r in frontier],
+        }, indent=2, default=str), encoding='utf-8')
+        (sweep_dir / f"{base_name}.md").write_text(
+            render_sweep_report(model_path.name, rows, frontier, "tokens/s" if has_token_rates else "chars/s"),
+            encoding='utf-8'
+        )
+        print(f"  Sweep report: {sweep_dir / (base_name + '.md')} ({len(frontier)} Pareto-optimal points)")
+
+    # --- Load Bench Mode ---
+
+    def run_load_benches(self, found: Dict[str, Any]) -> Path:
+        """Load-benchmarks every model; returns the markdown report's path."""
+        from load_bench import render_load_report
+        load_dir = found['results_dir'] / "load_bench"
+        load_dir.mkdir(parents=True, exist_ok=True)
+        backend = self.ensure_backend()
+        load_results = []
+        for model_path in found['models']:
+            try:
+                load_results.append(self.run_load_bench(model_path, self.cfg.get_model_config(model_path.name),
+                                                        self.options.load_repeats))
+            except Exception as e:
+                print(f"  [ERROR] Load bench failed for {model_path.name}: {e}")
+                backend.stop_server()
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        (load_dir / f"load_bench_{timestamp}.json").write_text(json.dumps({
+            'backend': backend.get_backend_name(),
+            'hardware': self.hardware,
+            'models': load_results,
+        }, indent=2), encoding='utf-8')
+        report_path = load_dir / f"load_bench_{timestamp}.md"
+        report_path.write_text(render_load_report(load_results), encoding='utf-8')
+        self.log(f"Load Bench Finished: {report_path}")
+        return report_path
+
+    def run_load_bench(self, model_path: Path, model_config: dict, repeats: int) -> dict:
+        """
+        Times spawn-to-ready for every load strategy (LOAD_STRATEGIES) with the
+        model's pages evicted from (cold) and fully in (warm) the page cache.
+        """
+        from load_bench import (LOAD_STRATEGIES, CACHE_STATES, READY_POLL_SECONDS, model_files,
+                                evict_page_cache, warm_page_cache, page_cache_residency, median)
+        backend = self.ensure_backend()
+        files = model_files(model_path)
+        size_bytes = sum(f.stat().st_size for f in files)
+        strategies = LOAD_STRATEGIES.get(backend.get_backend_name(), {})
+        self.log(f"Load bench {model_path.name}: {len(strategies)} strategies x {len(CACHE_STATES)} cache states x {repeats}")
+
+        rows = []
+        for strategy, strategy_args in strategies.items():
+            config = dict(model_config, draft=None)
+            config['startup_args'] = list(model_config.get('startup_args', [])) + strategy_args
+            for state in CACHE_STATES:
+                ready_times, residencies, memory = [], [], []
+                for n in range(repeats):
+                    if state == 'cold':
+                        if not evict_page_cache(files):
+                            print("      [WARN] posix_fadvise is not available; 'cold' runs are not cold.")
+                    elif (page_cache_residency(files) or 0) < 0.99:
+                        warm_page_cache(files)
+                    residency = page_cache_residency(files)
+                    if residency is not None:
+                        residencies.append(residency)
+
+                    load_start = time.time()
+                    ok = (backend.start_server(model_path, config) and
+                          wait_for_server(backend, self.startup_wait, READY_POLL_SECONDS))
+                    ready = time.time() - load_start
+                    if ok:
+                        ready_times.append(ready)
+                        memory.append(backend.get_process_memory())
+                    residency_str = f"{residency:.0%}" if residency is not None else "n/a"
+                    print(f"    {strategy} / {state} #{n+1}: {f'{ready:.2f}s' if ok else 'FAILED'} (page cache before: {residency_str})")
+                    backend.stop_server()
+                    time.sleep(self.cooldown_wait)
+
+                memory = [m for m in memory if m is not None]
+                rows.append({
+                    'strategy': strategy, 'startup_args': strategy_args, 'cache': state,
+                    'attempted': repeats, 'ready_times': ready_times, 'ready_median': median(ready_times),
+                    'residency': sum(residencies) / len(residencies) if residencies else None,
+                    'memory_bytes': max(memory) if memory else None,
+                })
+        return {'model': model_path.name, 'size_bytes': size_bytes, 'rows': rows}
+
+    # --- Context Scaling Mode ---
+
+    def run_context_scalings(self, found: Dict[str, Any]):
+        from context_scaling import scaling_settings
+        scaling_dir = found['results_dir'] / "context_scaling"
+        scaling_dir.mkdir(parents=True, exist_ok=True)
+        backend = self.ensure_backend()
+        settings = scaling_settings(self.cfg.context_scaling_config)
+        if self.options.context_lengths:
+            settings['lengths'] = sorted(int(n) for n in self.options.context_lengths.split(',') if n.strip())
+        for model_path in found['models']:
+            try:
+                self.run_context_scaling(model_path, self.cfg.get_model_config(model_path.name), found['prompts'],
+                                         settings, scaling_dir)
+            except Exception as e:
+                print(f"  [ERROR] Context scaling failed for {model_path.name}: {e}")
+                backend.stop_server()
+        self.log("Context Scaling Finished")
+
+    def run_context_scaling(self, model_path: Path, model_config: dict, prompts: list, settings: dict, out_dir: Path):
+        """
+        Runs each prompt padded with deterministic filler to every target context
+        length, once per KV cache setting (one server load each), and records
+        prefill tok/s, decode tok/s and time to first token. Writes JSON, markdown
+        and an HTML page with the curves to out_dir.
+        """
+        from context_scaling import context_size_args, pad_prompt, render_scaling_markdown, render_scaling_html
+        backend = self.ensure_backend()
+        if settings['prompts']:
+            prompts = [p for p in prompts if p.stem in settings['prompts']]
+        texts = {p.stem: read_prompt(p) for p in prompts}
+        gen_params = dict(model_config['generation_params'], max_tokens=settings['max_tokens'])
+        ctx_args = context_size_args(backend.get_backend_name(), settings['lengths'], settings['max_tokens'])
+        self.log(f"Context scaling {model_path.name}: {len(settings['kv_cache'])} KV settings x "
+                 f"{len(settings['lengths'])} lengths x {len(prompts)} prompts")
+
+        rows = []
+        for kv_name, kv_args in settings['kv_cache'].items():
+            config = dict(model_config, draft=None)
+            config['startup_args'] = list(model_config.get('startup_args', [])) + ctx_args + list(kv_args)
+            server_ok = (backend.start_server(model_path, config) and
+                         wait_for_server(backend, self.startup_wait))
+            for length in settings['lengths']:
+                for stem, text in texts.items():
+                    row = {'kv_cache': kv_name, 'target_tokens': length, 'prompt': stem, 'success': False,
+                           'prompt_tokens': None, 'prefill_tps': None, 'decode_tps': None, 'ttft': None, 'time': None}
+                    rows.append(row)
+                    if not server_ok:
+                        continue
+                    others = [t for s, t in sorted(texts.items()) if s != stem] or [text]
+                    padded = pad_prompt(text, others, length, settings['filler'], settings['seed'], backend.count_tokens)
+                    answer, gen_time, success, _ = backend.generate(
+                        prompt=padded['text'],
+                        generation_params=gen_params,
+                        prompt_template=model_config['prompt_template']
+                    )
+                    timings = backend.last_timings
+                    row.update({
+                        'success': bool(success and answer),
+                        'time': gen_time,
+                        'prompt_tokens': timings.get('prompt_n') or padded['tokens'],
+                        'prefill_tps': timings.get('prompt_per_second'),
+                        'decode_tps': timings.get('predicted_per_second'),
+                        # The answer's first token comes right after prefill
+                        'ttft': timings['prompt_ms'] / 1000 if timings.get('prompt_ms') is not None else None,
+                    })
+                    print(f"    {kv_name} / {length} / {stem}: "
+                          + (f"prefill {row['prefill_tps'] or 0:.1f} tok/s, decode {row['decode_tps'] or 0:.1f} tok/s, "
+                             f"TTFT {row['ttft'] or 0:.2f}s" if row['success'] else "FAILED"))
+            backend.stop_server()
+            time.sleep(self.cooldown_wait)
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        safe_model = model_path.stem.replace('/', '_').replace('\\', '_').replace(':', '_')
+        base_name = f"{safe_model}_context_{timestamp}"
+        (out_dir / f"{base_name}.json").write_text(json.dumps({
+            'model': model_path.name,
+            'backend': backend.get_backend_name(),
+            'settings': settings,
+            'rows': rows,
+        }, indent=2), encoding='utf-8')
+        (out_dir / f"{base_name}.md").write_text(render_scaling_markdown(model_path.name, rows), encoding='utf-8')
+        (out_dir / f"{base_name}.html").write_text(
+            render_scaling_html(model_path.name, rows, datetime.datetime.now().strftime("%Y-%m-%d %H:%M")), encoding='utf-8'
+        )
+        print(f"  Context scaling report: {out_dir / (base_name + '.html')}")
+
+    # --- Coordinator / Worker / Pool Modes ---
+
+    def build_work_queue(self, found: Dict[str, Any]):
+        """Coordinator side: one work item per model variant x prompt without an existing output."""
+        from distributed import WorkQueue
+        items = []
+        for entry in self.plan(found):
+            for variant in entry['variants']:
+                for prompt_path in variant['pending']:
+                    items.append({
+                        'id': f"{variant['stem']}|{prompt_path.stem}",
+                        'model': entry['model_path'].name,
+                        'variant': variant['stem'],
+                        'prompt': prompt_path.name,
+                        'prompt_text': read_prompt(prompt_path),
+                    })
+        return WorkQueue(items)
+
+    def run_coordinator(self, found: Dict[str, Any]) -> Optional[Dict[str, int]]:
+        """Only hands out work and writes results; never starts a backend. None if nothing is left to do."""
+        from distributed import run_coordinator
+        work_queue = self.build_work_queue(found)
+        if not work_queue.items:
+            print("[INFO] All outputs exist. Nothing to distribute.")
+            return None
+        per_item = self.max_item_timeout() + 60
+        try:
+            counts = run_coordinator(work_queue, self.options.coordinator_host, self.options.coordinator, found['results_dir'],
+                                     lease_base=self.startup_wait + self.cooldown_wait, lease_per_item=per_item,
+                                     token=self.options.coordinator_token)
+        except ValueError as e:
+            raise BenchmarkError(f"{e}: pass --coordinator-token or set ${COORDINATOR_TOKEN_ENV}") from e
+        self.log(f"Coordinator Finished: {counts}")
+        return counts
+
+    def run_worker(self, client, backend, models: list, results_dir: Optional[Path] = None) -> int:
+        """
+        Worker side: claims batches for models resident on this node, runs them with
+        the local backend and streams each result back as soon as it is generated.
+        Draft variants are timed against the standalone run of the same prompt on
+        this worker, or the newest output in results_dir (pool mode shares it).
+        Returns the number of results sent.
+        """
+        from distributed import CLAIM_RETRY_SECONDS, MAX_CLAIM_FAILURES, coordinator_gone
+        local_models = {p.name: p for p in models}
+        base_times = {}  # (model stem, prompt stem) -> standalone generation time on this worker
+        completed = 0
+        connected = False
+        failures = 0
+        while True:
+            try:
+                response = client.claim(list(local_models))
+            except Exception as e:
+                failures += 1
+                if connected and coordinator_gone(e):
+                    # The coordinator shuts its server down once every item is done or failed
+                    print("  [INFO] Coordinator has shut down. Assuming the run is finished.")
+                    break
+                if failures >= MAX_CLAIM_FAILURES:
+                    print(f"  [ERROR] Coordinator unreachable {failures} times in a row ({e}). Giving up.")
+                    break
+                print(f"  [WARN] Coordinator unreachable ({e}). Retrying in {CLAIM_RETRY_SECONDS}s...")
+                time.sleep(CLAIM_RETRY_SECONDS)
+                continue
+            connected = True
+            failures = 0
+
+            if response.get('done'):
+                break
+            if 'wait' in response:
+                time.sleep(response['wait'])
+                continue
+
+            items = response['items']
+            model_path = local_models[items[0]['model']]
+            model_config = self.cfg.get_model_config(model_path.name)
+            variant_config = dict(get_run_variants(model_path.stem, model_config)).get(items[0]['variant'])
+            self.log(f"[{client.worker_id}] Claimed {len(items)} prompts for {items[0]['variant']}")
+            if variant_config is None:
+                print(f"  [ERROR] Variant {items[0]['variant']} is not configured on this node. Releasing.")
+                client.release(items)
+                continue
+
+            if not (backend.start_server(model_path, variant_config) and
+                    wait_for_server(backend, self.startup_wait)):
+                backend.stop_server()
+                client.release(items)
+                continue
+
+            for item in items:
+                print(f"    Running Prompt: {item['prompt']}")
+                try:
+                    prediction = self.apply_timeout(backend, item['variant'], Path(item['prompt']).stem, model_path)
+                    generated_text, gen_time, success, fallback = backend.generate_or_replay(
+                        model_path, variant_config, item['prompt_text'],
+                        early_stop=self.get_early_stop(variant_config),
+                        thinking_budget=variant_config.get('thinking_budget')
+                    )
+                    outcome = self.record_timeout(backend, prediction, gen_time, bool(success and generated_text))
+                    if success and generated_text:
+                        out_filename = get_output_filename(item['variant'], Path(item['prompt']).stem, fallback)
+                        meta_comment = build_meta_comment(
+                            backend.get_backend_name(), model_path.name, item['prompt'], gen_time, fallback,
+                            backend.last_timings, client.hardware, backend.last_early_stop, backend.last_thinking,
+                            backend.last_replayed, timeout=prediction,
+                            fingerprint=self.variant_fingerprint(model_path, variant_config)
+                        )
+                        prompt_stem = Path(item['prompt']).stem
+                        draft = variant_config.get('draft')
+                        if draft:
+                            base_time = base_times.get((model_path.stem, prompt_stem))
+                            if base_time is None and results_dir is not None:
+                                base_time = get_latest_output_time(results_dir, model_path.stem, prompt_stem)
+                            meta_comment += build_draft_meta(draft, backend.last_timings, gen_time, base_time)[0]
+                        elif not backend.last_replayed:
+                            base_times[(model_path.stem, prompt_stem)] = gen_time
+                        with TRACER.span('submit', 'io', file=out_filename):
+                            client.submit(item, True, out_filename, format_output(backend, generated_text) + meta_comment, gen_time)
+                        print(f"      Sent ({gen_time:.2f}s)")
+                        completed += 1
+                    else:
+                        client.submit(item, False, gen_time=gen_time, reason=get_failure_reason(backend, outcome))
+                except Exception as e:
+                    print(f"      [ERROR] Unexpected error: {e}")
+                    try:
+                        client.submit(item, False, reason=f"Exception: {e}")
+                    except Exception:
+                        pass  # Lease expiry will requeue it
+
+            backend.stop_server()
+            with TRACER.span('cooldown', 'idle'):
+                time.sleep(self.cooldown_wait)
+
+        self.log(f"[{client.worker_id}] Worker finished: {completed} results sent")
+        return completed
+
+    def run_remote_worker(self, found: Dict[str, Any]) -> int:
+        from distributed import CoordinatorClient, hardware_summary
+        backend = self.ensure_backend()
+        self.ensure_timeout_predictor(found)
+        worker_id = self.options.worker_id or f"{self.hardware['hostname']}:{self.options.port}"
+        print(f"Worker {worker_id} ({hardware_summary(self.hardware)}) -> {self.options.worker}")
+        client = CoordinatorClient(self.options.worker, worker_id, self.hardware, token=self.options.coordinator_token)
+        return self.run_worker(client, backend, found['models'])
+
+    def build_pool_instances(self, size: int, base_port: int) -> list:
+        """
+        Settings for each pool instance: pool.instances from config.yaml where
+        given, otherwise port = base_port + index and an even, contiguous share of
+        the cores this process may run on (so instances never contend for a core).
+        Pinned instances get --threads <their core count> (appended last, so it
+        also wins over a model rule's) unless the backend or the instance sets a
+        thread flag: the servers size their thread pools from the host's core
+        count, not the affinity mask, and would oversubscribe their share.
+        """
+        configured = self.cfg.pool_instances
+        backend_args = [str(a) for a in self.cfg.get_backend_config(self.options.backend).get('startup_args', [])]
+        available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+        share = max(len(available) // size, 1)
+        instances = []
+        for i in range(size):
+            conf = configured[i] if i < len(configured) else {}
+            if 'cpus' in conf:
+                cpus = parse_cpu_list(conf['cpus'])
             else:
-                print("      [FAIL] Generation failed or returned empty.")
-                failed_runs.append((model_name, prompt_name, "Generation Failed"))
-
-        except Exception as e:
-            print(f"      [ERROR] Unexpected error: {e}")
-            failed_runs.append((model_name, prompt_name, f"Exception: {e}"))
-
-    # Cleanup Model
-    backend.stop_server()
-    
-    if i < len(all_models) - 1:
-        cooldown = cfg.server_config.get('cooldown_wait', 5)
-        print(f"  Cooldown {cooldown}s...")
-        time.sleep(cooldown)
-
-# --- Summary ---
-print("\n" + "="*60)
-print("Benchmark Finished")
-print(f"Total Successful Runs: {run_counter}")
-print(f"Failures: {len(failed_runs)}")
-if failed_runs:
-    for m, p, r in failed_runs:
-        print(f"  - {m} | {p} : {r}")
-print("="*60)
\ No newline at end of file
+                cpus = available[i * share:(i + 1) * share] or None
+            extra_args = [str(a) for a in conf.get('startup_args', [])]
+            if cpus and not any(a in THREAD_FLAGS for a in backend_args + extra_args):
+                extra_args += ['--threads', str(len(cpus))]
+            instances.append({
+                'port': conf.get('port', base_port + i),
+                'cpu_set': cpus,
+                'env': {k: str(v) for k, v in (conf.get('env') or {}).items()},
+                'extra_startup_args': extra_args,
+            })
+        return instances
+
+    def run_pool(self, found: Dict[str, Any]) -> Optional[Dict[str, int]]:
+        """Same queue as coordinator/worker mode, but served in-process to one thread per local server."""
+        from distributed import LocalQueueClient
+        self.ensure_backend()
+        self.ensure_timeout_predictor(found)
+        work_queue = self.build_work_queue(found)
+        if not work_queue.items:
+            print("[INFO] All outputs exist. Nothing to run.")
+            return None
+        lease_per_item = self.max_item_timeout() + 60
+        write_lock = threading.Lock()
+
+        threads = []
+        for instance in self.build_pool_instances(self.options.pool, self.options.port):
+            try:
+                pool_backend = get_backend_instance(self.options.backend, self.cfg, self.options.host, **instance)
+            except Exception as e:
+                raise BenchmarkError(f"Failed to initialize pool backend on port {instance['port']}: {e}") from e
+            pool_backend.replay_cache = self.replay_cache
+            self.pool_backends.append(pool_backend)
+            worker_id = f"pool:{instance['port']}"
+            cpus = instance['cpu_set']
+            print(f"  {worker_id}: cores {f'{cpus[0]}-{cpus[-1]} ({len(cpus)})' if cpus else 'unpinned'}"
+                  f"{' ' + str(instance['env']) if instance['env'] else ''}")
+            client = LocalQueueClient(work_queue, found['results_dir'], worker_id, self.hardware,
+                                      self.startup_wait + self.cooldown_wait, lease_per_item, write_lock)
+            thread = threading.Thread(target=self.run_worker,
+                                      args=(client, pool_backend, found['models'], found['results_dir']),
+                                      name=worker_id, daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        # join() with a timeout keeps the main thread responsive to Ctrl+C
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(timeout=1)
+        for b in self.pool_backends:
+            b.stop_server()
+        counts = work_queue.counts()
+        self.log(f"Pool Finished: {counts}")
+        return counts
+
+    # --- Dispatch ---
+
+    def run(self) -> int:
+        """Runs the mode selected by the options; returns a process exit code."""
+        found = self.discover()
+        if self.options.coordinator:
+            self.run_coordinator(found)
+        elif self.options.sweep:
+            self.run_sweeps(found)
+        elif self.options.load_bench:
+            self.run_load_benches(found)
+        elif self.options.context_scaling:
+            self.run_context_scalings(found)
+        elif self.options.worker:
+            self.run_remote_worker(found)
+        elif self.options.pool:
+            self.run_pool(found)
+        else:
+            self.report(self.execute(found, self.plan(found)))
+        return 0
+
+# --- Main Execution ---
+
+def main(argv: Optional[List[str]] = None) -> int:
+    options = parse_options(argv)
+    if options.startup_check:
+        return 0 if check_startup() else 1
+
+    try:
+        # Looks for config.yaml in current dir or parent dir
+        cfg = load_config()
+    except Exception as e:
+        print(f"[FATAL] Configuration Load Error: {e}")
+        return 1
+
+    runner = BenchmarkRunner(cfg, options)
+    if options.trace:
+        TRACER.enable()
+
+    # Signal handlers can only be installed from the main thread
+    if threading.current_thread() is threading.main_thread():
+        def signal_handler(sig, frame):
+            print("\nCtrl+C detected. Shutting down...")
+            runner.shutdown()
+            sys.exit(1)
+        signal.signal(signal.SIGINT, signal_handler)
+
+    runner.log(f"Starting Benchmark (Backend: {runner.options.backend})")
+    try:
+        return runner.run()
+    except BenchmarkError as e:
+        print(f"[ERROR] {e}")
+        runner.shutdown()
+        return 1
+    finally:
+        if options.trace:
+            # finally: also runs on Ctrl+C (signal_handler raises SystemExit)
+            trace_path = Path(options.trace).expanduser()
+            count = TRACER.write(trace_path, {'argv': sys.argv if argv is None else argv, 'backend': runner.options.backend,
+                                              'started': runner.start_time.isoformat()})
+            print(f"Trace: {count} events written to {trace_path}")
+
+if __name__ == "__main__":
+    sys.exit(main())
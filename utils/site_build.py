@@ -0,0 +1,304 @@
+# utils/site_build.py
+import os
+import re
+import gzip
+import argparse
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from blob_store import hash_bytes
+
+# --- Configuration ---
+SITE_ROOT = 'results'                  # Served directory: index.html, <date>/index.html, <date>/html/*.html
+ASSETS_DIR_NAME = 'assets'             # Content-hashed CSS/JS shared by every viewer page
+SERVICE_WORKER_NAME = 'sw.js'
+HEADERS_FILENAME = '_headers'          # Cache headers for Netlify / Cloudflare Pages style hosts
+ASSET_HASH_LENGTH = 12
+COMPRESS_SUFFIXES = {'.html', '.js', '.css', '.json', '.svg'}
+MIN_COMPRESS_BYTES = 512               # Below this the .gz/.br siblings are not worth a request
+VIEWER_PAGE_NAME = 'index.html'
+DATE_DIR_PATTERN = re.compile(r'^\d{4}\.\d{2}\.\d{2}$')
+
+# Only the generated viewer pages are rewritten and minified. Result pages
+# (<date>/html/*.html) are the benchmark output itself and are left byte for
+# byte as the model wrote them; they are only precompressed and cached.
+
+STYLE_PATTERN = re.compile(r'<style>(.*?)</style>', re.DOTALL)
+SCRIPT_PATTERN = re.compile(r'<script(\s[^>]*)?>(.*?)</script>', re.DOTALL)
+SW_REGISTER_ATTR = 'data-sw'           # Marks the registration snippet so reruns leave it inline
+
+def _brotli():
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+# --- Minification ---
+
+def minify_css(css: str) -> str:
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+def minify_js(js: str) -> str:
+    """
+    Conservative: drops indentation, blank lines and whole-line // comments,
+    but never touches the inside of string or template literals. Tokens and
+    line breaks are kept, so automatic semicolon insertion is unaffected.
+    """
+    out_lines = []
+    quote = None          # Open string/template delimiter carried across lines (template literals)
+    for line in js.split('\n'):
+        if quote is None:
+            stripped = line.strip()
+            if not stripped or stripped.startswith('//'):
+                continue
+            line = stripped
+        i = 0
+        while i < len(line):
+            ch = line[i]
+            if quote:
+                if ch == '\\':
+                    i += 2
+                    continue
+                if ch == quote:
+                    quote = None
+            elif ch in '\'"`':
+                quote = ch
+            elif ch == '/' and line[i + 1:i + 2] == '/':
+                break  # Trailing comment; kept as is (it could be inside a regex literal)
+            i += 1
+        if quote in ('\'', '"'):
+            quote = None  # Plain strings never span lines; don't let a regex like /'/ poison the rest
+        out_lines.append(line.rstrip() if quote is None else line)
+    return '\n'.join(out_lines)
+
+def minify_html(page: str) -> str:
+    """Strips indentation and blank lines outside <script>/<style> (the viewer pages have no <pre>)."""
+    parts = re.split(r'(<script\b.*?</script>|<style\b.*?</style>)', page, flags=re.DOTALL)
+    for n in range(0, len(parts), 2):
+        lines = (line.strip() for line in parts[n].split('\n'))
+        parts[n] = '\n'.join(line for line in lines if line)
+    return ''.join(parts)
+
+# --- Assets ---
+
+def write_asset(assets_dir: Path, kind: str, content: str) -> Path:
+    data = content.encode('utf-8')
+    path = assets_dir / f"viewer.{hash_bytes(data)[:ASSET_HASH_LENGTH]}.{kind}"
+    if not path.exists():
+        assets_dir.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    return path
+
+def externalize_assets(page: str, page_dir: Path, assets_dir: Path) -> str:
+    """
+    Moves inline <style> and classic inline <script> blocks into hashed files.
+    Identical blocks on different pages (every dated viewer shares its CSS and
+    code) become one file the browser caches once. JSON data blocks stay inline.
+    """
+    prefix = os.path.relpath(assets_dir, page_dir).replace(os.sep, '/')
+
+    def style_repl(match):
+        asset = write_asset(assets_dir, 'css', minify_css(match.group(1)))
+        return f'<link rel="stylesheet" href="{prefix}/{asset.name}">'
+
+    def script_repl(match):
+        attrs, body = match.group(1) or '', match.group(2)
+        if 'src=' in attrs or 'type=' in attrs or SW_REGISTER_ATTR in attrs or not body.strip():
+            return match.group(0)
+        asset = write_asset(assets_dir, 'js', minify_js(body))
+        return f'<script src="{prefix}/{asset.name}"></script>'
+
+    page = STYLE_PATTERN.sub(style_repl, page)
+    return SCRIPT_PATTERN.sub(script_repl, page)
+
+def add_service_worker(page: str, page_dir: Path, site_root: Path) -> str:
+    if f'<script {SW_REGISTER_ATTR}>' in page:
+        return page
+    sw_url = os.path.relpath(site_root / SERVICE_WORKER_NAME, page_dir).replace(os.sep, '/')
+    # file:// pages have no service workers; the viewers still work without one
+    snippet = (f"<script {SW_REGISTER_ATTR}>if ('serviceWorker' in navigator && location.protocol.startsWith('http')) "
+               f"navigator.serviceWorker.register('{sw_url}');</script>")
+    return page.replace('</body>', snippet + '\n</body>', 1)
+
+def optimize_page(path: Path, site_root: Path, assets_dir: Path) -> bool:
+    """Rewrites one viewer page in place. Returns True if it changed."""
+    original = path.read_text(encoding='utf-8')
+    page = externalize_assets(original, path.parent, assets_dir)
+    page = add_service_worker(page, path.parent, site_root)
+    page = minify_html(page)
+    if page == original:
+        return False
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(page, encoding='utf-8')
+    os.replace(tmp, path)
+    return True
+
+def referenced_assets(pages: List[Path]) -> set:
+    names = set()
+    for page in pages:
+        names.update(re.findall(rf'{ASSETS_DIR_NAME}/(viewer\.[0-9a-f]+\.(?:css|js))', page.read_text(encoding='utf-8')))
+    return names
+
+def _write_if_changed(path: Path, text: str) -> Path:
+    # Unchanged files keep their mtime, so their .gz/.br siblings stay current
+    if not path.is_file() or path.read_text(encoding='utf-8') != text:
+        path.write_text(text, encoding='utf-8')
+    return path
+
+# --- Service Worker ---
+
+SERVICE_WORKER_TEMPLATE = r"""// Generated by site_build.py
+const CACHE = 'llm-viewer-__VERSION__';
+const RESULTS_CACHE = 'llm-viewer-results';   // Outlives asset versions
+// Hashed assets never change under the same URL: cache first.
+// Result pages keep their URL but can be re-extracted (a placeholder replaced by
+// a real page): stale-while-revalidate, so the next visit sees the new copy.
+// Viewer pages and index shards change on every publish: network first, cache as offline fallback.
+const ASSET = /\/__ASSETS__\/viewer\.[0-9a-f]+\.(css|js)$/;
+const RESULT = /\/\d{4}\.\d{2}\.\d{2}\/html\/[^/]+\.html$/;
+
+self.addEventListener('install', event => self.skipWaiting());
+self.addEventListener('activate', event => {
+    event.waitUntil(caches.keys().then(keys => Promise.all(
+        keys.filter(k => k.startsWith('llm-viewer-') && k !== CACHE && k !== RESULTS_CACHE).map(k => caches.delete(k))
+    )).then(() => self.clients.claim()));
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET' || new URL(request.url).origin !== location.origin) return;
+    const path = new URL(request.url).pathname;
+    if (ASSET.test(path)) {
+        event.respondWith(caches.open(CACHE).then(cache => cache.match(request).then(hit => hit || fetch(request).then(response => {
+            if (response.ok) cache.put(request, response.clone());
+            return response;
+        }))));
+        return;
+    }
+    if (RESULT.test(path)) {
+        const refresh = caches.open(RESULTS_CACHE).then(cache => fetch(request).then(response => {
+            if (response.ok) cache.put(request, response.clone());
+            return response;
+        }));
+        event.waitUntil(refresh.catch(() => null));
+        event.respondWith(caches.open(RESULTS_CACHE).then(cache => cache.match(request)).then(hit => hit || refresh));
+        return;
+    }
+    event.respondWith(fetch(request).then(response => {
+        if (response.ok) {
+            const copy = response.clone();
+            caches.open(CACHE).then(cache => cache.put(request, copy));
+        }
+        return response;
+    }).catch(() => caches.match(request).then(hit => hit || Response.error())));
+});
+"""
+
+def write_service_worker(site_root: Path, asset_names: List[str]) -> Path:
+    # A new asset set means a new cache; the old one is dropped on activate
+    version = hash_bytes('\n'.join(sorted(asset_names)).encode('utf-8'))[:ASSET_HASH_LENGTH]
+    return _write_if_changed(site_root / SERVICE_WORKER_NAME,
+                             SERVICE_WORKER_TEMPLATE.replace('__VERSION__', version).replace('__ASSETS__', ASSETS_DIR_NAME))
+
+def write_headers_file(site_root: Path) -> Path:
+    """Cache-Control rules for hosts that read a _headers file (paths relative to the site root)."""
+    return _write_if_changed(
+        site_root / HEADERS_FILENAME,
+        f"/{ASSETS_DIR_NAME}/*\n  Cache-Control: public, max-age=31536000, immutable\n"
+        # Result pages keep their URL across re-extraction: revalidate (ETag) on every use
+        "/*/html/*\n  Cache-Control: no-cache\n"
+        f"/{SERVICE_WORKER_NAME}\n  Cache-Control: no-cache\n"
+        "/*\n  Cache-Control: public, max-age=300, must-revalidate\n"
+    )
+
+# --- Precompression ---
+
+def precompress(path: Path, brotli_module) -> int:
+    """Writes .gz (and .br) siblings when missing or stale. Returns the number written."""
+    data = None
+    written = 0
+    encoders = [('.gz', lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+    if brotli_module is not None:
+        encoders.append(('.br', lambda d: brotli_module.compress(d, quality=11)))
+    src_mtime = path.stat().st_mtime_ns
+    for suffix, encode in encoders:
+        target = path.with_name(path.name + suffix)
+        if target.exists() and target.stat().st_mtime_ns >= src_mtime:
+            continue
+        if data is None:
+            data = path.read_bytes()
+        packed = encode(data)
+        if len(packed) >= len(data):
+            target.unlink(missing_ok=True)
+            continue
+        tmp = target.with_name(f".{target.name}.tmp")
+        tmp.write_bytes(packed)
+        os.replace(tmp, target)
+        written += 1
+    return written
+
+def iter_site_files(site_root: Path):
+    for dirpath, dirnames, filenames in os.walk(site_root):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for name in filenames:
+            path = Path(dirpath) / name
+            if name.startswith('.') or path.suffix not in COMPRESS_SUFFIXES:
+                continue
+            if path.stat().st_size >= MIN_COMPRESS_BYTES:
+                yield path
+
+# --- Main Logic ---
+
+def build_site(site_root=SITE_ROOT) -> Optional[Dict[str, int]]:
+    """Optimizes the viewer pages under site_root and precompresses everything servable."""
+    site_root = Path(site_root)
+    if not site_root.is_dir():
+        print(f"Error: Site directory '{site_root}' not found.")
+        return None
+    assets_dir = site_root / ASSETS_DIR_NAME
+
+    pages = [site_root / VIEWER_PAGE_NAME] + [
+        p / VIEWER_PAGE_NAME for p in sorted(site_root.iterdir()) if p.is_dir() and DATE_DIR_PATTERN.match(p.name)
+    ]
+    pages = [p for p in pages if p.is_file()]
+    changed = sum(1 for p in pages if optimize_page(p, site_root, assets_dir))
+
+    # Assets of previous publishes no page refers to any more
+    in_use = referenced_assets(pages)
+    removed = 0
+    if assets_dir.is_dir():
+        for asset in assets_dir.iterdir():
+            name = asset.name[:-3] if asset.name.endswith(('.gz', '.br')) else asset.name
+            if name not in in_use:
+                asset.unlink()
+                removed += 1
+
+    write_service_worker(site_root, sorted(in_use))
+    write_headers_file(site_root)
+
+    brotli_module = _brotli()
+    if brotli_module is None:
+        print("  [INFO] 'brotli' not installed; writing .gz only (pip install brotli for .br).")
+    compressed = sum(precompress(p, brotli_module) for p in iter_site_files(site_root))
+
+    stats = {'pages': len(pages), 'pages_changed': changed, 'assets': len(in_use),
+             'assets_removed': removed, 'compressed': compressed}
+    print(f"Site built in {site_root}: {changed}/{len(pages)} pages rewritten, {len(in_use)} shared assets, "
+          f"{compressed} precompressed files written.")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Minify, fingerprint and precompress the published results site.")
+    parser.add_argument("--site-root", type=str, default=SITE_ROOT,
+                        help=f"Directory served as the site (default: {SITE_ROOT}).")
+    args = parser.parse_args()
+    build_site(args.site_root)
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import os
 import re
 import json
 import html
+import argparse
 
 # --- Configuration ---
 PROMPTS_DIR = 'code_prompts'
@@ -14,6 +15,434 @@ IFRAME_ORIGINAL_WIDTH = 800
 IFRAME_ORIGINAL_HEIGHT = 650
 IFRAME_SCALE = 0.666
 
+# Shared by every generated viewer page (see viewer_index.py)
+VIEWER_CSS = """        body {
+            font-family: sans-serif;
+            margin: 15px;
+            background-color: #f4f4f4;
+        }
+        h1, h2 {
+            color: #333;
+            margin-top: 0;
+        }
+        .nav {
+            margin-bottom: 20px;
+            padding: 10px;
+            background-color: #eee;
+            border-radius: 5px;
+        }
+        .nav strong {
+            margin-right: 10px;
+        }
+        .nav a {
+            text-decoration: none;
+            color: #007bff;
+            margin: 0 5px;
+            padding: 5px 8px;
+            border-radius: 3px;
+            transition: background-color 0.2s ease, color 0.2s ease;
+            cursor: pointer;
+        }
+        .nav a:hover {
+            background-color: #ddd;
+            color: #0056b3;
+        }
+        .nav a.selected {
+            font-weight: bold;
+            background-color: #007bff;
+            color: white;
+        }
+        .error {
+            color: red;
+            background-color: #fee;
+            border: 1px solid red;
+            padding: 10px;
+            margin-bottom: 15px;
+            border-radius: 5px;
+        }
+        #results-container {
+            margin-top: 20px;
+        }
+        .results-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(calc(var(--container-width, __CONTAINER_WIDTH__px) + 10px), 1fr));
+            gap: 20px;
+            margin-top: 10px;
+        }
+        .iframe-container {
+            border: 1px solid #ccc;
+            background-color: #fff;
+            padding: 5px;
+            border-radius: 5px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+            display: flex;
+            flex-direction: column;
+        }
+        .iframe-container .label {
+            font-size: 0.8em;
+            color: #555;
+            margin-bottom: 5px;
+            white-space: nowrap;
+            overflow: hidden;
+            text-overflow: ellipsis;
+            min-height: 1.2em;
+            font-weight: bold;
+        }
+        .iframe-wrapper {
+            width: var(--container-width, __CONTAINER_WIDTH__px);
+            height: var(--container-height, __CONTAINER_HEIGHT__px);
+            overflow: hidden;
+            position: relative;
+            margin: 0 auto;
+        }
+        .scaled-iframe {
+            width: var(--iframe-original-width, __ORIG_WIDTH__px);
+            height: var(--iframe-original-height, __ORIG_HEIGHT__px);
+            border: none;
+            transform: scale(var(--iframe-scale, __SCALE__));
+            transform-origin: 0 0;
+            position: absolute;
+            top: 0;
+            left: 0;
+        }
+        .info-message {
+            margin-top: 20px;
+            padding: 15px;
+            background-color: #eef;
+            border: 1px solid #ccd;
+            border-radius: 5px;
+            color: #336;
+        }
+"""
+
+# Compare mode (both viewer pages): 2-4 selected results are rebuilt as srcdoc
+# iframes with a virtual clock injected ahead of their own scripts. The page
+# then advances all of them in lockstep: one tick = one requestAnimationFrame
+# callback round at the same virtual time (performance.now, Date.now and
+# timers are virtual too), and each frame reports the JS time it spent.
+COMPARE_CSS = """        .compare-toggle {
+            font-size: 0.75em;
+            color: #555;
+            margin-top: 4px;
+            cursor: pointer;
+        }
+        #compare-bar {
+            position: fixed;
+            bottom: 0;
+            left: 0;
+            right: 0;
+            padding: 8px 15px;
+            background-color: #333;
+            color: white;
+            display: none;
+            z-index: 10;
+        }
+        #compare-bar button, #compare-view .controls button, #compare-view .controls select {
+            margin-left: 8px;
+        }
+        #compare-view {
+            position: fixed;
+            top: 0;
+            left: 0;
+            right: 0;
+            bottom: 0;
+            overflow: auto;
+            padding: 15px;
+            background-color: #f4f4f4;
+            z-index: 20;
+        }
+        #compare-view .controls {
+            margin-bottom: 10px;
+        }
+        #compare-view .compare-grid {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 15px;
+        }
+        #compare-view .compare-cell {
+            background-color: #fff;
+            border: 1px solid #ccc;
+            border-radius: 5px;
+            padding: 5px;
+        }
+        #compare-view .compare-cell .stats {
+            font-family: monospace;
+            font-size: 0.8em;
+            color: #333;
+            margin: 4px 0;
+        }
+        #compare-view .compare-frame {
+            overflow: hidden;
+            position: relative;
+        }
+        #compare-view iframe {
+            border: none;
+            transform-origin: 0 0;
+            position: absolute;
+            top: 0;
+            left: 0;
+        }
+"""
+
+COMPARE_SCRIPT = r"""
+        // Runs inside each compared result (serialized into its srcdoc)
+        function virtualClock() {
+            var now = 0, nextId = 1, rafs = new Map(), timers = new Map();
+            var realNow = performance.now.bind(performance), dateOrigin = Date.now();
+            performance.now = function() { return now; };
+            Date.now = function() { return dateOrigin + now; };
+            window.requestAnimationFrame = function(cb) { var id = nextId++; rafs.set(id, cb); return id; };
+            window.cancelAnimationFrame = function(id) { rafs.delete(id); };
+            function addTimer(fn, ms, args, repeat) {
+                var id = nextId++, delay = Math.max(Number(ms) || 0, 0);
+                timers.set(id, { fn: typeof fn === 'function' ? fn : new Function(fn), due: now + delay, ms: delay, args: args, repeat: repeat });
+                return id;
+            }
+            window.setTimeout = function(fn, ms) { return addTimer(fn, ms, [].slice.call(arguments, 2), false); };
+            window.setInterval = function(fn, ms) { return addTimer(fn, ms, [].slice.call(arguments, 2), true); };
+            window.clearTimeout = window.clearInterval = function(id) { timers.delete(id); };
+
+            window.addEventListener('message', function(event) {
+                var data = event.data;
+                if (!data || data.type !== 'vclock-tick') return;
+                now = data.now;
+                var start = realNow(), errors = 0;
+                // Timers due by now fire once per tick (intervals skip missed runs), then one rAF round
+                Array.from(timers.entries()).filter(function(e) { return e[1].due <= now; })
+                    .sort(function(a, b) { return a[1].due - b[1].due; })
+                    .forEach(function(e) {
+                        var timer = e[1];
+                        if (!timers.has(e[0])) return;
+                        if (timer.repeat) timer.due = Math.max(timer.due + Math.max(timer.ms, 1), now + 1);
+                        else timers.delete(e[0]);
+                        try { timer.fn.apply(window, timer.args); } catch (err) { errors++; console.error(err); }
+                    });
+                var callbacks = Array.from(rafs.values());
+                rafs.clear();
+                callbacks.forEach(function(cb) {
+                    try { cb(now); } catch (err) { errors++; console.error(err); }
+                });
+                parent.postMessage({ type: 'vclock-frame', frame: data.frame, cost: realNow() - start,
+                                     callbacks: callbacks.length, errors: errors }, '*');
+            });
+        }
+
+        const Compare = (function() {
+            const MIN = 2, MAX = 4, STALL_MS = 1000, WINDOW = 300;
+            const selected = [];   // {label, src}
+            const checkboxes = [];
+            let session = null;
+
+            function bar() {
+                let el = document.getElementById('compare-bar');
+                if (!el) {
+                    el = document.createElement('div');
+                    el.id = 'compare-bar';
+                    document.body.appendChild(el);
+                }
+                return el;
+            }
+
+            function updateBar() {
+                const el = bar();
+                el.style.display = selected.length ? 'block' : 'none';
+                el.innerHTML = '';
+                el.appendChild(document.createTextNode(`Compare (${selected.length}/${MAX}): ${selected.map(s => s.label).join(' | ')}`));
+                const go = document.createElement('button');
+                go.textContent = 'Compare in lockstep';
+                go.disabled = selected.length < MIN;
+                go.onclick = open;
+                const clear = document.createElement('button');
+                clear.textContent = 'Clear';
+                clear.onclick = () => { selected.length = 0; syncCheckboxes(); updateBar(); };
+                el.appendChild(go);
+                el.appendChild(clear);
+            }
+
+            function syncCheckboxes() {
+                checkboxes.forEach(([box, src]) => { box.checked = selected.some(s => s.src === src); });
+            }
+
+            // Adds a "compare" checkbox to a result card
+            function attach(card, item) {
+                const label = document.createElement('label');
+                label.className = 'compare-toggle';
+                const box = document.createElement('input');
+                box.type = 'checkbox';
+                box.checked = selected.some(s => s.src === item.src);
+                box.onchange = () => {
+                    const i = selected.findIndex(s => s.src === item.src);
+                    if (box.checked && i === -1) {
+                        if (selected.length >= MAX) { box.checked = false; return; }
+                        selected.push(item);
+                    } else if (!box.checked && i !== -1) {
+                        selected.splice(i, 1);
+                    }
+                    updateBar();
+                };
+                checkboxes.push([box, item.src]);
+                label.appendChild(box);
+                label.appendChild(document.createTextNode(' compare'));
+                card.appendChild(label);
+            }
+
+            function inject(source, src) {
+                const head = `<base href="${new URL(src, location.href).href}"><script>(${virtualClock.toString()})();<\/script>`;
+                const at = source.search(/<head[^>]*>/i);
+                if (at !== -1) {
+                    const end = source.indexOf('>', at) + 1;
+                    return source.slice(0, end) + head + source.slice(end);
+                }
+                return head + source;
+            }
+
+            function percentile(values, p) {
+                if (!values.length) return 0;
+                const sorted = values.slice().sort((a, b) => a - b);
+                return sorted[Math.min(sorted.length - 1, Math.floor(p * sorted.length))];
+            }
+
+            function open() {
+                const items = selected.slice();
+                Promise.all(items.map(item => fetch(item.src).then(r => {
+                    if (!r.ok) throw new Error(`${item.src}: HTTP ${r.status}`);
+                    return r.text();
+                }))).then(sources => start(items, sources)).catch(err => {
+                    alert(`Compare mode needs to read the result files (${err.message}).\n` +
+                          'Serve the results folder over HTTP, e.g. "python -m http.server" in results/.');
+                });
+            }
+
+            function start(items, sources) {
+                close();
+                const width = __ORIG_WIDTH__, height = __ORIG_HEIGHT__;
+                const scale = Math.min(1, (window.innerWidth - 60) / (Math.min(items.length, 2) * (width + 30)));
+
+                const view = document.createElement('div');
+                view.id = 'compare-view';
+                const controls = document.createElement('div');
+                controls.className = 'controls';
+                const title = document.createElement('strong');
+                title.textContent = 'Lockstep compare';
+                controls.appendChild(title);
+                const button = (text, onclick) => {
+                    const b = document.createElement('button');
+                    b.textContent = text;
+                    b.onclick = onclick;
+                    controls.appendChild(b);
+                    return b;
+                };
+                const playButton = button('Pause', () => {
+                    s.playing = !s.playing;
+                    playButton.textContent = s.playing ? 'Pause' : 'Play';
+                });
+                button('Step', () => { s.playing = false; playButton.textContent = 'Play'; tick(); });
+                button('Restart', () => start(items, sources));
+                const rate = document.createElement('select');
+                [30, 60, 120].forEach(fps => {
+                    const o = document.createElement('option');
+                    o.value = fps;
+                    o.textContent = `${fps} virtual fps`;
+                    o.selected = fps === 60;
+                    rate.appendChild(o);
+                });
+                rate.onchange = () => { s.dt = 1000 / Number(rate.value); };
+                controls.appendChild(rate);
+                button('Close', close);
+                const clockLabel = document.createElement('span');
+                clockLabel.style.marginLeft = '15px';
+                controls.appendChild(clockLabel);
+                view.appendChild(controls);
+
+                const grid = document.createElement('div');
+                grid.className = 'compare-grid';
+                const cells = items.map((item, i) => {
+                    const cell = document.createElement('div');
+                    cell.className = 'compare-cell';
+                    const label = document.createElement('div');
+                    label.className = 'label';
+                    label.textContent = item.label;
+                    const stats = document.createElement('div');
+                    stats.className = 'stats';
+                    stats.textContent = 'loading...';
+                    const frameBox = document.createElement('div');
+                    frameBox.className = 'compare-frame';
+                    frameBox.style.width = `${width * scale}px`;
+                    frameBox.style.height = `${height * scale}px`;
+                    const iframe = document.createElement('iframe');
+                    iframe.style.width = `${width}px`;
+                    iframe.style.height = `${height}px`;
+                    iframe.style.transform = `scale(${scale})`;
+                    iframe.srcdoc = inject(sources[i], item.src);
+                    frameBox.appendChild(iframe);
+                    cell.appendChild(label);
+                    cell.appendChild(stats);
+                    cell.appendChild(frameBox);
+                    grid.appendChild(cell);
+                    return { iframe, stats, costs: [], frames: 0, errors: 0, stalls: 0, loaded: false };
+                });
+                view.appendChild(grid);
+                document.body.appendChild(view);
+
+                const s = session = { view, cells, playing: true, dt: 1000 / 60, now: 0, frame: 0, waiting: new Set(), sentAt: 0 };
+
+                function tick() {
+                    // A frame that never answered the previous tick is counted as stalled, not waited for forever
+                    s.waiting.forEach(i => cells[i].stalls++);
+                    s.frame++;
+                    s.now += s.dt;
+                    s.waiting = new Set(cells.map((_, i) => i));
+                    s.sentAt = performance.now();
+                    cells.forEach(c => c.iframe.contentWindow.postMessage({ type: 'vclock-tick', now: s.now, frame: s.frame }, '*'));
+                }
+
+                s.onMessage = event => {
+                    const i = cells.findIndex(c => c.iframe.contentWindow === event.source);
+                    const data = event.data;
+                    if (i === -1 || !data || data.type !== 'vclock-frame' || data.frame !== s.frame) return;
+                    const c = cells[i];
+                    s.waiting.delete(i);
+                    c.frames++;
+                    c.errors += data.errors;
+                    c.costs.push(data.cost);
+                    if (c.costs.length > WINDOW) c.costs.shift();
+                };
+                window.addEventListener('message', s.onMessage);
+
+                cells.forEach(c => c.iframe.addEventListener('load', () => { c.loaded = true; }));
+                function pump() {
+                    if (session !== s) return;
+                    requestAnimationFrame(pump);
+                    if (!s.playing || cells.some(c => !c.loaded)) return;
+                    if (s.waiting.size && performance.now() - s.sentAt < STALL_MS) return;
+                    tick();
+                }
+                requestAnimationFrame(pump);
+
+                s.statsTimer = setInterval(() => {
+                    clockLabel.textContent = `virtual time ${(s.now / 1000).toFixed(2)}s, frame ${s.frame}`;
+                    cells.forEach(c => {
+                        if (!c.costs.length) return;
+                        const avg = c.costs.reduce((a, b) => a + b, 0) / c.costs.length;
+                        c.stats.textContent = `JS frame cost avg ${avg.toFixed(2)}ms, p95 ${percentile(c.costs, 0.95).toFixed(2)}ms, ` +
+                            `max ${Math.max(...c.costs).toFixed(2)}ms | frames ${c.frames}` +
+                            (c.stalls ? ` | stalls ${c.stalls}` : '') + (c.errors ? ` | errors ${c.errors}` : '');
+                    });
+                }, 500);
+            }
+
+            function close() {
+                if (!session) return;
+                window.removeEventListener('message', session.onMessage);
+                clearInterval(session.statsTimer);
+                session.view.remove();
+                session = null;
+            }
+
+            return { attach };
+        })();
+"""
+
 # --- Helper Functions ---
 
 def get_test_types(prompts_dir):
@@ -48,16 +477,17 @@ def get_test_types(prompts_dir):
     # Empty types list but dir exists is handled by logic above, return what we have
     return {'types': types}
 
-def parse_result_filename(filename, valid_types):
+def parse_result_filename(filename, valid_types, extension='html'):
     """Parses a filename against the regex pattern and valid types."""
     if not valid_types:
         return None
 
     # Build regex dynamically: ^(.*?)_(TYPE1|TYPE2|...)_(\d{8}_\d{6})\.html$
+    # (extension lets the same parser be used on the raw .md transcripts)
     # re.escape ensures characters like '+' or '.' in type names don't break regex
     types_regex = '|'.join(map(re.escape, valid_types))
     
-    pattern = rf'^(.*?)_({types_regex})_(\d{{8}}_\d{{6}})\.html$'
+    pattern = rf'^(.*?)_({types_regex})_(\d{{8}}_\d{{6}})\.{re.escape(extension)}$'
     
     match = re.match(pattern, filename, re.IGNORECASE)
     if match:
@@ -123,9 +553,11 @@ def safe_json_dump(data):
 
 # --- Main Logic ---
 
-def main():
+def generate_viewer(prompts_dir=PROMPTS_DIR, results_dir=RESULTS_DIR, output_filename=OUTPUT_FILENAME,
+                    results_local_path=RESULTS_LOCAL_PATH):
+    """Builds the static viewer page for one run's extracted HTML results."""
     # Get Types
-    types_data = get_test_types(PROMPTS_DIR)
+    types_data = get_test_types(prompts_dir)
     available_types = types_data.get('types', [])
     generation_error = types_data.get('error', None)
 
@@ -134,7 +566,7 @@ def main():
 
     # Get Results
     if not generation_error and available_types:
-        results_data = get_all_results(RESULTS_DIR, available_types)
+        results_data = get_all_results(results_dir, available_types)
         all_results = results_data.get('results', {})
         
         # Append error if specific result scan failed
@@ -153,7 +585,7 @@ def main():
         'types': available_types,
         'results': all_results,
         'config': {
-            'resultsDir': RESULTS_LOCAL_PATH,
+            'resultsDir': results_local_path,
             'iframeOriginalWidth': IFRAME_ORIGINAL_WIDTH,
             'iframeOriginalHeight': IFRAME_ORIGINAL_HEIGHT,
             'iframeScale': IFRAME_SCALE,
@@ -187,104 +619,7 @@ def main():
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Coding Test Viewer</title>
     <style>
-        body {
-            font-family: sans-serif;
-            margin: 15px;
-            background-color: #f4f4f4;
-        }
-        h1, h2 {
-            color: #333;
-            margin-top: 0;
-        }
-        .nav {
-            margin-bottom: 20px;
-            padding: 10px;
-            background-color: #eee;
-            border-radius: 5px;
-        }
-        .nav strong {
-            margin-right: 10px;
-        }
-        .nav a {
-            text-decoration: none;
-            color: #007bff;
-            margin: 0 5px;
-            padding: 5px 8px;
-            border-radius: 3px;
-            transition: background-color 0.2s ease, color 0.2s ease;
-            cursor: pointer;
-        }
-        .nav a:hover {
-            background-color: #ddd;
-            color: #0056b3;
-        }
-        .nav a.selected {
-            font-weight: bold;
-            background-color: #007bff;
-            color: white;
-        }
-        .error {
-            color: red;
-            background-color: #fee;
-            border: 1px solid red;
-            padding: 10px;
-            margin-bottom: 15px;
-            border-radius: 5px;
-        }
-        #results-container {
-            margin-top: 20px;
-        }
-        .results-grid {
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(calc(var(--container-width, __CONTAINER_WIDTH__px) + 10px), 1fr));
-            gap: 20px;
-            margin-top: 10px;
-        }
-        .iframe-container {
-            border: 1px solid #ccc;
-            background-color: #fff;
-            padding: 5px;
-            border-radius: 5px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            display: flex;
-            flex-direction: column;
-        }
-        .iframe-container .label {
-            font-size: 0.8em;
-            color: #555;
-            margin-bottom: 5px;
-            white-space: nowrap;
-            overflow: hidden;
-            text-overflow: ellipsis;
-            min-height: 1.2em;
-            font-weight: bold;
-        }
-        .iframe-wrapper {
-            width: var(--container-width, __CONTAINER_WIDTH__px);
-            height: var(--container-height, __CONTAINER_HEIGHT__px);
-            overflow: hidden;
-            position: relative;
-            margin: 0 auto;
-        }
-        .scaled-iframe {
-            width: var(--iframe-original-width, __ORIG_WIDTH__px);
-            height: var(--iframe-original-height, __ORIG_HEIGHT__px);
-            border: none;
-            transform: scale(var(--iframe-scale, __SCALE__));
-            transform-origin: 0 0;
-            position: absolute;
-            top: 0;
-            left: 0;
-        }
-        .info-message {
-            margin-top: 20px;
-            padding: 15px;
-            background-color: #eef;
-            border: 1px solid #ccd;
-            border-radius: 5px;
-            color: #336;
-        }
-    </style>
+__CSS____COMPARE_CSS__    </style>
 </head>
 <body>
 
@@ -306,6 +641,8 @@ def main():
         __JSON_STRING__
     </script>
 
+    <script>__COMPARE_SCRIPT__    </script>
+
     <script>
         document.addEventListener('DOMContentLoaded', function() {
             const appDataElement = document.getElementById('app-data');
@@ -396,6 +733,7 @@ def main():
 
                         wrapper.appendChild(iframe);
                         container.appendChild(wrapper);
+                        Compare.attach(container, { label: `${result.model} | ${type}`, src: iframe.src });
                         grid.appendChild(container);
                     });
                     resultsContainer.appendChild(grid);
@@ -423,7 +761,10 @@ def main():
     # Perform Replacements
     # Note: We use string replace instead of f-strings for the main template 
     # to avoid conflicting with CSS braces {}
-    output_html = html_template.replace('__CONTAINER_WIDTH__', str(container_width)) \
+    output_html = html_template.replace('__CSS__', VIEWER_CSS) \
+                               .replace('__COMPARE_CSS__', COMPARE_CSS) \
+                               .replace('__COMPARE_SCRIPT__', COMPARE_SCRIPT) \
+                               .replace('__CONTAINER_WIDTH__', str(container_width)) \
                                .replace('__CONTAINER_HEIGHT__', str(container_height)) \
                                .replace('__ORIG_WIDTH__', str(IFRAME_ORIGINAL_WIDTH)) \
                                .replace('__ORIG_HEIGHT__', str(IFRAME_ORIGINAL_HEIGHT)) \
@@ -432,15 +773,33 @@ def main():
                                .replace('__JSON_STRING__', json_string)
 
     # --- Write Output File ---
-    output_path = os.path.join(os.getcwd(), OUTPUT_FILENAME)
+    output_path = os.path.join(os.getcwd(), output_filename)
     
     try:
         with open(output_path, 'w', encoding='utf-8') as f:
             f.write(output_html)
-        print(f"Successfully generated static file: {OUTPUT_FILENAME}")
+        print(f"Successfully generated static file: {output_filename}")
     except OSError as e:
         print(f"Error: Failed to write static file to {output_path}")
         print(e)
 
+def main():
+    parser = argparse.ArgumentParser(description="Generate the static results viewer page.")
+    parser.add_argument(
+        "--run-dir",
+        type=str,
+        default=None,
+        help="Dated run folder (e.g. results/2026.02.04); reads <run-dir>/html and writes <run-dir>/index.html."
+    )
+    args = parser.parse_args()
+
+    if args.run_dir:
+        generate_viewer(
+            results_dir=os.path.join(args.run_dir, 'html'),
+            output_filename=os.path.join(args.run_dir, 'index.html')
+        )
+    else:
+        generate_viewer()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
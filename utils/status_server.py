@@ -0,0 +1,224 @@
+# utils/status_server.py
+import time
+import html
+import json
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Optional
+
+class RunStatus:
+    """
+    Progress of an in-flight benchmark run.
+
+    Only the run loop writes to it (plain attribute assignments, no locks);
+    the status server thread only reads. A reader may see one update ahead of
+    another, which is fine for a dashboard and keeps the run loop's cost to a
+    few attribute stores per prompt.
+    """
+    def __init__(self, total_items: int):
+        self.run_start = time.time()
+        self.total_items = total_items
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.busy_seconds = 0.0   # Sum of generation times of completed/failed items
+        self.current_model = ""
+        self.current_prompt = ""
+        self.item_start = None    # Set while a generation is in flight
+
+    # --- Writers (run loop only) ---
+
+    def start_item(self, model: str, prompt: str):
+        self.current_model = model
+        self.current_prompt = prompt
+        self.item_start = time.time()
+
+    def finish_item(self, success: bool):
+        if self.item_start is not None:
+            self.busy_seconds += time.time() - self.item_start
+        if success:
+            self.completed += 1
+        else:
+            self.failed += 1
+        self.item_start = None
+
+    def skip_items(self, count: int = 1):
+        self.skipped += count
+
+    def fail_items(self, count: int):
+        """Items that never ran (e.g. the server failed to start)."""
+        self.failed += count
+
+    # --- Readers ---
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.total_items - self.completed - self.failed - self.skipped, 0)
+
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining items x mean generation time so far (None until one item finished)."""
+        done = self.completed + self.failed
+        if done == 0:
+            return None
+        return self.queue_depth * (self.busy_seconds / done)
+
+class LiveRate:
+    """
+    Turns a cumulative decoded-token counter into tokens/sec between reads.
+    Reads closer together than min_interval reuse the previous value so a
+    busy dashboard can't poll the inference server more than ~once a second.
+    """
+    def __init__(self, read_tokens: Callable[[], Optional[int]], min_interval: float = 1.0):
+        self._read_tokens = read_tokens
+        self._min_interval = min_interval
+        self._last = None         # (timestamp, tokens)
+        self._rate = None
+        self._lock = threading.Lock()  # Only contended between dashboard requests
+
+    def get(self) -> Optional[float]:
+        with self._lock:
+            now = time.time()
+            if self._last and now - self._last[0] < self._min_interval:
+                return self._rate
+            tokens = self._read_tokens()
+            if tokens is None:
+                self._last, self._rate = None, None
+                return None
+            if self._last and tokens >= self._last[1]:
+                self._rate = (tokens - self._last[1]) / (now - self._last[0])
+            self._last = (now, tokens)
+            return self._rate
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def render_prometheus(status: RunStatus, tokens_per_sec: Optional[float]) -> str:
+    now = time.time()
+    eta = status.eta_seconds()
+    item_seconds = now - status.item_start if status.item_start is not None else 0.0
+    metrics = [
+        ("llmbench_items_total", "gauge", "Model x prompt items in this run", status.total_items),
+        ("llmbench_items_completed", "counter", "Items generated successfully", status.completed),
+        ("llmbench_items_failed", "counter", "Items that failed", status.failed),
+        ("llmbench_items_skipped", "counter", "Items skipped because output exists", status.skipped),
+        ("llmbench_queue_depth", "gauge", "Items still to run", status.queue_depth),
+        ("llmbench_elapsed_seconds", "gauge", "Seconds since the run started", now - status.run_start),
+        ("llmbench_eta_seconds", "gauge", "Estimated seconds remaining (-1 if unknown)", eta if eta is not None else -1),
+        ("llmbench_current_item_seconds", "gauge", "Seconds spent on the in-flight generation", item_seconds),
+        ("llmbench_active_tokens_per_second", "gauge", "Decode rate of the active generation (-1 if unknown)",
+         tokens_per_sec if tokens_per_sec is not None else -1),
+    ]
+    lines = []
+    for name, kind, help_text, value in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value:.3f}" if isinstance(value, float) else f"{name} {value}")
+    lines.append("# HELP llmbench_current_item Model and prompt currently being generated")
+    lines.append("# TYPE llmbench_current_item gauge")
+    lines.append(
+        f'llmbench_current_item{{model="{_label(status.current_model)}",prompt="{_label(status.current_prompt)}"}} '
+        f'{1 if status.item_start is not None else 0}'
+    )
+    return "\n".join(lines) + "\n"
+
+def render_status_json(status: RunStatus, tokens_per_sec: Optional[float]) -> dict:
+    now = time.time()
+    return {
+        'model': status.current_model,
+        'prompt': status.current_prompt,
+        'active': status.item_start is not None,
+        'current_item_seconds': now - status.item_start if status.item_start is not None else None,
+        'elapsed_seconds': now - status.run_start,
+        'eta_seconds': status.eta_seconds(),
+        'tokens_per_second': tokens_per_sec,
+        'total': status.total_items,
+        'completed': status.completed,
+        'failed': status.failed,
+        'skipped': status.skipped,
+        'queue_depth': status.queue_depth,
+    }
+
+def fmt_secs(value: Optional[float]) -> str:
+    """HH:MM:SS; hours keep counting past a day (runs can take longer than 24h)."""
+    if value is None:
+        return "n/a"
+    minutes, seconds = divmod(int(value), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+def render_html(status: RunStatus, tokens_per_sec: Optional[float]) -> str:
+    data = render_status_json(status, tokens_per_sec)
+
+    rows = [
+        ("Model", html.escape(data['model'] or "-")),
+        ("Prompt", html.escape(data['prompt'] or "-")),
+        ("Current item", fmt_secs(data['current_item_seconds'])),
+        ("Tokens/s", f"{tokens_per_sec:.1f}" if tokens_per_sec is not None else "n/a"),
+        ("Elapsed", fmt_secs(data['elapsed_seconds'])),
+        ("Estimated remaining", fmt_secs(data['eta_seconds'])),
+        ("Completed", f"{data['completed']} / {data['total']}"),
+        ("Queue depth", str(data['queue_depth'])),
+        ("Skipped", str(data['skipped'])),
+        ("Failures", str(data['failed'])),
+    ]
+    table = "\n".join(f"<tr><th>{k}</th><td>{v}</td></tr>" for k, v in rows)
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta http-equiv="refresh" content="5">
+    <title>Benchmark Status</title>
+    <style>
+        body {{ font-family: sans-serif; margin: 15px; background-color: #f4f4f4; }}
+        h1 {{ color: #333; margin-top: 0; }}
+        table {{ border-collapse: collapse; background-color: #fff; box-shadow: 0 2px 4px rgba(0,0,0,0.1); }}
+        th, td {{ border: 1px solid #ccc; padding: 6px 12px; text-align: left; }}
+        th {{ background-color: #eee; }}
+    </style>
+</head>
+<body>
+    <h1>Benchmark Status</h1>
+    <table>
+{table}
+    </table>
+    <p><a href="/metrics">/metrics</a> | <a href="/status.json">/status.json</a></p>
+</body>
+</html>
+"""
+
+def start_status_server(status: RunStatus, host: str, port: int,
+                        read_tokens: Optional[Callable[[], Optional[int]]] = None) -> ThreadingHTTPServer:
+    """
+    Serves / (HTML), /metrics (Prometheus text format) and /status.json on a
+    daemon thread. read_tokens, if given, returns the active generation's
+    cumulative decoded token count and is only called when a page is requested.
+    """
+    live_rate = LiveRate(read_tokens) if read_tokens else None
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            tokens_per_sec = live_rate.get() if live_rate and status.item_start is not None else None
+            path = self.path.split('?', 1)[0]
+            if path == "/metrics":
+                body, ctype = render_prometheus(status, tokens_per_sec), "text/plain; version=0.0.4"
+            elif path == "/status.json":
+                body, ctype = json.dumps(render_status_json(status, tokens_per_sec)), "application/json"
+            elif path == "/":
+                body, ctype = render_html(status, tokens_per_sec), "text/html; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            payload = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass  # Keep request logs out of the benchmark output
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="status-server", daemon=True).start()
+    return server
@@ -0,0 +1,119 @@
+# utils/sweep.py
+import itertools
+import random
+from typing import Dict, Any, List, Optional, Tuple
+
+# Sweep definitions live on a model rule in config.yaml, e.g.
+#
+#   sweep:
+#     strategy: "grid"          # grid | random
+#     samples: 8                # random only: number of points drawn from the grid
+#     seed: 0                   # random only
+#     prompts: ["ball_bound"]   # optional subset of prompt stems
+#     startup_args:             # flag -> list of values (true/false toggles a bare flag)
+#       "-ngl": [60, 99]
+#       "--flash-attn": [true, false]
+#     generation_params:        # param -> list of values
+#       temperature: [0.2, 0.7]
+
+def _expand_axes(axes: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Cartesian product of {name: [values]} -> list of {name: value}."""
+    if not axes:
+        return [{}]
+    names = list(axes.keys())
+    values = [v if isinstance(v, list) else [v] for v in axes.values()]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+def startup_args_to_cli(values: Dict[str, Any]) -> List[str]:
+    """Turns {flag: value} into CLI args. Booleans toggle a bare flag."""
+    args = []
+    for flag, value in values.items():
+        if value is True:
+            args.append(flag)
+        elif value is False or value is None:
+            continue
+        else:
+            args.extend([flag, str(value)])
+    return args
+
+def expand_sweep(sweep_cfg: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Expands a sweep definition into a list of points, each with the swept
+    startup values and generation param overrides. Points are ordered so that
+    all points sharing startup args are adjacent (one server load per group).
+    """
+    startup_combos = _expand_axes(sweep_cfg.get('startup_args', {}))
+    gen_combos = _expand_axes(sweep_cfg.get('generation_params', {}))
+    points = [
+        {'startup': s, 'generation_params': g}
+        for s, g in itertools.product(startup_combos, gen_combos)
+    ]
+
+    strategy = sweep_cfg.get('strategy', 'grid')
+    if strategy == 'random':
+        samples = min(sweep_cfg.get('samples', len(points)), len(points))
+        rng = random.Random(sweep_cfg.get('seed', 0))
+        points = rng.sample(points, samples)
+    elif strategy != 'grid':
+        raise ValueError(f"Unknown sweep strategy: {strategy} (expected 'grid' or 'random')")
+
+    # Stable grouping by startup args, preserving first-seen order
+    group_order = {}
+    for p in points:
+        group_order.setdefault(startup_key(p), len(group_order))
+    points.sort(key=lambda p: group_order[startup_key(p)])
+    return points
+
+def startup_key(point: Dict[str, Any]) -> Tuple:
+    return tuple(startup_args_to_cli(point['startup']))
+
+def point_label(point: Dict[str, Any]) -> str:
+    parts = [f"{k}={v}" for k, v in point['startup'].items()]
+    parts += [f"{k}={v}" for k, v in point['generation_params'].items()]
+    return " ".join(parts) or "(defaults)"
+
+def pareto_frontier(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Returns the rows not dominated on (throughput max, memory min, load time min).
+    Rows missing a metric are left out of the frontier.
+    """
+    candidates = [
+        r for r in rows
+        if r.get('throughput') is not None and r.get('memory_bytes') is not None and r.get('load_time') is not None
+    ]
+
+    def dominates(a, b):
+        no_worse = (a['throughput'] >= b['throughput'] and
+                    a['memory_bytes'] <= b['memory_bytes'] and
+                    a['load_time'] <= b['load_time'])
+        better = (a['throughput'] > b['throughput'] or
+                  a['memory_bytes'] < b['memory_bytes'] or
+                  a['load_time'] < b['load_time'])
+        return no_worse and better
+
+    return [r for r in candidates if not any(dominates(o, r) for o in candidates if o is not r)]
+
+def render_sweep_report(model_name: str, rows: List[Dict[str, Any]], frontier: List[Dict[str, Any]], throughput_unit: str) -> str:
+    """Markdown report of every sweep point, with Pareto-optimal points marked."""
+    frontier_ids = {id(r) for r in frontier}
+
+    def fmt(value, spec, scale=1.0):
+        return format(value / scale, spec) if value is not None else "n/a"
+
+    lines = [
+        f"# Sweep: {model_name}",
+        "",
+        f"{len(rows)} points, {len(frontier)} on the Pareto frontier "
+        f"(max throughput, min memory, min load time). Throughput in {throughput_unit}.",
+        "",
+        "| Pareto | Parameters | Throughput | Memory GiB | Load s | Prompts OK |",
+        "|---|---|---|---|---|---|",
+    ]
+    ordered = sorted(rows, key=lambda r: (id(r) not in frontier_ids, -(r.get('throughput') or 0)))
+    for r in ordered:
+        lines.append(
+            f"| {'*' if id(r) in frontier_ids else ''} | {r['label']} "
+            f"| {fmt(r.get('throughput'), '.2f')} | {fmt(r.get('memory_bytes'), '.2f', 1024**3)} "
+            f"| {fmt(r.get('load_time'), '.1f')} | {r['ok']}/{r['attempted']} |"
+        )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,116 @@
+# utils/timeline.py
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# In-process span recorder for whole benchmark runs, written out in the Chrome
+# Trace Event format (open in https://ui.perfetto.dev or chrome://tracing).
+# Disabled by default; when disabled span() hands back one shared no-op
+# context manager, so instrumented code costs a function call and an if.
+# When enabled, a span is two perf_counter_ns() reads and one list append
+# (list.append is atomic, so pool and extraction threads need no lock).
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'cat', 'args', 'start')
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args = dict(self.args or {}, error=exc_type.__name__)
+        self.tracer._events.append(('X', self.name, self.cat, self.start, end - self.start,
+                                    threading.get_ident(), self.args))
+        return False
+
+    def set(self, **args):
+        """Attaches arguments known only once the span is running (e.g. result sizes)."""
+        self.args = dict(self.args or {}, **args)
+
+class Tracer:
+    def __init__(self):
+        self.enabled = False
+        self._events: List[tuple] = []
+        self._origin = time.perf_counter_ns()
+        self._thread_names: Dict[int, str] = {}
+
+    def enable(self):
+        self.enabled = True
+        self._origin = time.perf_counter_ns()
+
+    def span(self, name: str, cat: str = 'run', **args):
+        """Context manager recording one complete ('X') event around its block."""
+        if not self.enabled:
+            return _NULL_SPAN
+        self._thread_names.setdefault(threading.get_ident(), threading.current_thread().name)
+        return _Span(self, name, cat, args or None)
+
+    def complete(self, name: str, start_ns: int, duration_ns: int, cat: str = 'run', **args):
+        """Records a span measured elsewhere (e.g. prefill/decode from server timings)."""
+        if not self.enabled:
+            return
+        self._thread_names.setdefault(threading.get_ident(), threading.current_thread().name)
+        self._events.append(('X', name, cat, start_ns, duration_ns, threading.get_ident(), args or None))
+
+    def instant(self, name: str, cat: str = 'run', **args):
+        if not self.enabled:
+            return
+        self._thread_names.setdefault(threading.get_ident(), threading.current_thread().name)
+        self._events.append(('i', name, cat, time.perf_counter_ns(), 0, threading.get_ident(), args or None))
+
+    @staticmethod
+    def now_ns() -> int:
+        return time.perf_counter_ns()
+
+    def to_chrome_trace(self, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        pid = os.getpid()
+        tids = {ident: n for n, ident in enumerate(self._thread_names, start=1)}
+        events = [{'ph': 'M', 'name': 'process_name', 'pid': pid, 'tid': 0, 'args': {'name': 'run_benchmarks'}}]
+        for ident, name in self._thread_names.items():
+            events.append({'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': tids[ident], 'args': {'name': name}})
+        for ph, name, cat, start, duration, ident, args in list(self._events):
+            event = {'ph': ph, 'name': name, 'cat': cat, 'pid': pid, 'tid': tids.get(ident, 0),
+                     'ts': (start - self._origin) / 1000}
+            if ph == 'X':
+                event['dur'] = duration / 1000
+            else:
+                event['s'] = 't'
+            if args:
+                event['args'] = args
+            events.append(event)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': metadata or {}}
+
+    def write(self, path: Path, metadata: Optional[Dict[str, Any]] = None) -> int:
+        """Writes the trace JSON; returns the number of recorded events."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(json.dumps(self.to_chrome_trace(metadata), default=str), encoding='utf-8')
+        os.replace(tmp, path)
+        return len(self._events)
+
+# Shared by backend.py and run_benchmarks.py; enabled by run_benchmarks.py --trace
+TRACER = Tracer()
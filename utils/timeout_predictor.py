@@ -0,0 +1,158 @@
+# utils/timeout_predictor.py
+import math
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+# Per model x prompt generation deadlines, predicted from earlier runs instead
+# of one global server.primary_timeout. Settings live in config.yaml:
+#
+#   server:
+#     adaptive_timeout:
+#       enabled: false
+#       history: "results"      # results root with the dated run folders
+#       quantile: 0.95          # of the expected generation time
+#       margin: 0.5             # deadline = quantile x (1 + margin)
+#       min_seconds: 120
+#       max_seconds: 3600
+#       min_samples: 3          # runs needed before a level of history is trusted
+#
+# The prediction uses the most specific history that has min_samples runs:
+#   model+prompt  this model variant on this prompt
+#   model         this model variant on any prompt, scaled by the prompt factor
+#   size          seconds per GiB over all models with a known size, scaled by
+#                 the GGUF size and the prompt factor
+#   default       nothing usable: server.primary_timeout as before
+# The prompt factor is how much longer (or shorter) than a model's typical
+# run this prompt takes, as the median over all models that ran it.
+
+DEFAULT_HISTORY = 'results'
+DEFAULT_QUANTILE = 0.95
+DEFAULT_MARGIN = 0.5
+DEFAULT_MIN_SECONDS = 120
+DEFAULT_MAX_SECONDS = 3600
+DEFAULT_MIN_SAMPLES = 3
+DEADLINE_HIT_RATIO = 0.98      # A failed run this close to its deadline counts as timed out
+
+def timeout_settings(config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    config = config or {}
+    return {
+        'enabled': bool(config.get('enabled', False)),
+        'history': config.get('history', DEFAULT_HISTORY),
+        'quantile': float(config.get('quantile', DEFAULT_QUANTILE)),
+        'margin': float(config.get('margin', DEFAULT_MARGIN)),
+        'min_seconds': float(config.get('min_seconds', DEFAULT_MIN_SECONDS)),
+        'max_seconds': float(config.get('max_seconds', DEFAULT_MAX_SECONDS)),
+        'min_samples': int(config.get('min_samples', DEFAULT_MIN_SAMPLES)),
+    }
+
+def quantile(values: List[float], q: float) -> float:
+    """Linear-interpolated empirical quantile (q in 0..1) of a non-empty list."""
+    values = sorted(values)
+    pos = (len(values) - 1) * min(max(q, 0.0), 1.0)
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+def load_history(results_root, prompt_stems: List[str]) -> Dict[tuple, List[float]]:
+    """
+    (model variant stem, prompt stem) -> generation times from every dated run
+    under results_root. Uses compare_runs.collect_runs, so copies carried
+    forward into later folders count once and fallback runs are left out;
+    early-stopped runs are left out too (their times are truncated).
+    """
+    from compare_runs import collect_runs, EARLY_STOP_SUFFIX
+    if not Path(results_root).is_dir():
+        return {}
+    runs, _ = collect_runs(str(results_root), list(prompt_stems))
+    history = {}
+    for (model, prompt), by_date in runs.items():
+        if model.endswith(EARLY_STOP_SUFFIX):
+            continue
+        times = [s['time'] for samples in by_date.values() for s in samples if s['time'] > 0]
+        if times:
+            history[(model, prompt)] = times
+    return history
+
+class TimeoutPredictor:
+    """
+    Predicts a deadline per model variant x prompt and keeps the prediction
+    error of every finished run. Read-only after construction apart from
+    record(), which only appends, so pool threads can share one instance.
+    """
+    def __init__(self, history: Dict[tuple, List[float]], model_sizes: Dict[str, int],
+                 settings: Dict[str, Any], default_timeout: float):
+        self.history = history
+        self.settings = settings
+        self.default_timeout = default_timeout
+        self.outcomes: List[Dict[str, Any]] = []
+
+        self._by_model: Dict[str, List[float]] = {}
+        for (model, _), times in history.items():
+            self._by_model.setdefault(model, []).extend(times)
+        self._model_median = {m: quantile(t, 0.5) for m, t in self._by_model.items()}
+
+        # Prompt factor: median over models of (median time on this prompt / model's median time)
+        ratios: Dict[str, List[float]] = {}
+        for (model, prompt), times in history.items():
+            ratios.setdefault(prompt, []).append(quantile(times, 0.5) / self._model_median[model])
+        self._prompt_factor = {p: quantile(r, 0.5) for p, r in ratios.items()}
+
+        # Seconds per GiB: one value per model whose GGUF size is known
+        self._per_gib = [
+            quantile(times, 0.5) / (model_sizes[model] / 1024**3)
+            for model, times in self._by_model.items()
+            if model_sizes.get(model) and len(times) >= settings['min_samples']
+        ]
+
+    def prompt_factor(self, prompt: str) -> float:
+        return self._prompt_factor.get(prompt, 1.0)
+
+    def predict(self, model: str, prompt: str, size_bytes: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Returns {'timeout', 'expected', 'basis', 'samples'}: the deadline in
+        seconds, the expected (median) generation time it was derived from,
+        which history level was used and how many runs that level had.
+        """
+        s = self.settings
+        times = self.history.get((model, prompt), [])
+        model_times = self._by_model.get(model, [])
+        if len(times) >= s['min_samples']:
+            basis, expected, upper, samples = 'model+prompt', quantile(times, 0.5), quantile(times, s['quantile']), len(times)
+        elif len(model_times) >= s['min_samples']:
+            factor = self.prompt_factor(prompt)
+            basis, samples = 'model', len(model_times)
+            expected, upper = quantile(model_times, 0.5) * factor, quantile(model_times, s['quantile']) * factor
+        elif size_bytes and len(self._per_gib) >= s['min_samples']:
+            factor = self.prompt_factor(prompt) * size_bytes / 1024**3
+            basis, samples = 'size', len(self._per_gib)
+            expected, upper = quantile(self._per_gib, 0.5) * factor, quantile(self._per_gib, s['quantile']) * factor
+        else:
+            return {'timeout': self.default_timeout, 'expected': None, 'basis': 'default', 'samples': 0}
+        timeout = min(max(upper * (1 + s['margin']), s['min_seconds']), s['max_seconds'])
+        return {'timeout': round(timeout), 'expected': expected, 'basis': basis, 'samples': samples}
+
+    def record(self, prediction: Dict[str, Any], actual: Optional[float], success: bool) -> Dict[str, Any]:
+        """Stores the outcome of a run; returns it with the relative error (None without an expectation)."""
+        timed_out = not success and actual is not None and actual >= prediction['timeout'] * DEADLINE_HIT_RATIO
+        error = None
+        if success and actual is not None and prediction['expected']:
+            error = (actual - prediction['expected']) / prediction['expected']
+        outcome = dict(prediction, actual=actual, success=success, timed_out=timed_out, error=error)
+        self.outcomes.append(outcome)
+        return outcome
+
+    def summary(self) -> str:
+        errors = [abs(o['error']) for o in self.outcomes if o['error'] is not None]
+        by_basis: Dict[str, int] = {}
+        for o in self.outcomes:
+            by_basis[o['basis']] = by_basis.get(o['basis'], 0) + 1
+        timed_out = sum(1 for o in self.outcomes if o['timed_out'])
+        error_str = (f"median abs error {quantile(errors, 0.5):.0%}, p90 {quantile(errors, 0.9):.0%}"
+                     if errors else "no prediction error (no history)")
+        bases = ", ".join(f"{b} {n}" for b, n in sorted(by_basis.items()))
+        return f"{len(self.outcomes)} runs ({bases}), {error_str}, {timed_out} hit the deadline"
+
+def format_prediction(prediction: Dict[str, Any]) -> str:
+    if prediction['expected'] is None:
+        return f"{prediction['timeout']:.0f}s (default, no history)"
+    return f"{prediction['timeout']:.0f}s (expected {prediction['expected']:.0f}s from {prediction['basis']}, {prediction['samples']} runs)"
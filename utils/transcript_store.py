@@ -0,0 +1,199 @@
+# utils/transcript_store.py
+import os
+import json
+import struct
+import argparse
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+# --- Configuration ---
+RESULTS_ROOT = 'results'          # Folder holding the dated run folders
+RESULTS_SUBDIR = 'results'        # Per-date folder holding the .md transcripts
+COMPRESSED_SUFFIX = '.zst'        # <name>.md -> <name>.md.zst
+COMPRESSION_LEVEL = 19            # Transcripts are written once and read many times
+
+# File layout (a valid zstd stream, so `zstd -d x.md.zst` restores the .md):
+#   skippable frame  : JSON index {'segments': [{'name', 'offset', 'length', 'size'}]}
+#   zstd frame 'head': text before the extracted HTML block
+#   zstd frame 'html': the last HTML block (what extract_html.py would extract)
+#   zstd frame 'tail': text after it (explanations, benchmark metadata)
+# Offsets are relative to the first byte after the index frame. Transcripts
+# without an HTML block are a single 'head' frame.
+INDEX_MAGIC = 0x184D2A5E          # Any of 0x184D2A50..5F marks a skippable frame
+INDEX_VERSION = 1
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Compressed transcripts need the 'zstandard' package (pip install zstandard).")
+    return zstandard
+
+# --- Paths ---
+
+def compressed_path(md_path: Path) -> Path:
+    return md_path.with_name(md_path.name + COMPRESSED_SUFFIX)
+
+def logical_path(path: Path) -> Path:
+    """The .md path a transcript is known by, whether it is stored plain or compressed."""
+    return path.with_name(path.name[:-len(COMPRESSED_SUFFIX)]) if path.name.endswith(COMPRESSED_SUFFIX) else path
+
+def transcript_exists(md_path: Path) -> bool:
+    return md_path.is_file() or compressed_path(md_path).is_file()
+
+def iter_transcripts(folder: Path) -> Iterator[Path]:
+    """Yields the logical .md path of every transcript in folder (plain or compressed), sorted."""
+    names = set()
+    for path in folder.iterdir():
+        if path.name.startswith('.') or not path.is_file():
+            continue
+        name = logical_path(path).name
+        if name.lower().endswith('.md'):
+            names.add(name)
+    for name in sorted(names):
+        yield folder / name
+
+# --- Compression ---
+
+def find_html_span(text: str) -> Optional[Tuple[int, int]]:
+    """Span of the last HTML block, matched exactly as extract_html.py does."""
+    from extract_html import HTML_PATTERN  # Imported here: extract_html reads transcripts through this module
+    span = None
+    for match in HTML_PATTERN.finditer(text):
+        span = match.span(1)
+    return span
+
+def compress_transcript(text: str) -> bytes:
+    zstd = _zstd()
+    span = find_html_span(text)
+    if span:
+        parts = [('head', text[:span[0]]), ('html', text[span[0]:span[1]]), ('tail', text[span[1]:])]
+    else:
+        parts = [('head', text)]
+
+    cctx = zstd.ZstdCompressor(level=COMPRESSION_LEVEL)
+    segments, frames, offset = [], [], 0
+    for name, part in parts:
+        raw = part.encode('utf-8')
+        frame = cctx.compress(raw)
+        segments.append({'name': name, 'offset': offset, 'length': len(frame), 'size': len(raw)})
+        frames.append(frame)
+        offset += len(frame)
+
+    index = json.dumps({'version': INDEX_VERSION, 'segments': segments}, separators=(',', ':')).encode('utf-8')
+    return struct.pack('<II', INDEX_MAGIC, len(index)) + index + b''.join(frames)
+
+def read_index(f) -> Tuple[Dict[str, Any], int]:
+    """Reads the index frame from an open compressed transcript; returns (index, data_start)."""
+    header = f.read(8)
+    if len(header) < 8:
+        raise ValueError("truncated transcript")
+    magic, length = struct.unpack('<II', header)
+    if magic != INDEX_MAGIC:
+        raise ValueError("not an indexed transcript (missing index frame)")
+    return json.loads(f.read(length)), 8 + length
+
+def read_segments(zst_path: Path, names=None) -> Dict[str, str]:
+    """Decompresses only the named segments (all if names is None)."""
+    dctx = _zstd().ZstdDecompressor()
+    out = {}
+    with open(zst_path, 'rb') as f:
+        index, data_start = read_index(f)
+        for segment in index['segments']:
+            if names is not None and segment['name'] not in names:
+                continue
+            f.seek(data_start + segment['offset'])
+            raw = dctx.decompress(f.read(segment['length']), max_output_size=segment['size'])
+            out[segment['name']] = raw.decode('utf-8', errors='replace')
+    return out
+
+# --- Transparent Reading ---
+
+def read_transcript(md_path: Path) -> str:
+    """Reads a transcript by its .md path, decompressing <name>.md.zst if that is how it is stored."""
+    md_path = Path(md_path)
+    if md_path.is_file():
+        return md_path.read_text(encoding='utf-8', errors='replace')
+    segments = read_segments(compressed_path(md_path))
+    return segments.get('head', '') + segments.get('html', '') + segments.get('tail', '')
+
+def read_html_block(md_path: Path) -> Tuple[bool, Optional[str]]:
+    """
+    Fast path for extraction: (True, html or None) when the transcript is stored
+    compressed (only the html frame is read), (False, None) when it is a plain .md.
+    """
+    md_path = Path(md_path)
+    if md_path.is_file():
+        return False, None
+    return True, read_segments(compressed_path(md_path), {'html'}).get('html')
+
+# --- Conversion ---
+
+def compress_file(md_path: Path, keep: bool = False) -> int:
+    """Writes <name>.md.zst (verified by a round trip) and removes the .md unless keep. Returns bytes saved."""
+    text = md_path.read_text(encoding='utf-8')
+    data = compress_transcript(text)
+    target = compressed_path(md_path)
+    tmp = target.with_name(f".{target.name}.tmp")
+    tmp.write_bytes(data)
+    segments = read_segments(tmp)
+    if segments.get('head', '') + segments.get('html', '') + segments.get('tail', '') != text:
+        tmp.unlink()
+        raise ValueError(f"round trip mismatch for {md_path.name}")
+    os.replace(tmp, target)
+    saved = md_path.stat().st_size - len(data)
+    if not keep:
+        md_path.unlink()
+    return saved
+
+def decompress_file(zst_path: Path):
+    md_path = logical_path(zst_path)
+    tmp = md_path.with_name(f".{md_path.name}.tmp")
+    tmp.write_text(read_transcript(md_path), encoding='utf-8')
+    os.replace(tmp, md_path)
+    zst_path.unlink()
+
+# --- Main Execution ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Store result transcripts zstd-compressed with an HTML offset index.")
+    parser.add_argument("--run-dir", type=str, nargs="+", default=None,
+                        help=f"Dated folder(s) to convert (default: every folder in {RESULTS_ROOT}).")
+    parser.add_argument("--decompress", action="store_true", help="Turn .md.zst transcripts back into .md files.")
+    parser.add_argument("--keep", action="store_true", help="Keep the .md files next to the compressed copies.")
+    args = parser.parse_args()
+
+    if args.run_dir:
+        date_dirs = [Path(d) for d in args.run_dir]
+    else:
+        results_root = Path(RESULTS_ROOT)
+        if not results_root.is_dir():
+            print(f"Error: Results directory '{results_root}' not found.")
+            return
+        date_dirs = sorted(p for p in results_root.iterdir() if p.is_dir() and not p.name.startswith('.'))
+
+    converted, saved = 0, 0
+    for date_dir in date_dirs:
+        folder = date_dir / RESULTS_SUBDIR
+        if not folder.is_dir():
+            continue
+        for md_path in iter_transcripts(folder):
+            zst_path = compressed_path(md_path)
+            try:
+                if args.decompress:
+                    if zst_path.is_file():
+                        decompress_file(zst_path)
+                        converted += 1
+                elif md_path.is_file() and not zst_path.is_file():
+                    saved += compress_file(md_path, keep=args.keep)
+                    converted += 1
+            except (OSError, ValueError, RuntimeError) as e:
+                print(f"  [ERROR] {md_path}: {e}")
+
+    if args.decompress:
+        print(f"Decompressed {converted} transcripts.")
+    else:
+        print(f"Compressed {converted} transcripts, saving {saved / (1024**2):.2f} MiB.")
+
+if __name__ == "__main__":
+    main()
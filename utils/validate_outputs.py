@@ -0,0 +1,371 @@
+# utils/validate_outputs.py
+import os
+import re
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+from html.parser import HTMLParser
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from blob_store import hash_bytes
+from extract_html import NO_RESULT_HTML
+
+# --- Configuration ---
+RESULTS_ROOT = 'results'                     # Folder holding the dated run folders
+HTML_SUBDIR = 'html'                         # Per-date folder holding extracted .html pages
+REPORT_FILENAME = 'validation.json'          # Written into each dated folder
+CACHE_SUBDIR = '.cache/validate'             # Results keyed by page content hash, under the results root (None disables)
+VALIDATOR_VERSION = 1                        # Bump when the checks change to invalidate the cache
+NODE_TIMEOUT = 20                            # Seconds per `node --check` call
+
+JS_TYPES = {'', 'text/javascript', 'application/javascript', 'module'}
+ANIMATION_PATTERN = re.compile(r"\brequestAnimationFrame\s*\(|\bsetInterval\s*\(|\bsetTimeout\s*\(")
+CANVAS_SCRIPT_PATTERN = re.compile(r"createElement\(\s*['\"]canvas['\"]\s*\)|\.getContext\(\s*['\"](?:2d|webgl2?)['\"]")
+
+# --- JS Syntax Checkers ---
+# Preference order: esprima (pip install esprima), then `node --check`, then the
+# built-in tokenizer, which only catches unbalanced brackets and unterminated
+# strings/comments/template literals but needs nothing installed.
+
+def get_checker() -> str:
+    try:
+        import esprima  # noqa: F401
+        return 'esprima'
+    except ImportError:
+        pass
+    if shutil.which('node'):
+        return 'node'
+    return 'builtin'
+
+def check_with_esprima(source: str, module: bool) -> Optional[str]:
+    import esprima
+    try:
+        if module:
+            esprima.parseModule(source)
+        else:
+            esprima.parseScript(source)
+        return None
+    except esprima.Error as e:
+        return str(e)
+
+def check_with_node(source: str, module: bool) -> Optional[str]:
+    suffix = '.mjs' if module else '.js'
+    with tempfile.NamedTemporaryFile('w', suffix=suffix, encoding='utf-8', delete=False) as f:
+        f.write(source)
+        path = f.name
+    try:
+        proc = subprocess.run(['node', '--check', path], capture_output=True, text=True, timeout=NODE_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        return "node --check timed out"
+    finally:
+        os.unlink(path)
+    if proc.returncode == 0:
+        return None
+    # node prints "<file>:<line>\n<source line>\n<caret>\n\nSyntaxError: ..."
+    lines = [l for l in proc.stderr.splitlines() if l.strip()]
+    message = next((l for l in lines if 'Error' in l), lines[-1] if lines else "syntax error")
+    location = lines[0].rsplit(':', 1)[-1] if lines and lines[0].startswith(path) else "?"
+    return f"line {location}: {message.strip()}"
+
+# Characters after which '/' starts a regex literal rather than a division
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw', 'case', 'do', 'else', 'yield', 'await'}
+_CLOSERS = {')': '(', ']': '[', '}': '{'}
+
+def check_with_builtin(source: str, module: bool) -> Optional[str]:
+    stack: List[Tuple[str, int]] = []   # (opening char or '`', line)
+    i, n, line = 0, len(source), 1
+    prev = ''                          # Last significant token (char or identifier)
+    while i < n:
+        c = source[i]
+        if c == '\n':
+            line += 1
+            i += 1
+            continue
+        if c.isspace():
+            i += 1
+            continue
+        if stack and stack[-1][0] == '`':
+            # Inside a template literal: scan to the closing backtick or a ${ substitution
+            start_line = line
+            while i < n and source[i] != '`':
+                if source[i] == '\\':
+                    i += 1
+                elif source[i] == '$' and i + 1 < n and source[i + 1] == '{':
+                    break
+                elif source[i] == '\n':
+                    line += 1
+                i += 1
+            if i >= n:
+                return f"line {stack[-1][1]}: unterminated template literal"
+            if source[i] == '`':
+                stack.pop()
+                i += 1
+                prev = ')'
+            else:
+                stack.append(('${', start_line))
+                i += 2
+                prev = '{'
+            continue
+        if source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end == -1 else end
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            if end == -1:
+                return f"line {line}: unterminated comment"
+            line += source.count('\n', i, end)
+            i = end + 2
+            continue
+        if c in '\'"':
+            j = i + 1
+            while j < n and source[j] != c:
+                if source[j] == '\\':
+                    j += 1
+                elif source[j] == '\n':
+                    return f"line {line}: unterminated string"
+                j += 1
+            if j >= n:
+                return f"line {line}: unterminated string"
+            i = j + 1
+            prev = ')'
+            continue
+        if c == '`':
+            stack.append(('`', line))
+            i += 1
+            continue
+        if c == '/' and (prev == '' or prev in _REGEX_PRECEDERS or prev in _REGEX_KEYWORDS):
+            # Regex literal: skip to the closing '/', honouring escapes and [...] classes
+            j, in_class = i + 1, False
+            while j < n and (in_class or source[j] != '/'):
+                if source[j] == '\\':
+                    j += 1
+                elif source[j] == '[':
+                    in_class = True
+                elif source[j] == ']':
+                    in_class = False
+                elif source[j] == '\n':
+                    return f"line {line}: unterminated regular expression"
+                j += 1
+            i = j + 1
+            while i < n and (source[i].isalnum() or source[i] == '_'):
+                i += 1  # flags
+            prev = ')'
+            continue
+        if c.isalnum() or c in '_$':
+            j = i
+            while j < n and (source[j].isalnum() or source[j] in '_$'):
+                j += 1
+            prev = source[i:j]
+            i = j
+            continue
+        if c in '([{':
+            stack.append((c, line))
+        elif c in ')]}':
+            if c == '}' and stack and stack[-1][0] == '${':
+                stack.pop()  # Back into the enclosing template literal
+                i += 1
+                continue
+            if not stack or stack[-1][0] != _CLOSERS[c]:
+                return f"line {line}: unexpected '{c}'"
+            stack.pop()
+        prev = c
+        i += 1
+    if stack:
+        opener, opened_at = stack[-1]
+        what = "template literal" if opener in ('`', '${') else f"'{opener}'"
+        return f"line {opened_at}: unclosed {what}"
+    return None
+
+CHECKERS = {'esprima': check_with_esprima, 'node': check_with_node, 'builtin': check_with_builtin}
+
+# --- HTML Inspection ---
+
+class PageParser(HTMLParser):
+    """Collects inline scripts (with their starting line), external script srcs and canvas tags."""
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.scripts: List[Dict[str, Any]] = []
+        self.external_scripts: List[str] = []
+        self.canvas_tags = 0
+        self.title = ""
+        self._in_script = None
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'script':
+            if attrs.get('src'):
+                self.external_scripts.append(attrs['src'])
+            else:
+                script_type = (attrs.get('type') or '').strip().lower()
+                if script_type in JS_TYPES:
+                    self._in_script = {'line': self.getpos()[0], 'module': script_type == 'module', 'source': ''}
+        elif tag == 'canvas':
+            self.canvas_tags += 1
+        elif tag == 'title':
+            self._in_title = True
+
+    def handle_endtag(self, tag):
+        if tag == 'script' and self._in_script is not None:
+            self.scripts.append(self._in_script)
+            self._in_script = None
+        elif tag == 'title':
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_script is not None:
+            self._in_script['source'] += data
+        elif self._in_title:
+            self.title += data
+
+def validate_html(content: str, checker: str) -> Dict[str, Any]:
+    """
+    Runs the checks on one extracted page. status is the first failing check:
+    no_result, no_script, script_error, no_canvas, no_animation_loop, or ok.
+    """
+    result = {
+        'checker': checker, 'version': VALIDATOR_VERSION, 'status': 'ok', 'scripts': 0,
+        'external_scripts': 0, 'errors': [], 'canvas': False, 'animation_loop': False,
+    }
+    if content == NO_RESULT_HTML:
+        result['status'] = 'no_result'
+        return result
+
+    page = PageParser()
+    try:
+        page.feed(content)
+        page.close()
+    except Exception as e:
+        result['status'] = 'script_error'
+        result['errors'].append(f"HTML parse error: {e}")
+        return result
+
+    check = CHECKERS[checker]
+    for script in page.scripts:
+        error = check(script['source'], script['module'])
+        if error:
+            result['errors'].append(f"<script> at HTML line {script['line']}: {error}")
+
+    all_js = "\n".join(s['source'] for s in page.scripts)
+    result['scripts'] = len(page.scripts)
+    result['external_scripts'] = len(page.external_scripts)
+    result['canvas'] = page.canvas_tags > 0 or bool(CANVAS_SCRIPT_PATTERN.search(all_js))
+    result['animation_loop'] = bool(ANIMATION_PATTERN.search(all_js))
+
+    if not page.scripts and not page.external_scripts:
+        result['status'] = 'no_script'
+    elif result['errors']:
+        result['status'] = 'script_error'
+    elif not result['canvas']:
+        result['status'] = 'no_canvas'
+    elif not result['animation_loop']:
+        result['status'] = 'no_animation_loop'
+    return result
+
+def _validate_job(job: Tuple[str, str, str]) -> Tuple[str, Dict[str, Any]]:
+    """Process-pool entry point: (path, digest, checker) -> (path, result)."""
+    path, digest, checker = job
+    content = Path(path).read_text(encoding='utf-8', errors='replace')
+    result = validate_html(content, checker)
+    result['hash'] = digest
+    return path, result
+
+# --- Driver ---
+
+def validate_cache_dir(date_dir: Path) -> Optional[Path]:
+    """<results root>/.cache/validate for a dated folder, wherever the tool is run from (None if disabled)."""
+    if not CACHE_SUBDIR:
+        return None
+    return Path(date_dir).expanduser().resolve().parent / CACHE_SUBDIR
+
+def validate_dirs(date_dirs: List[Path], checker: str, cache_dir: Optional[Path], workers: Optional[int] = None) -> Dict[Path, Dict[str, Dict[str, Any]]]:
+    """
+    Validates every extracted page under the given dated folders.
+    Pages seen before (same content, same checker and version) come from the
+    cache; the rest are checked in parallel in a process pool.
+    Returns {date_dir: {filename: result}}.
+    """
+    reports: Dict[Path, Dict[str, Dict[str, Any]]] = {d: {} for d in date_dirs}
+    jobs = []
+    owners: Dict[str, Tuple[Path, str]] = {}
+    for date_dir in date_dirs:
+        html_dir = date_dir / HTML_SUBDIR
+        if not html_dir.is_dir():
+            continue
+        for path in sorted(html_dir.glob('*.html')):
+            if path.name.startswith('.'):
+                continue
+            try:
+                digest = hash_bytes(path.read_bytes())
+            except OSError as e:
+                print(f"  [WARN] Cannot read {path}: {e}")
+                continue
+            cache_path = cache_dir / f"{digest}.json" if cache_dir is not None else None
+            if cache_path is not None and cache_path.is_file():
+                try:
+                    cached = json.loads(cache_path.read_text(encoding='utf-8'))
+                    if cached.get('checker') == checker and cached.get('version') == VALIDATOR_VERSION:
+                        reports[date_dir][path.name] = cached
+                        continue
+                except (OSError, json.JSONDecodeError):
+                    pass
+            owners[str(path)] = (date_dir, path.name)
+            jobs.append((str(path), digest, checker))
+
+    cached_count = sum(len(r) for r in reports.values())
+    print(f"Validating {len(jobs)} pages with '{checker}' ({cached_count} cached).")
+    if jobs:
+        if cache_dir is not None:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, result in pool.map(_validate_job, jobs, chunksize=4):
+                date_dir, name = owners[path]
+                reports[date_dir][name] = result
+                if cache_dir is not None:
+                    (cache_dir / f"{result['hash']}.json").write_text(json.dumps(result), encoding='utf-8')
+    return reports
+
+def write_reports(reports: Dict[Path, Dict[str, Dict[str, Any]]]):
+    for date_dir, files in reports.items():
+        if not files:
+            continue
+        summary: Dict[str, int] = {}
+        for result in files.values():
+            summary[result['status']] = summary.get(result['status'], 0) + 1
+        report = {'summary': summary, 'files': dict(sorted(files.items()))}
+        (date_dir / REPORT_FILENAME).write_text(json.dumps(report, indent=1), encoding='utf-8')
+        print(f"  {date_dir.name}: {len(files)} pages {summary}")
+
+# --- Main Execution ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Syntax and structure checks on extracted HTML outputs.")
+    parser.add_argument("--run-dir", type=str, nargs="+", default=None,
+                        help=f"Dated folder(s) to validate (default: every folder in {RESULTS_ROOT}).")
+    parser.add_argument("--checker", choices=sorted(CHECKERS), default=None,
+                        help="JS syntax checker (default: esprima if installed, else node, else builtin).")
+    parser.add_argument("--workers", type=int, default=None, help="Validation processes (default: CPU count).")
+    parser.add_argument("--no-cache", action="store_true", help="Re-check every page.")
+    args = parser.parse_args()
+
+    if args.run_dir:
+        date_dirs = [Path(d) for d in args.run_dir]
+    else:
+        results_root = Path(RESULTS_ROOT)
+        if not results_root.is_dir():
+            print(f"Error: Results directory '{results_root}' not found.")
+            return
+        date_dirs = sorted(p for p in results_root.iterdir() if p.is_dir() and not p.name.startswith('.'))
+
+    checker = args.checker or get_checker()
+    cache_dir = validate_cache_dir(date_dirs[0]) if date_dirs and not args.no_cache else None
+    write_reports(validate_dirs(date_dirs, checker, cache_dir, args.workers))
+
+if __name__ == "__main__":
+    main()
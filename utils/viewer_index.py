@@ -0,0 +1,467 @@
+# utils/viewer_index.py
+import os
+import re
+import json
+import html
+import shutil
+import argparse
+import datetime
+from pathlib import Path
+
+from blob_store import hash_bytes
+from static_viewer import (
+    get_test_types, parse_result_filename, safe_json_dump, VIEWER_CSS, COMPARE_CSS, COMPARE_SCRIPT,
+    IFRAME_ORIGINAL_WIDTH, IFRAME_ORIGINAL_HEIGHT, IFRAME_SCALE
+)
+from compare_runs import parse_transcript, LEGACY_TYPES
+from transcript_store import transcript_exists
+
+# --- Configuration ---
+PROMPTS_DIR = 'code_prompts'
+RESULTS_ROOT = 'results'                 # Folder holding the dated run folders
+OUTPUT_FILENAME = 'results/index.html'   # One page for every dated run
+SHARD_DIR_NAME = 'viewer-index'          # Next to the page: <shard dir>/{type,model}/<hash>.js
+HTML_SUBDIR = 'html'
+TRANSCRIPT_SUBDIR = 'results'
+VALIDATION_FILENAME = 'validation.json'  # Written by validate_outputs.py
+PAGE_SIZE = 24
+
+DATE_DIR_PATTERN = re.compile(r'^\d{4}\.\d{2}\.\d{2}$')
+
+# Shards are plain scripts calling viewerShard(kind, key, records) rather than
+# JSON files, so the page can load them on demand from file:// as well as
+# from a web server (fetch() of local JSON is blocked by browsers).
+
+# --- Helper Functions ---
+
+def load_validation(date_dir: Path) -> dict:
+    path = date_dir / VALIDATION_FILENAME
+    if not path.is_file():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding='utf-8')).get('files', {})
+    except (OSError, ValueError) as e:
+        print(f"  [WARN] Could not read {path}: {e}")
+        return {}
+
+def collect_records(results_root: Path, valid_types) -> list:
+    """
+    One record per extracted result across all dated folders. Results carried
+    forward unchanged into later folders (same model, type and timestamp) are
+    listed once, under the first date they appear in.
+    """
+    records = []
+    seen = set()
+    dates = sorted(p.name for p in results_root.iterdir()
+                   if p.is_dir() and DATE_DIR_PATTERN.match(p.name) and (p / HTML_SUBDIR).is_dir())
+    for date in dates:
+        date_dir = results_root / date
+        validation = load_validation(date_dir)
+        for file in sorted(os.listdir(date_dir / HTML_SUBDIR)):
+            if file.startswith('.'):
+                continue
+            parsed = parse_result_filename(file, valid_types)
+            if not parsed:
+                continue
+            key = (parsed['model'], parsed['type'], parsed['timestamp'])
+            if key in seen:
+                continue
+            seen.add(key)
+
+            transcript = date_dir / TRANSCRIPT_SUBDIR / (Path(file).stem + '.md')
+            sample = parse_transcript(transcript) if transcript_exists(transcript) else None
+            check = validation.get(file, {})
+            records.append({
+                'model': parsed['model'],
+                'type': parsed['type'],
+                'date': date,
+                'timestamp': parsed['timestamp'],
+                'src': f"{date}/{HTML_SUBDIR}/{file}",
+                'time': round(sample['time'], 2) if sample else None,
+                'charsPerSec': round(sample['chars_per_sec'], 1) if sample else None,
+                'tokensPerSec': sample['tokens_per_sec'] if sample else None,
+                'earlyStop': bool(sample and sample['early_stop']),
+                'status': check.get('status'),
+            })
+    return records
+
+def write_shards(records: list, shard_dir: Path) -> dict:
+    """Writes one script per type and per model; returns the manifest entries for both."""
+    if shard_dir.is_dir():
+        shutil.rmtree(shard_dir)  # Generated output only; drop shards of removed models/types
+    manifest = {}
+    for kind, field in (('type', 'type'), ('model', 'model')):
+        groups = {}
+        for record in records:
+            groups.setdefault(record[field], []).append(record)
+        (shard_dir / kind).mkdir(parents=True, exist_ok=True)
+        entries = []
+        for name in sorted(groups, key=str.lower):
+            # Model names hold characters like '+' and '.', so shards are named by hash
+            file = hash_bytes(name.encode('utf-8'))[:16] + '.js'
+            payload = f"viewerShard({json.dumps(kind)}, {safe_json_dump(name)}, {safe_json_dump(groups[name])});\n"
+            (shard_dir / kind / file).write_text(payload, encoding='utf-8')
+            entries.append({'name': name, 'file': file, 'count': len(groups[name])})
+        manifest[kind] = entries
+    return manifest
+
+# --- Main Logic ---
+
+def generate_index_viewer(prompts_dir=PROMPTS_DIR, results_root=RESULTS_ROOT, output_filename=OUTPUT_FILENAME):
+    """Builds the all-runs viewer page and its on-demand index shards."""
+    types_data = get_test_types(prompts_dir)
+    if types_data.get('error'):
+        print(f"Error: {types_data['error']}")
+        return
+    valid_types = sorted(set(types_data['types']) | set(LEGACY_TYPES))
+
+    results_root = Path(results_root)
+    if not results_root.is_dir():
+        print(f"Error: Results directory '{results_root}' not found.")
+        return
+
+    records = collect_records(results_root, valid_types)
+    output_path = Path(output_filename)
+    shard_dir = output_path.parent / SHARD_DIR_NAME
+    shards = write_shards(records, shard_dir)
+
+    # Result paths in the shards are relative to results_root
+    page_dir = output_path.parent.resolve()
+    prefix = os.path.relpath(results_root.resolve(), page_dir).replace(os.sep, '/')
+    manifest = {
+        'types': shards['type'],
+        'models': shards['model'],
+        'dates': sorted({r['date'] for r in records}),
+        'total': len(records),
+        'shardDir': os.path.relpath(shard_dir.resolve(), page_dir).replace(os.sep, '/'),
+        'resultsPrefix': '' if prefix == '.' else prefix + '/',
+        'pageSize': PAGE_SIZE,
+        'generated': datetime.datetime.now().strftime('%Y-%m-%d %H:%M'),
+    }
+
+    container_width = IFRAME_ORIGINAL_WIDTH * IFRAME_SCALE
+    container_height = IFRAME_ORIGINAL_HEIGHT * IFRAME_SCALE
+    nav_html = "\n".join(
+        f'<a href="#" data-type="{html.escape(t["name"])}">{html.escape(t["name"])} ({t["count"]})</a>'
+        for t in shards['type']
+    ) or '<span id="no-types-message">No results found.</span>'
+    model_options = "\n".join(
+        f'<option value="{html.escape(m["name"])}">{html.escape(m["name"])} ({m["count"]})</option>'
+        for m in shards['model']
+    )
+    date_options = "\n".join(f'<option value="{d}">{d}</option>' for d in manifest['dates'])
+
+    output_html = INDEX_TEMPLATE.replace('__CSS__', VIEWER_CSS) \
+                                .replace('__COMPARE_CSS__', COMPARE_CSS) \
+                                .replace('__COMPARE_SCRIPT__', COMPARE_SCRIPT) \
+                                .replace('__CONTAINER_WIDTH__', str(container_width)) \
+                                .replace('__CONTAINER_HEIGHT__', str(container_height)) \
+                                .replace('__ORIG_WIDTH__', str(IFRAME_ORIGINAL_WIDTH)) \
+                                .replace('__ORIG_HEIGHT__', str(IFRAME_ORIGINAL_HEIGHT)) \
+                                .replace('__SCALE__', str(IFRAME_SCALE)) \
+                                .replace('__NAV_CONTENT__', nav_html) \
+                                .replace('__MODEL_OPTIONS__', model_options) \
+                                .replace('__DATE_OPTIONS__', date_options) \
+                                .replace('__JSON_STRING__', safe_json_dump(manifest))
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(output_html, encoding='utf-8')
+    print(f"Successfully generated {output_filename}: {len(records)} results, "
+          f"{len(shards['type'])} type / {len(shards['model'])} model shards in {shard_dir}")
+
+INDEX_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Coding Test Viewer - All Runs</title>
+    <style>
+__CSS____COMPARE_CSS__        .toolbar {
+            display: flex;
+            flex-wrap: wrap;
+            gap: 10px;
+            align-items: center;
+            margin-bottom: 10px;
+        }
+        .toolbar input, .toolbar select {
+            padding: 4px 6px;
+        }
+        .iframe-container .meta {
+            font-size: 0.75em;
+            color: #777;
+            margin-bottom: 5px;
+            white-space: nowrap;
+            overflow: hidden;
+            text-overflow: ellipsis;
+        }
+        .status {
+            padding: 0 4px;
+            border-radius: 3px;
+            color: white;
+            background-color: #c60;
+        }
+        .status.ok {
+            background-color: #2a2;
+        }
+        .status.no_result, .status.script_error {
+            background-color: #c00;
+        }
+        .pager {
+            margin: 15px 0;
+        }
+        .pager button {
+            margin: 0 5px;
+        }
+    </style>
+</head>
+<body>
+
+    <h1>Coding Test Results - All Runs</h1>
+
+    <div class="nav" id="type-navigation">
+        <strong>Select Test Type:</strong>
+        __NAV_CONTENT__
+    </div>
+
+    <div class="toolbar">
+        <label>Model:
+            <select id="model-select">
+                <option value="">(select a model)</option>
+                __MODEL_OPTIONS__
+            </select>
+        </label>
+        <label>Run:
+            <select id="date-select">
+                <option value="">All runs</option>
+                __DATE_OPTIONS__
+            </select>
+        </label>
+        <input type="search" id="search" placeholder="Filter by model, type, date or status">
+        <label>Sort:
+            <select id="sort-select">
+                <option value="name">Name</option>
+                <option value="newest">Newest first</option>
+                <option value="time">Latency (fastest first)</option>
+                <option value="tokensPerSec">Tokens/s (highest first)</option>
+                <option value="charsPerSec">Chars/s (highest first)</option>
+                <option value="status">Validity (valid first)</option>
+            </select>
+        </label>
+    </div>
+
+    <div id="results-container">
+         <p class="info-message" id="initial-message">Select a test type or a model to view results.</p>
+    </div>
+
+    <script id="app-data" type="application/json">
+        __JSON_STRING__
+    </script>
+
+    <script>__COMPARE_SCRIPT__    </script>
+
+    <script>
+        const manifest = JSON.parse(document.getElementById('app-data').textContent);
+        const shards = {};    // "kind/name" -> records
+        const loading = {};   // "kind/name" -> Promise
+
+        // Called by each shard script
+        window.viewerShard = function(kind, name, records) {
+            shards[kind + '/' + name] = records;
+        };
+
+        function loadShard(kind, name) {
+            const id = kind + '/' + name;
+            if (shards[id]) return Promise.resolve(shards[id]);
+            if (!loading[id]) {
+                const entry = manifest[kind === 'type' ? 'types' : 'models'].find(e => e.name === name);
+                loading[id] = new Promise((resolve, reject) => {
+                    if (!entry) return reject(new Error(`Unknown ${kind}: ${name}`));
+                    const script = document.createElement('script');
+                    script.src = `${manifest.shardDir}/${kind}/${entry.file}`;
+                    script.onload = () => shards[id] ? resolve(shards[id]) : reject(new Error(`Empty shard ${script.src}`));
+                    script.onerror = () => { delete loading[id]; reject(new Error(`Could not load ${script.src}`)); };
+                    document.head.appendChild(script);
+                });
+            }
+            return loading[id];
+        }
+
+        document.addEventListener('DOMContentLoaded', function() {
+            const navContainer = document.getElementById('type-navigation');
+            const resultsContainer = document.getElementById('results-container');
+            const modelSelect = document.getElementById('model-select');
+            const dateSelect = document.getElementById('date-select');
+            const searchInput = document.getElementById('search');
+            const sortSelect = document.getElementById('sort-select');
+
+            const root = document.documentElement;
+            root.style.setProperty('--iframe-original-width', '__ORIG_WIDTH__px');
+            root.style.setProperty('--iframe-original-height', '__ORIG_HEIGHT__px');
+            root.style.setProperty('--iframe-scale', '__SCALE__');
+            root.style.setProperty('--container-width', '__CONTAINER_WIDTH__px');
+            root.style.setProperty('--container-height', '__CONTAINER_HEIGHT__px');
+
+            const STATUS_ORDER = ['ok', 'no_animation_loop', 'no_canvas', 'no_script', 'script_error', 'no_result'];
+            const state = { kind: null, name: null, page: 0 };
+
+            // Missing metrics always sort last
+            function byNumber(field, descending) {
+                return (a, b) => {
+                    if (a[field] == null) return b[field] == null ? 0 : 1;
+                    if (b[field] == null) return -1;
+                    return descending ? b[field] - a[field] : a[field] - b[field];
+                };
+            }
+            function statusRank(r) {
+                const i = STATUS_ORDER.indexOf(r.status);
+                return i === -1 ? STATUS_ORDER.length : i;
+            }
+            const SORTS = {
+                name: (a, b) => (state.kind === 'type' ? a.model.localeCompare(b.model) : a.type.localeCompare(b.type))
+                                || b.timestamp.localeCompare(a.timestamp),
+                newest: (a, b) => b.timestamp.localeCompare(a.timestamp),
+                time: byNumber('time', false),
+                tokensPerSec: byNumber('tokensPerSec', true),
+                charsPerSec: byNumber('charsPerSec', true),
+                status: (a, b) => statusRank(a) - statusRank(b) || a.model.localeCompare(b.model),
+            };
+
+            function filtered(records) {
+                const terms = searchInput.value.toLowerCase().split(/\\s+/).filter(Boolean);
+                const date = dateSelect.value;
+                return records.filter(r => {
+                    if (date && r.date !== date) return false;
+                    const haystack = `${r.model} ${r.type} ${r.date} ${r.status || ''}`.toLowerCase();
+                    return terms.every(t => haystack.includes(t));
+                }).sort(SORTS[sortSelect.value] || SORTS.name);
+            }
+
+            function metaLine(r) {
+                const parts = [r.date];
+                if (r.time != null) parts.push(`${r.time.toFixed(1)}s${r.earlyStop ? ' (early stop)' : ''}`);
+                if (r.tokensPerSec != null) parts.push(`${r.tokensPerSec.toFixed(1)} tok/s`);
+                else if (r.charsPerSec != null) parts.push(`${r.charsPerSec.toFixed(0)} chars/s`);
+                return parts.join(' \\u00b7 ');
+            }
+
+            function render() {
+                if (!state.kind) return;
+                const records = shards[state.kind + '/' + state.name];
+                const rows = filtered(records);
+                const pageSize = manifest.pageSize;
+                const pages = Math.max(1, Math.ceil(rows.length / pageSize));
+                state.page = Math.min(state.page, pages - 1);
+
+                resultsContainer.innerHTML = '';
+                const title = document.createElement('h2');
+                title.textContent = `${state.kind === 'type' ? 'Results for' : 'Model'}: ${state.name} (${rows.length} of ${records.length})`;
+                resultsContainer.appendChild(title);
+
+                if (rows.length === 0) {
+                    const empty = document.createElement('p');
+                    empty.className = 'info-message';
+                    empty.textContent = 'No results match the current filters.';
+                    resultsContainer.appendChild(empty);
+                    return;
+                }
+
+                const grid = document.createElement('div');
+                grid.className = 'results-grid';
+                // Only the current page gets iframes
+                rows.slice(state.page * pageSize, (state.page + 1) * pageSize).forEach(r => {
+                    const container = document.createElement('div');
+                    container.className = 'iframe-container';
+
+                    const label = document.createElement('div');
+                    label.className = 'label';
+                    label.textContent = state.kind === 'type' ? r.model : r.type;
+                    label.title = `${r.model} | ${r.type} | ${r.timestamp}`;
+                    container.appendChild(label);
+
+                    const meta = document.createElement('div');
+                    meta.className = 'meta';
+                    meta.textContent = metaLine(r) + ' ';
+                    if (r.status) {
+                        const badge = document.createElement('span');
+                        badge.className = `status ${r.status}`;
+                        badge.textContent = r.status;
+                        meta.appendChild(badge);
+                    }
+                    container.appendChild(meta);
+
+                    const wrapper = document.createElement('div');
+                    wrapper.className = 'iframe-wrapper';
+                    const iframe = document.createElement('iframe');
+                    iframe.className = 'scaled-iframe';
+                    iframe.src = manifest.resultsPrefix + r.src;
+                    iframe.loading = 'lazy';
+                    iframe.title = `Result for ${r.model}`;
+                    wrapper.appendChild(iframe);
+                    container.appendChild(wrapper);
+                    Compare.attach(container, { label: `${r.model} | ${r.type} | ${r.date}`, src: iframe.src });
+                    grid.appendChild(container);
+                });
+                resultsContainer.appendChild(grid);
+
+                if (pages > 1) {
+                    const pager = document.createElement('div');
+                    pager.className = 'pager';
+                    const prev = document.createElement('button');
+                    prev.textContent = 'Previous';
+                    prev.disabled = state.page === 0;
+                    prev.onclick = () => { state.page--; render(); window.scrollTo(0, 0); };
+                    const next = document.createElement('button');
+                    next.textContent = 'Next';
+                    next.disabled = state.page >= pages - 1;
+                    next.onclick = () => { state.page++; render(); window.scrollTo(0, 0); };
+                    pager.appendChild(prev);
+                    pager.appendChild(document.createTextNode(`Page ${state.page + 1} of ${pages}`));
+                    pager.appendChild(next);
+                    resultsContainer.appendChild(pager);
+                }
+            }
+
+            function show(kind, name) {
+                navContainer.querySelectorAll('a').forEach(link => {
+                    link.classList.toggle('selected', kind === 'type' && link.dataset.type === name);
+                });
+                if (kind === 'type') modelSelect.value = '';
+                resultsContainer.innerHTML = '<p class="info-message">Loading...</p>';
+                loadShard(kind, name).then(() => {
+                    state.kind = kind;
+                    state.name = name;
+                    state.page = 0;
+                    render();
+                }).catch(err => {
+                    resultsContainer.innerHTML = '';
+                    const error = document.createElement('p');
+                    error.className = 'error';
+                    error.textContent = err.message;
+                    resultsContainer.appendChild(error);
+                });
+            }
+
+            navContainer.addEventListener('click', function(event) {
+                if (event.target.tagName === 'A' && event.target.dataset.type) {
+                    event.preventDefault();
+                    show('type', event.target.dataset.type);
+                }
+            });
+            modelSelect.addEventListener('change', () => { if (modelSelect.value) show('model', modelSelect.value); });
+            [dateSelect, sortSelect].forEach(el => el.addEventListener('change', () => { state.page = 0; render(); }));
+            searchInput.addEventListener('input', () => { state.page = 0; render(); });
+        });
+    </script>
+</body>
+</html>"""
+
+# --- Main Execution ---
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the all-runs viewer page with on-demand index shards.")
+    parser.add_argument("--results-root", type=str, default=RESULTS_ROOT, help="Folder holding the dated run folders.")
+    parser.add_argument("--output", type=str, default=OUTPUT_FILENAME, help="Page to write (shards go next to it).")
+    args = parser.parse_args()
+    generate_index_viewer(results_root=args.results_root, output_filename=args.output)
+
+if __name__ == "__main__":
+    main()